@@ -2,6 +2,13 @@ from .mongoDB import MongoDB
 from .funciones import Funciones
 from .elastic import ElasticSearch
 from .webScraping import WebScraping
+from .almacenDocumentos import AlmacenDocumentos
+from .planificador import PlanificadorCortesia
+from .trabajos import GestorTrabajos
+from .extractorParalelo import ExtractorParalelo
+from .cacheExtraccion import CacheExtraccion
+from .zipRemoto import ZipRemoto
+from .cacheBusqueda import CacheBusqueda
 #from .PLN import PLN
 #__all__ = ['MongoDB', 'Funciones', 'ElasticSearch', 'WebScraping']
-__all__ = ['MongoDB', 'Funciones', 'ElasticSearch', 'WebScraping', 'PLN']
\ No newline at end of file
+__all__ = ['MongoDB', 'Funciones', 'ElasticSearch', 'WebScraping', 'AlmacenDocumentos', 'PlanificadorCortesia', 'GestorTrabajos', 'ExtractorParalelo', 'CacheExtraccion', 'ZipRemoto', 'CacheBusqueda', 'PLN']
\ No newline at end of file
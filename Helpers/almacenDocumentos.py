@@ -0,0 +1,368 @@
+import os
+import json
+import gzip
+import shutil
+import hashlib
+import zipfile
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+class AlmacenDocumentos:
+    """
+    Almacén de documentos direccionado por contenido.
+
+    Cada archivo se guarda una sola vez bajo su hash SHA-256, sin importar
+    cuántas veces se rastree o se suba. Un manifiesto relaciona cada origen
+    (URL rastreada o miembro de un ZIP) con el hash de su contenido y lleva
+    la cuenta de referencias de cada objeto para la recolección de basura.
+    Opcionalmente los objetos se comprimen en disco con gzip o zstd.
+    """
+
+    COMPRESIONES = (None, 'gzip', 'zstd')
+    _SUFIJOS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+    def __init__(self, carpeta: str = "almacen", compresion: Optional[str] = None):
+        """
+        Inicializa el almacén
+
+        Args:
+            carpeta: Carpeta raíz del almacén
+            compresion: None, 'gzip' o 'zstd' (requiere el paquete zstandard)
+        """
+        if compresion not in self.COMPRESIONES:
+            raise ValueError(f"Compresión no soportada: {compresion}")
+        if compresion == 'zstd':
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                print("Advertencia: zstandard no está instalado (pip install zstandard). Se usará gzip.")
+                compresion = 'gzip'
+
+        self.carpeta = carpeta
+        self.compresion = compresion
+        self.carpeta_objetos = os.path.join(carpeta, 'objetos')
+        self.carpeta_materializados = os.path.join(carpeta, 'materializados')
+        self.ruta_manifiesto = os.path.join(carpeta, 'manifiesto.json')
+        self._lock = threading.RLock()
+
+        os.makedirs(self.carpeta_objetos, exist_ok=True)
+        self.manifiesto = self._cargar_manifiesto()
+
+    # ---------------------------------------------------------------- manifiesto
+    def _cargar_manifiesto(self) -> Dict:
+        """Carga el manifiesto desde disco"""
+        if os.path.exists(self.ruta_manifiesto):
+            try:
+                with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                    manifiesto = json.load(f)
+                manifiesto.setdefault('origenes', {})
+                manifiesto.setdefault('objetos', {})
+                return manifiesto
+            except json.JSONDecodeError:
+                print(f"Advertencia: {self.ruta_manifiesto} contiene JSON inválido. Se reconstruirá.")
+        return {'origenes': {}, 'objetos': {}}
+
+    def guardar_manifiesto(self) -> bool:
+        """Escribe el manifiesto en disco de forma atómica"""
+        with self._lock:
+            try:
+                temporal = f"{self.ruta_manifiesto}.tmp"
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(self.manifiesto, f, ensure_ascii=False)
+                os.replace(temporal, self.ruta_manifiesto)
+                return True
+            except Exception as e:
+                print(f"Error al guardar manifiesto: {e}")
+                return False
+
+    # ------------------------------------------------------------------- objetos
+    def _ruta_objeto(self, hash_contenido: str, compresion: Optional[str]) -> str:
+        """Ruta del objeto en disco: objetos/ab/abcdef...[.gz|.zst]"""
+        return os.path.join(self.carpeta_objetos, hash_contenido[:2],
+                            hash_contenido + self._SUFIJOS[compresion])
+
+    @staticmethod
+    def calcular_hash(ruta_archivo: str, chunk_size: int = 1048576) -> str:
+        """Calcula el SHA-256 de un archivo leyéndolo por bloques"""
+        sha = hashlib.sha256()
+        with open(ruta_archivo, 'rb') as f:
+            for bloque in iter(lambda: f.read(chunk_size), b''):
+                sha.update(bloque)
+        return sha.hexdigest()
+
+    def _escribir_objeto(self, ruta_origen: str, destino: str, mover: bool):
+        """Copia (o mueve) el archivo al almacén aplicando la compresión configurada"""
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{threading.get_ident()}.tmp"
+
+        if self.compresion is None:
+            if mover:
+                os.replace(ruta_origen, destino)
+                return
+            shutil.copyfile(ruta_origen, temporal)
+        elif self.compresion == 'gzip':
+            with open(ruta_origen, 'rb') as entrada, gzip.open(temporal, 'wb', compresslevel=6) as salida:
+                shutil.copyfileobj(entrada, salida, 1048576)
+        else:
+            import zstandard
+            with open(ruta_origen, 'rb') as entrada, open(temporal, 'wb') as salida:
+                zstandard.ZstdCompressor(level=10).copy_stream(entrada, salida)
+
+        os.replace(temporal, destino)
+        if mover:
+            os.remove(ruta_origen)
+
+    def guardar_archivo(self, ruta_archivo: str, origen: str, nombre: Optional[str] = None,
+                        mover: bool = False) -> Dict:
+        """
+        Guarda un archivo en el almacén y lo asocia a un origen
+
+        Args:
+            ruta_archivo: Archivo a guardar
+            origen: Identificador del origen (URL o 'zip:<archivo>/<miembro>')
+            nombre: Nombre legible del documento (default: nombre del archivo)
+            mover: Si True, el archivo original se mueve/elimina en lugar de copiarse
+
+        Returns:
+            Diccionario con hash, nombre, extensión, tamaño y si el contenido era nuevo
+        """
+        nombre = nombre or os.path.basename(ruta_archivo)
+        extension = os.path.splitext(nombre)[1].lower().replace('.', '')
+        hash_contenido = self.calcular_hash(ruta_archivo)
+        tamaño = os.path.getsize(ruta_archivo)
+
+        with self._lock:
+            objetos = self.manifiesto['objetos']
+            nuevo = hash_contenido not in objetos
+
+            if nuevo:
+                self._escribir_objeto(ruta_archivo, self._ruta_objeto(hash_contenido, self.compresion), mover)
+                objetos[hash_contenido] = {
+                    'tamaño': tamaño,
+                    'extension': extension,
+                    'compresion': self.compresion,
+                    'referencias': 0,
+                    'fecha': datetime.now().isoformat()
+                }
+            elif mover:
+                os.remove(ruta_archivo)
+
+            self._asociar_origen(origen, hash_contenido, nombre)
+
+        return {'hash': hash_contenido, 'nombre': nombre, 'extension': extension,
+                'tamaño': tamaño, 'nuevo': nuevo}
+
+    def _asociar_origen(self, origen: str, hash_contenido: str, nombre: str):
+        """Apunta un origen a un hash, actualizando las referencias"""
+        origenes = self.manifiesto['origenes']
+        objetos = self.manifiesto['objetos']
+        anterior = origenes.get(origen)
+
+        if anterior and anterior['hash'] == hash_contenido:
+            anterior['nombre'] = nombre
+            anterior['fecha'] = datetime.now().isoformat()
+            return
+
+        if anterior and anterior['hash'] in objetos:
+            objetos[anterior['hash']]['referencias'] -= 1
+
+        objetos[hash_contenido]['referencias'] += 1
+        origenes[origen] = {
+            'hash': hash_contenido,
+            'nombre': nombre,
+            'fecha': datetime.now().isoformat()
+        }
+
+    def importar_zip(self, ruta_zip: str, extensiones: Iterable[str] = ('txt', 'pdf', 'json'),
+                     prefijo_origen: Optional[str] = None) -> List[Dict]:
+        """
+        Guarda en el almacén los miembros de un ZIP con las extensiones indicadas,
+        sin extraer el ZIP completo a una carpeta intermedia
+
+        Args:
+            ruta_zip: Archivo ZIP
+            extensiones: Extensiones de los miembros a guardar
+            prefijo_origen: Prefijo del origen de cada miembro (default: nombre del ZIP)
+
+        Returns:
+            Lista con el resultado de guardar_archivo (más 'origen' y 'carpeta') por cada miembro
+        """
+        extensiones = {ext.lower().replace('.', '') for ext in extensiones}
+        prefijo_origen = prefijo_origen or os.path.basename(ruta_zip)
+        os.makedirs(self.carpeta, exist_ok=True)
+        guardados = []
+
+        try:
+            with zipfile.ZipFile(ruta_zip, 'r') as zip_ref:
+                for info in zip_ref.infolist():
+                    if info.is_dir():
+                        continue
+                    nombre = os.path.basename(info.filename)
+                    if os.path.splitext(nombre)[1].lower().replace('.', '') not in extensiones:
+                        continue
+
+                    # La lectura con ZipFile.open verifica el CRC del miembro al terminar
+                    temporal = os.path.join(self.carpeta, f"miembro.{threading.get_ident()}.tmp")
+                    try:
+                        with zip_ref.open(info) as entrada, open(temporal, 'wb') as salida:
+                            shutil.copyfileobj(entrada, salida, 1048576)
+                        origen = f"zip:{prefijo_origen}/{info.filename}"
+                        resultado = self.guardar_archivo(temporal, origen=origen, nombre=nombre, mover=True)
+                        resultado['origen'] = origen
+                        resultado['carpeta'] = os.path.dirname(info.filename) or 'raiz'
+                        guardados.append(resultado)
+                    except zipfile.BadZipFile as e:
+                        print(f"❌ Miembro corrupto {info.filename}: {e}")
+                    finally:
+                        if os.path.exists(temporal):
+                            os.remove(temporal)
+        except zipfile.BadZipFile as e:
+            print(f"Error: Archivo ZIP corrupto - {e}")
+
+        self.guardar_manifiesto()
+        return guardados
+
+    # ------------------------------------------------------------------ lectura
+    def tiene_origen(self, origen: str) -> bool:
+        """Indica si el origen está registrado y su objeto sigue en el almacén"""
+        with self._lock:
+            entrada = self.manifiesto['origenes'].get(origen)
+            return bool(entrada) and entrada['hash'] in self.manifiesto['objetos']
+
+    def ruta_local(self, hash_contenido: str) -> Optional[str]:
+        """
+        Retorna una ruta legible sin compresión para el objeto. Si el objeto
+        está comprimido se descomprime una vez en la carpeta de materializados.
+        """
+        with self._lock:
+            info = self.manifiesto['objetos'].get(hash_contenido)
+        if not info:
+            return None
+
+        ruta_objeto = self._ruta_objeto(hash_contenido, info.get('compresion'))
+        if not os.path.exists(ruta_objeto):
+            return None
+        if not info.get('compresion'):
+            return ruta_objeto
+
+        extension = f".{info['extension']}" if info.get('extension') else ''
+        destino = os.path.join(self.carpeta_materializados, hash_contenido + extension)
+        if os.path.exists(destino):
+            return destino
+
+        os.makedirs(self.carpeta_materializados, exist_ok=True)
+        temporal = f"{destino}.{threading.get_ident()}.tmp"
+        if info['compresion'] == 'gzip':
+            with gzip.open(ruta_objeto, 'rb') as entrada, open(temporal, 'wb') as salida:
+                shutil.copyfileobj(entrada, salida, 1048576)
+        else:
+            import zstandard
+            with open(ruta_objeto, 'rb') as entrada, open(temporal, 'wb') as salida:
+                zstandard.ZstdDecompressor().copy_stream(entrada, salida)
+        os.replace(temporal, destino)
+        return destino
+
+    def listar_documentos(self, origenes: Optional[Iterable[str]] = None,
+                          extensiones: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Lista los documentos del almacén sin repetir contenido
+
+        Args:
+            origenes: Limitar a estos orígenes (None para todos)
+            extensiones: Limitar a estas extensiones (None para todas)
+
+        Returns:
+            Lista de diccionarios con nombre, ruta, extensión, tamaño, hash y orígenes
+        """
+        if extensiones is not None:
+            extensiones = {ext.lower().replace('.', '') for ext in extensiones}
+
+        with self._lock:
+            todos = self.manifiesto['origenes']
+            seleccion = todos.keys() if origenes is None else [o for o in origenes if o in todos]
+
+            por_hash = {}
+            for origen in seleccion:
+                entrada = todos[origen]
+                hash_contenido = entrada['hash']
+                if hash_contenido in por_hash:
+                    por_hash[hash_contenido]['origenes'].append(origen)
+                    continue
+                info = self.manifiesto['objetos'].get(hash_contenido, {})
+                if extensiones is not None and info.get('extension') not in extensiones:
+                    continue
+                por_hash[hash_contenido] = {
+                    'nombre': entrada['nombre'],
+                    'extension': info.get('extension', ''),
+                    'tamaño': info.get('tamaño', 0),
+                    'hash': hash_contenido,
+                    'origenes': [origen]
+                }
+
+        documentos = []
+        for hash_contenido, documento in por_hash.items():
+            ruta = self.ruta_local(hash_contenido)
+            if ruta:
+                documento['ruta'] = ruta
+                documentos.append(documento)
+        return documentos
+
+    # --------------------------------------------------------- mantenimiento
+    def eliminar_origen(self, origen: str) -> bool:
+        """Elimina la asociación de un origen, liberando una referencia de su objeto"""
+        with self._lock:
+            entrada = self.manifiesto['origenes'].pop(origen, None)
+            if not entrada:
+                return False
+            objeto = self.manifiesto['objetos'].get(entrada['hash'])
+            if objeto:
+                objeto['referencias'] -= 1
+            return True
+
+    def liberar_origenes(self, origenes: Iterable[str], prefijo: str = 'zip:') -> int:
+        """
+        Libera orígenes temporales (por defecto solo los miembros de ZIP subidos, no las
+        URL rastreadas, que sirven para no volver a descargar) y guarda el manifiesto.
+        Sus objetos se eliminan en la próxima recolección si ningún otro origen los usa
+
+        Args:
+            origenes: Orígenes a liberar
+            prefijo: Solo se liberan los orígenes que empiezan con este prefijo
+
+        Returns:
+            Cantidad de orígenes liberados
+        """
+        with self._lock:
+            liberados = sum(1 for origen in set(origenes)
+                            if origen.startswith(prefijo) and self.eliminar_origen(origen))
+            if liberados:
+                self.guardar_manifiesto()
+        return liberados
+
+    def recolectar_basura(self) -> Dict:
+        """
+        Elimina del disco los objetos sin referencias
+
+        Returns:
+            Diccionario con objetos eliminados y bytes liberados
+        """
+        eliminados = 0
+        bytes_liberados = 0
+        with self._lock:
+            objetos = self.manifiesto['objetos']
+            for hash_contenido in [h for h, info in objetos.items() if info['referencias'] <= 0]:
+                info = objetos.pop(hash_contenido)
+                extension = f".{info['extension']}" if info.get('extension') else ''
+                for ruta in (self._ruta_objeto(hash_contenido, info.get('compresion')),
+                             os.path.join(self.carpeta_materializados, hash_contenido + extension)):
+                    if os.path.exists(ruta):
+                        bytes_liberados += os.path.getsize(ruta)
+                        os.remove(ruta)
+                eliminados += 1
+            self.guardar_manifiesto()
+
+        if eliminados:
+            print(f"Recolección de basura: {eliminados} objetos eliminados ({bytes_liberados} bytes)")
+        return {'eliminados': eliminados, 'bytes_liberados': bytes_liberados}
@@ -0,0 +1,135 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheBusqueda:
+    """
+    Caché en memoria de resultados de búsqueda (LRU con tiempo de vida).
+
+    Cada índice tiene un contador de generación que se incrementa con cada
+    escritura (carga masiva, DML, actualización o eliminación de documentos).
+    Una entrada guarda la generación vigente cuando empezó la búsqueda y deja
+    de servir apenas el índice cambia, sin recorrer la caché. Las búsquedas
+    sobre varios índices o comodines ('_all', 'a,b', 'doc*') dependen de una
+    generación global que cualquier escritura incrementa. El TTL acota además
+    el desfase por el refresco de Elastic (los documentos escritos tardan
+    hasta refresh_interval en ser visibles).
+    """
+
+    def __init__(self, max_entradas: int = 1000, ttl_segundos: float = 60):
+        """
+        Inicializa la caché
+
+        Args:
+            max_entradas: Entradas máximas (se desalojan las usadas hace más tiempo)
+            ttl_segundos: Segundos que una entrada puede servirse
+        """
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.invalidados = 0
+        self.desalojados = 0
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generaciones: Dict[str, int] = {}
+        self._generacion_global = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _es_multiple(index: Optional[str]) -> bool:
+        """Indica si el nombre abarca varios índices"""
+        return not index or index == '_all' or any(c in index for c in ',*')
+
+    def generacion(self, index: Optional[str]) -> int:
+        """Generación actual del índice (leerla antes de buscar y pasarla a guardar)"""
+        with self._lock:
+            if self._es_multiple(index):
+                return self._generacion_global
+            return self._generaciones.get(index, 0)
+
+    def invalidar(self, index: Optional[str] = None):
+        """
+        Marca como obsoletas las búsquedas sobre el índice (y las de varios índices)
+
+        Args:
+            index: Índice modificado (None o un comodín invalida todo)
+        """
+        with self._lock:
+            self._generacion_global += 1
+            if self._es_multiple(index):
+                for nombre in self._generaciones:
+                    self._generaciones[nombre] += 1
+            else:
+                self._generaciones[index] = self._generaciones.get(index, 0) + 1
+
+    def obtener(self, index: Optional[str], clave: Hashable) -> Optional[Any]:
+        """
+        Busca un resultado vigente
+
+        Returns:
+            El resultado guardado, o None si no está, expiró o el índice cambió
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            generacion, expira, valor = entrada
+            actual = self._generacion_global if self._es_multiple(index) else self._generaciones.get(index, 0)
+            if generacion != actual or ahora >= expira:
+                del self._entradas[clave]
+                if generacion != actual:
+                    self.invalidados += 1
+                else:
+                    self.expirados += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, index: Optional[str], clave: Hashable, valor: Any, generacion: int):
+        """
+        Guarda un resultado si el índice no cambió mientras se buscaba
+
+        Args:
+            index: Índice buscado
+            clave: Clave de la búsqueda
+            valor: Resultado a guardar
+            generacion: Generación leída con generacion() antes de buscar
+        """
+        with self._lock:
+            actual = self._generacion_global if self._es_multiple(index) else self._generaciones.get(index, 0)
+            if generacion != actual:
+                # Hubo una escritura durante la búsqueda: el resultado puede estar incompleto
+                return
+            self._entradas[clave] = (generacion, time.monotonic() + self.ttl_segundos, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojados += 1
+
+    def limpiar(self):
+        """Elimina todas las entradas (las métricas se conservan)"""
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self) -> Dict:
+        """Retorna aciertos, fallos, tasa de aciertos, entradas y motivos de descarte"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl_segundos': self.ttl_segundos,
+                'expirados': self.expirados,
+                'invalidados': self.invalidados,
+                'desalojados': self.desalojados
+            }
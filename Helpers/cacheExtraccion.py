@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from Helpers.funciones import VERSION_EXTRACTOR
+
+
+class CacheExtraccion:
+    """
+    Caché persistente (SQLite) de texto extraído de documentos.
+
+    La clave es el SHA-256 del contenido del archivo más la versión del
+    extractor y el perfil de OCR (o 'sin_ocr' si ninguna página pasó por OCR y
+    el resultado no depende del perfil), de modo que el mismo PDF descargado en otro
+    rastreo (o con otro nombre) no se vuelve a procesar, y un cambio en el
+    extractor invalida las entradas viejas. El texto se guarda comprimido con
+    zlib. Cuando el tamaño total supera el máximo se desalojan las entradas
+    usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, ruta_db: str = "cache/extraccion.sqlite3", max_bytes: int = 512 * 1024 * 1024):
+        """
+        Inicializa la caché
+
+        Args:
+            ruta_db: Ruta del archivo SQLite
+            max_bytes: Tamaño máximo del texto comprimido guardado
+        """
+        directorio = os.path.dirname(ruta_db)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta_db = ruta_db
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS extracciones (
+                clave TEXT PRIMARY KEY,
+                metodo TEXT,
+                paginas TEXT,
+                texto BLOB NOT NULL,
+                tamaño INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        self._conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extracciones_acceso ON extracciones (ultimo_acceso)"
+        )
+        self._conexion.commit()
+
+    @staticmethod
+    def clave(hash_contenido: str, perfil_ocr: Optional[str]) -> str:
+        """Clave de una extracción: contenido + versión del extractor + perfil de OCR (None si no hubo OCR)"""
+        return f"{hash_contenido}:{VERSION_EXTRACTOR}:{perfil_ocr or 'sin_ocr'}"
+
+    def obtener(self, hash_contenido: str, perfil_ocr: str) -> Optional[Dict]:
+        """
+        Busca una extracción guardada (sin OCR, o con OCR del perfil indicado)
+
+        Returns:
+            Diccionario con 'texto', 'metodo' y 'paginas', o None si no está en la caché
+        """
+        with self._lock:
+            for clave in (self.clave(hash_contenido, None), self.clave(hash_contenido, perfil_ocr)):
+                fila = self._conexion.execute(
+                    "SELECT metodo, paginas, texto FROM extracciones WHERE clave = ?", (clave,)
+                ).fetchone()
+                if fila is not None:
+                    break
+            else:
+                self.fallos += 1
+                return None
+            self._conexion.execute(
+                "UPDATE extracciones SET ultimo_acceso = ? WHERE clave = ?", (time.time(), clave)
+            )
+            self._conexion.commit()
+            self.aciertos += 1
+
+        metodo, paginas, texto = fila
+        return {
+            'texto': zlib.decompress(texto).decode('utf-8'),
+            'metodo': metodo,
+            'paginas': json.loads(paginas) if paginas else []
+        }
+
+    def guardar(self, hash_contenido: str, perfil_ocr: Optional[str], extraccion: Dict):
+        """
+        Guarda una extracción y desaloja las entradas menos usadas si se supera el máximo
+
+        Args:
+            hash_contenido: SHA-256 del archivo
+            perfil_ocr: Perfil de OCR usado (None si ninguna página pasó por OCR)
+            extraccion: Diccionario con 'texto', 'metodo' y 'paginas'
+        """
+        texto = zlib.compress(extraccion.get('texto', '').encode('utf-8'), 6)
+        paginas = json.dumps(extraccion.get('paginas', []), ensure_ascii=False)
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO extracciones "
+                "(clave, metodo, paginas, texto, tamaño, creado, ultimo_acceso) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.clave(hash_contenido, perfil_ocr), extraccion.get('metodo'), paginas,
+                 texto, len(texto) + len(paginas), ahora, ahora)
+            )
+            self._desalojar()
+            self._conexion.commit()
+
+    def _desalojar(self):
+        """Elimina las entradas con acceso más antiguo hasta quedar bajo max_bytes (requiere el lock)"""
+        total = self._conexion.execute("SELECT COALESCE(SUM(tamaño), 0) FROM extracciones").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        exceso = total - self.max_bytes
+        liberado = 0
+        claves = []
+        for clave, tamaño in self._conexion.execute(
+                "SELECT clave, tamaño FROM extracciones ORDER BY ultimo_acceso"):
+            if liberado >= exceso:
+                break
+            claves.append((clave,))
+            liberado += tamaño
+        self._conexion.executemany("DELETE FROM extracciones WHERE clave = ?", claves)
+        print(f"Caché de extracción: desalojadas {len(claves)} entradas ({liberado} bytes)")
+
+    def estadisticas(self) -> Dict:
+        """Retorna aciertos, fallos, entradas y bytes guardados"""
+        with self._lock:
+            entradas, tamaño = self._conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamaño), 0) FROM extracciones"
+            ).fetchone()
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'entradas': entradas, 'bytes': tamaño}
+
+    def close(self):
+        """Cierra la conexión a SQLite"""
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from Helpers.funciones import Funciones
+
+
+class CacheHTTP:
+    """
+    Caché HTTP persistente en disco basada en peticiones condicionales.
+
+    Por cada URL guarda el cuerpo de la respuesta y sus validadores (ETag y
+    Last-Modified). En la siguiente petición envía If-None-Match /
+    If-Modified-Since y, si el servidor responde 304, sirve la copia local,
+    de modo que un re-rastreo de un sitio sin cambios solo transfiere cabeceras.
+    """
+
+    def __init__(self, carpeta: str = "cache/http"):
+        """
+        Inicializa la caché
+
+        Args:
+            carpeta: Carpeta donde se guardan cuerpos y metadatos
+        """
+        self.carpeta = carpeta
+        os.makedirs(carpeta, exist_ok=True)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _rutas(self, url: str) -> Tuple[str, str]:
+        """Retorna (ruta de metadatos, ruta del cuerpo) de una URL"""
+        clave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        subcarpeta = os.path.join(self.carpeta, clave[:2])
+        return os.path.join(subcarpeta, f"{clave}.json"), os.path.join(subcarpeta, f"{clave}.body")
+
+    def _leer_metadatos(self, url: str) -> Optional[Dict]:
+        """Lee los metadatos guardados de una URL si existen y su cuerpo está en disco"""
+        ruta_meta, ruta_cuerpo = self._rutas(url)
+        if not (os.path.exists(ruta_meta) and os.path.exists(ruta_cuerpo)):
+            return None
+        try:
+            with open(ruta_meta, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def cabeceras_condicionales(self, url: str) -> Dict:
+        """Construye las cabeceras If-None-Match / If-Modified-Since para una URL"""
+        meta = self._leer_metadatos(url)
+        cabeceras = {}
+        if meta:
+            if meta.get('etag'):
+                cabeceras['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                cabeceras['If-Modified-Since'] = meta['last_modified']
+        return cabeceras
+
+    def _registrar(self, acierto: bool):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def _guardar_metadatos(self, url: str, etag: Optional[str], last_modified: Optional[str], tamaño: int):
+        """Guarda los validadores de la respuesta de forma atómica"""
+        ruta_meta, _ = self._rutas(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'tamaño': tamaño,
+            'fecha': datetime.now().isoformat()
+        }
+        temporal = f"{ruta_meta}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temporal, ruta_meta)
+
+    @staticmethod
+    def _es_cacheable(response: requests.Response) -> bool:
+        """Solo vale la pena guardar respuestas con validadores"""
+        return bool(response.headers.get('ETag') or response.headers.get('Last-Modified'))
+
+    def obtener(self, session: requests.Session, url: str, timeout: float = 30) -> Tuple[bytes, bool]:
+        """
+        Obtiene el contenido de una URL usando la caché
+
+        Returns:
+            Tupla (contenido, desde_cache)
+        """
+        response = session.get(url, headers=self.cabeceras_condicionales(url), timeout=timeout)
+        _, ruta_cuerpo = self._rutas(url)
+
+        if response.status_code == 304:
+            self._registrar(True)
+            with open(ruta_cuerpo, 'rb') as f:
+                return f.read(), True
+
+        response.raise_for_status()
+        self._registrar(False)
+        contenido = response.content
+
+        if self._es_cacheable(response):
+            os.makedirs(os.path.dirname(ruta_cuerpo), exist_ok=True)
+            temporal = f"{ruta_cuerpo}.{threading.get_ident()}.tmp"
+            with open(temporal, 'wb') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta_cuerpo)
+            self._guardar_metadatos(url, response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'), len(contenido))
+
+        return contenido, False
+
+    def descargar(self, session: requests.Session, url: str, ruta_destino: str,
+                  timeout: float = 60, chunk_size: int = 1048576,
+                  reintentos: int = 3, backoff: float = 0.5) -> Tuple[int, bool]:
+        """
+        Descarga una URL en ruta_destino usando la caché. La transferencia es
+        reanudable (ver Funciones.descargar_archivo_reanudable)
+
+        Returns:
+            Tupla (bytes transferidos por la red, desde_cache)
+        """
+        _, ruta_cuerpo = self._rutas(url)
+        os.makedirs(os.path.dirname(ruta_cuerpo), exist_ok=True)
+
+        resultado = Funciones.descargar_archivo_reanudable(
+            url, ruta_cuerpo, session=session, chunk_size=chunk_size, timeout=timeout,
+            reintentos=reintentos, backoff=backoff, headers=self.cabeceras_condicionales(url)
+        )
+
+        if resultado['no_modificado']:
+            self._registrar(True)
+            self._materializar(ruta_cuerpo, ruta_destino)
+            return 0, True
+
+        self._registrar(False)
+        self._guardar_metadatos(url, resultado['etag'], resultado['last_modified'], resultado['tamaño'])
+        self._materializar(ruta_cuerpo, ruta_destino)
+        return resultado['bytes'], False
+
+    @staticmethod
+    def _materializar(ruta_cuerpo: str, ruta_destino: str):
+        """Deja una copia del cuerpo cacheado en ruta_destino (hard link si es posible)"""
+        if os.path.exists(ruta_destino):
+            os.remove(ruta_destino)
+        try:
+            os.link(ruta_cuerpo, ruta_destino)
+        except OSError:
+            shutil.copyfile(ruta_cuerpo, ruta_destino)
+
+    def estadisticas(self) -> Dict:
+        """Retorna aciertos y fallos de la caché"""
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos}
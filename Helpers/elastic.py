@@ -1,20 +1,67 @@
-from elasticsearch import Elasticsearch
-from typing import Dict, List, Optional, Any
+from elasticsearch import Elasticsearch, ApiError
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Any
 import json
+import time
+import random
+import hashlib
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+from Helpers.funciones import Funciones
+from Helpers.planificador import ControladorAIMD
+from Helpers.cacheBusqueda import CacheBusqueda
 
 class ElasticSearch:
-    def __init__(self, cloud_url: str, api_key: str):
+    # Ítems fallidos que se devuelven en 'errores' de una carga masiva (el total va en 'fallidos')
+    MAX_ERRORES_BULK = 100
+    # Estrategias de _id de la carga masiva: hash del texto normalizado, hash del origen
+    # (ruta o URL) o el valor de un campo del documento. None deja que Elastic genere el _id
+    ESTRATEGIAS_ID = (None, 'contenido', 'origen', 'campo')
+    
+    def __init__(self, cloud_url: str, api_key: str, bulk_hilos: int = 4, bulk_tamaño_lote: int = 500,
+                 bulk_max_bytes: int = 10 * 1024 * 1024, bulk_latencia_objetivo: float = 2.0,
+                 bulk_tamaño_minimo: int = 50, bulk_tamaño_maximo: int = 5000,
+                 bulk_reintentos: int = 6, bulk_espera_base: float = 0.5, bulk_espera_maxima: float = 30.0,
+                 cache_busqueda: Optional[CacheBusqueda] = None):
         """
         Inicializa conexión a ElasticSearch Cloud
         
         Args:
             cloud_url: URL del cluster de Elastic Cloud
             api_key: API Key para autenticación
+            bulk_hilos: Peticiones _bulk en paralelo por defecto
+            bulk_tamaño_lote: Documentos por petición _bulk por defecto (inicial si es adaptativo)
+            bulk_max_bytes: Bytes máximos por petición _bulk por defecto
+            bulk_latencia_objetivo: Segundos por petición _bulk sobre los que se reduce el lote
+            bulk_tamaño_minimo: Tamaño mínimo del lote adaptativo
+            bulk_tamaño_maximo: Tamaño máximo del lote adaptativo
+            bulk_reintentos: Reintentos de los documentos rechazados con 429
+            bulk_espera_base: Espera (segundos) antes del primer reintento; se duplica en cada uno
+            bulk_espera_maxima: Espera máxima entre reintentos
+            cache_busqueda: Caché de resultados de buscar() (None para no usar caché);
+                            las escrituras hechas con esta clase la invalidan por índice
         """
+        self.bulk_hilos = bulk_hilos
+        self.bulk_tamaño_lote = bulk_tamaño_lote
+        self.bulk_max_bytes = bulk_max_bytes
+        self.bulk_latencia_objetivo = bulk_latencia_objetivo
+        self.bulk_tamaño_minimo = bulk_tamaño_minimo
+        self.bulk_tamaño_maximo = bulk_tamaño_maximo
+        self.bulk_reintentos = bulk_reintentos
+        self.bulk_espera_base = bulk_espera_base
+        self.bulk_espera_maxima = bulk_espera_maxima
+        self.cache_busqueda = cache_busqueda
+        # Índices en modo carga masiva: cantidad de cargas en curso y configuración a restaurar
+        self._cargas_activas: Dict[str, Dict] = {}
+        self._lock_cargas = threading.Lock()
+        # Una conexión por hilo de carga masiva (más margen para las búsquedas)
         self.client = Elasticsearch(
             cloud_url,
             api_key=api_key,
-            verify_certs=True
+            verify_certs=True,
+            connections_per_node=max(10, bulk_hilos + 2)
         )
         
     def test_connection(self) -> bool:
@@ -43,45 +90,52 @@ class ElasticSearch:
             # Extraer operación y parámetros
             operacion = comando.get('operacion')
             index = comando.get('index')
+            escritura = operacion in ('crear_index', 'eliminar_index', 'actualizar_mappings')
             
-            if operacion == 'crear_index':
-                # Crear índice
-                mappings = comando.get('mappings', {})
-                settings = comando.get('settings', {})
+            try:
+                if operacion == 'crear_index':
+                    # Crear índice
+                    mappings = comando.get('mappings', {})
+                    settings = comando.get('settings', {})
                 
-                response = self.client.indices.create(
-                    index=index,
-                    mappings=mappings,
-                    settings=settings
-                )
-                return {'success': True, 'data': response}
+                    response = self.client.indices.create(
+                        index=index,
+                        mappings=mappings,
+                        settings=settings
+                    )
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'eliminar_index':
-                # Eliminar índice
-                response = self.client.indices.delete(index=index)
-                return {'success': True, 'data': response}
+                elif operacion == 'eliminar_index':
+                    # Eliminar índice
+                    response = self.client.indices.delete(index=index)
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'actualizar_mappings':
-                # Actualizar mappings
-                mappings = comando.get('mappings', {})
-                response = self.client.indices.put_mapping(
-                    index=index,
-                    body=mappings
-                )
-                return {'success': True, 'data': response}
+                elif operacion == 'actualizar_mappings':
+                    # Actualizar mappings
+                    mappings = comando.get('mappings', {})
+                    response = self.client.indices.put_mapping(
+                        index=index,
+                        body=mappings
+                    )
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'info_index':
-                # Obtener información del índice
-                response = self.client.indices.get(index=index)
-                return {'success': True, 'data': response}
+                elif operacion == 'info_index':
+                    # Obtener información del índice
+                    response = self.client.indices.get(index=index)
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'listar_indices':
-                # Listar todos los índices
-                response = self.client.cat.indices(format='json')
-                return {'success': True, 'data': response}
+                elif operacion == 'listar_indices':
+                    # Listar todos los índices
+                    response = self.client.cat.indices(format='json')
+                    return {'success': True, 'data': response}
                 
-            else:
-                return {'success': False, 'error': f'Operación no soportada: {operacion}'}
+                else:
+                    return {'success': False, 'error': f'Operación no soportada: {operacion}'}
+            finally:
+                # Después de la operación (aunque falle): una búsqueda hecha mientras tanto no
+                # queda guardada en la caché como vigente
+                if escritura:
+                    self._invalidar_cache(index)
                 
         except json.JSONDecodeError as e:
             return {'success': False, 'error': f'JSON inválido: {str(e)}'}
@@ -105,6 +159,7 @@ class ElasticSearch:
                 body['settings'] = settings
                 
             self.client.indices.create(index=nombre_index, body=body)
+            self._invalidar_cache(nombre_index)
             return True
         except Exception as e:
             print(f"Error al crear índice: {e}")
@@ -114,6 +169,7 @@ class ElasticSearch:
         """Elimina un índice"""
         try:
             self.client.indices.delete(index=nombre_index)
+            self._invalidar_cache(nombre_index)
             return True
         except Exception as e:
             print(f"Error al eliminar índice: {e}")
@@ -154,50 +210,484 @@ class ElasticSearch:
                 self.client.index(index=index, id=doc_id, document=documento)
             else:
                 self.client.index(index=index, document=documento)
+            self._invalidar_cache(index)
             return True
         except Exception as e:
             print(f"Error al indexar documento: {e}")
             return False
     
-    def indexar_bulk(self, index: str, documentos: List[Dict]) -> Dict:
+    def indexar_bulk(self, index: str, documentos: Iterable[Dict], tamaño_lote: Optional[int] = None,
+                     max_bytes_lote: Optional[int] = None, hilos: Optional[int] = None,
+                     adaptativo: bool = True, estrategia_id: Optional[str] = None,
+                     campo_id: Optional[str] = None, operacion: Optional[str] = None) -> Dict:
         """
         Indexa múltiples documentos de forma masiva
         
+        Los documentos se consumen a medida que se arman los lotes (una lista o
+        un generador), cada lote se cierra al llegar al tamaño de lote vigente o
+        a max_bytes_lote bytes serializados, y los lotes se envían en paralelo
+        por varias conexiones. Nunca hay más de dos lotes por hilo esperando en
+        memoria, así que el generador de entrada se frena si el clúster no da abasto.
+        
+        Cuando el clúster rechaza trabajo (429 / es_rejected_execution_exception)
+        se reintentan solo los ítems rechazados, con espera exponencial y jitter.
+        Con adaptativo=True el tamaño de lote se ajusta con AIMD: crece mientras
+        la latencia de cada petición está bajo bulk_latencia_objetivo y se reduce
+        a la mitad ante latencias altas o rechazos. Los ítems que siguen
+        rechazados después de los reintentos se cuentan en 'fallidos'.
+        
+        Con una estrategia de _id determinista, volver a cargar los mismos
+        documentos no los duplica: con operacion='create' los que ya existen
+        responden 409 y se cuentan en 'omitidos' sin reescribirse; con 'index'
+        se sobrescriben.
+        
         Args:
             index: Nombre del índice
-            documentos: Lista de documentos a indexar
+            documentos: Lista o iterador de documentos a indexar
+            tamaño_lote: Documentos por petición _bulk (inicial si es adaptativo;
+                         None para el valor de la instancia)
+            max_bytes_lote: Bytes máximos por petición _bulk (None para el valor de la instancia)
+            hilos: Peticiones _bulk en paralelo (None para el valor de la instancia)
+            adaptativo: Si True, ajusta el tamaño de lote según la latencia y los rechazos
+            estrategia_id: None, 'contenido' (hash del campo 'texto' normalizado o, si no
+                           existe, del documento completo), 'origen' (hash de 'ruta', 'url'
+                           u 'origen') o 'campo' (valor de campo_id)
+            campo_id: Campo con el _id (estrategia 'campo') o con el origen (estrategia 'origen')
+            operacion: 'create' u 'index' (default: 'create' con estrategia_id, 'index' sin ella)
+            
+        Returns:
+            Diccionario con 'success', 'indexados', 'omitidos' (ya existían), 'fallidos', 'errores' (primeros
+            MAX_ERRORES_BULK ítems fallidos) y 'estadisticas' (totales, documentos/s,
+            MB/s, percentiles de latencia, reintentos y detalle por lote)
+        """
+        if estrategia_id not in self.ESTRATEGIAS_ID:
+            return {'success': False, 'error': f"Estrategia de _id no soportada: {estrategia_id}"}
+        if estrategia_id == 'campo' and not campo_id:
+            return {'success': False, 'error': "La estrategia 'campo' requiere campo_id"}
+        operacion = operacion or ('create' if estrategia_id else 'index')
+        if operacion not in ('create', 'index'):
+            return {'success': False, 'error': f"Operación no soportada: {operacion}"}
+        
+        tamaño_lote = max(1, tamaño_lote or self.bulk_tamaño_lote)
+        max_bytes_lote = max(1, max_bytes_lote or self.bulk_max_bytes)
+        hilos = max(1, hilos or self.bulk_hilos)
+        if adaptativo:
+            controlador = ControladorAIMD(
+                inicial=tamaño_lote, minimo=min(tamaño_lote, self.bulk_tamaño_minimo),
+                maximo=max(tamaño_lote, self.bulk_tamaño_maximo),
+                incremento=max(1, self.bulk_tamaño_minimo // 2)
+            )
+        else:
+            controlador = ControladorAIMD(inicial=tamaño_lote, minimo=tamaño_lote, maximo=tamaño_lote, incremento=0)
+        
+        resultado = {'success': True, 'indexados': 0, 'omitidos': 0, 'fallidos': 0, 'errores': []}
+        lotes = []
+        inicio = time.perf_counter()
+        
+        def acumular(lote: Dict):
+            lotes.append({k: lote[k] for k in ('numero', 'documentos', 'bytes', 'segundos', 'reintentos', 'rechazados')})
+            resultado['indexados'] += lote['indexados']
+            resultado['omitidos'] += lote['omitidos']
+            if lote['indexados']:
+                self._invalidar_cache(index)
+            resultado['fallidos'] += lote['fallidos']
+            espacio = self.MAX_ERRORES_BULK - len(resultado['errores'])
+            if espacio > 0:
+                resultado['errores'].extend(lote['errores'][:espacio])
+        
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            en_vuelo = set()
+            try:
+                # Documentos sin el valor que necesita la estrategia de _id: fallan sin enviarse
+                def sin_id(documento: Dict, motivo: str):
+                    resultado['fallidos'] += 1
+                    if len(resultado['errores']) < self.MAX_ERRORES_BULK:
+                        resultado['errores'].append({'error': motivo})
+                
+                for numero, (lineas, n_bytes) in enumerate(
+                        self._armar_lotes(index, documentos, lambda: int(controlador.valor), max_bytes_lote,
+                                          estrategia_id, campo_id, operacion, sin_id), 1):
+                    # Esperar cupo: acota los lotes serializados en memoria
+                    while len(en_vuelo) >= 2 * hilos:
+                        completados, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                        for futuro in completados:
+                            acumular(futuro.result())
+                    en_vuelo.add(executor.submit(self._enviar_lote, numero, lineas, n_bytes, controlador))
+            except Exception as e:
+                # Error al leer o serializar los documentos de entrada: los lotes ya enviados se cuentan igual
+                print(f"Error en la carga masiva: {e}")
+                resultado['success'] = False
+                resultado['error'] = str(e)
+            
+            for futuro in as_completed(en_vuelo):
+                acumular(futuro.result())
+        
+        resultado['estadisticas'] = self._estadisticas_bulk(lotes, time.perf_counter() - inicio, hilos)
+        resultado['estadisticas']['tamaño_lote_final'] = int(controlador.valor)
+        est = resultado['estadisticas']
+        print(f"Bulk {index}: {resultado['indexados']} indexados, {resultado['omitidos']} omitidos, "
+              f"{resultado['fallidos']} fallidos en "
+              f"{est['lotes']} lotes, {est['docs_por_segundo']} docs/s, {est['mb_por_segundo']} MB/s, "
+              f"latencia p50 {est['latencia_p50']}s p95 {est['latencia_p95']}s, "
+              f"{est['rechazados']} rechazos (429), lote final {est['tamaño_lote_final']}")
+        return resultado
+    
+    @staticmethod
+    def calcular_id(documento: Dict, estrategia: str, campo: Optional[str] = None) -> Optional[str]:
+        """
+        Calcula el _id determinista de un documento
+        
+        Args:
+            documento: Documento a indexar
+            estrategia: 'contenido', 'origen' o 'campo' (ver ESTRATEGIAS_ID)
+            campo: Campo con el _id ('campo') o con el origen ('origen'; default 'ruta', 'url' u 'origen')
             
         Returns:
-            Diccionario con estadísticas de indexación
+            _id del documento, o None si le falta el valor que necesita la estrategia
         """
-        from elasticsearch.helpers import bulk
+        if estrategia == 'campo':
+            valor = documento.get(campo)
+            return str(valor) if valor not in (None, '') else None
         
+        if estrategia == 'origen':
+            campos = [campo] if campo else ['ruta', 'url', 'origen']
+            origen = next((documento[c] for c in campos if documento.get(c)), None)
+            if origen is None:
+                return None
+            return hashlib.sha256(str(origen).encode('utf-8')).hexdigest()
+        
+        # Contenido: el texto normalizado (Unicode NFKC y espacios colapsados) para que la misma
+        # extracción con otro espaciado dé el mismo _id; sin 'texto', el documento completo ordenado
+        texto = documento.get('texto')
+        if isinstance(texto, str) and texto.strip():
+            contenido = " ".join(unicodedata.normalize('NFKC', texto).split())
+        else:
+            contenido = json.dumps(documento, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _armar_lotes(index: str, documentos: Iterable[Dict], tamaño_lote: Callable[[], int],
+                     max_bytes_lote: int, estrategia_id: Optional[str] = None, campo_id: Optional[str] = None,
+                     operacion: str = 'index',
+                     sin_id: Optional[Callable[[Dict, str], None]] = None) -> Iterator[Tuple[List[bytes], int]]:
+        """
+        Serializa los documentos en líneas NDJSON y los agrupa por cantidad y bytes.
+        El tamaño de lote se consulta al armar cada lote (puede cambiar con AIMD)
+        """
+        accion = json.dumps({operacion: {'_index': index}}).encode('utf-8')
+        lineas = []
+        n_bytes = 0
+        limite = max(1, tamaño_lote())
         try:
-            # Preparar acciones para bulk
-            acciones = []
-            for doc in documentos:
-                accion = {
-                    '_index': index,
-                    '_source': doc
-                }
-                acciones.append(accion)
+            for documento in documentos:
+                if estrategia_id:
+                    doc_id = ElasticSearch.calcular_id(documento, estrategia_id, campo_id)
+                    if doc_id is None:
+                        if sin_id:
+                            sin_id(documento, f"Documento sin valor para la estrategia de _id '{estrategia_id}'")
+                        continue
+                    accion = json.dumps({operacion: {'_index': index, '_id': doc_id}}).encode('utf-8')
+                fuente = json.dumps(documento, ensure_ascii=False, default=str).encode('utf-8')
+                tamaño = len(accion) + len(fuente) + 2
+                # Un documento más grande que el máximo va solo en su lote
+                if lineas and (len(lineas) // 2 >= limite or n_bytes + tamaño > max_bytes_lote):
+                    yield lineas, n_bytes
+                    lineas, n_bytes = [], 0
+                    limite = max(1, tamaño_lote())
+                lineas.extend((accion, fuente))
+                n_bytes += tamaño
+        except Exception:
+            # Error al leer la entrada: el lote abierto se entrega antes de propagar el error
+            # para que sus documentos se envíen y se cuenten
+            if lineas:
+                yield lineas, n_bytes
+            raise
+        if lineas:
+            yield lineas, n_bytes
+    
+    @staticmethod
+    def _es_rechazo(detalle: Dict) -> bool:
+        """Indica si un ítem del _bulk fue rechazado por saturación del clúster"""
+        error = detalle.get('error')
+        tipo = error.get('type', '') if isinstance(error, dict) else str(error or '')
+        return detalle.get('status') == 429 or 'es_rejected_execution_exception' in tipo
+    
+    def _enviar_lote(self, numero: int, lineas: List[bytes], n_bytes: int,
+                     controlador: ControladorAIMD) -> Dict:
+        """
+        Envía un lote con _bulk, reintenta los ítems rechazados (429) con espera
+        exponencial y jitter, y cuenta los ítems correctos y fallidos
+        """
+        lote = {'numero': numero, 'documentos': len(lineas) // 2, 'bytes': n_bytes,
+                'indexados': 0, 'omitidos': 0, 'fallidos': 0, 'errores': [], 'reintentos': 0, 'rechazados': 0}
+        inicio = time.perf_counter()
+        pendientes = lineas
+        intento = 0
+        
+        while pendientes:
+            rechazadas = []
+            rechazos_ultimo = []
+            inicio_peticion = time.perf_counter()
+            try:
+                # Sin reintentos del transporte ante 429 (por defecto reenvía 3 veces sin espera):
+                # los maneja este ciclo, con backoff y solo con los ítems rechazados
+                respuesta = self.client.options(retry_on_status=(502, 503, 504)).bulk(operations=pendientes)
+                latencia = time.perf_counter() - inicio_peticion
+                for i, item in enumerate(respuesta['items']):
+                    # Cada ítem es {'index': {...}} (o create/update/delete)
+                    detalle = next(iter(item.values()))
+                    if self._es_rechazo(detalle):
+                        rechazadas.extend(pendientes[2 * i:2 * i + 2])
+                        rechazos_ultimo.append(item)
+                    elif detalle.get('status') == 409 and 'create' in item:
+                        # create sobre un _id existente: el documento ya estaba cargado
+                        lote['omitidos'] += 1
+                    elif detalle.get('status', 500) >= 300 or 'error' in detalle:
+                        lote['fallidos'] += 1
+                        lote['errores'].append(item)
+                    else:
+                        lote['indexados'] += 1
+            except ApiError as e:
+                latencia = time.perf_counter() - inicio_peticion
+                if e.status_code != 429:
+                    return self._fallar_lote(lote, pendientes, e, inicio)
+                # Rechazo de la petición completa: se reintenta entera
+                rechazadas = pendientes
+                rechazos_ultimo = [{'lote': numero, 'error': str(e)}]
+            except Exception as e:
+                # El lote completo falló (conexión, 413, etc.)
+                return self._fallar_lote(lote, pendientes, e, inicio)
             
-            # Ejecutar bulk
-            success, failed = bulk(self.client, acciones, raise_on_error=False)
+            # AIMD: los rechazos y las latencias altas reducen el tamaño de los lotes siguientes,
+            # una vez por ventana: los lotes en paralelo ven la misma saturación a la vez
+            if rechazadas or latencia > self.bulk_latencia_objetivo:
+                controlador.reducir(ventana=self.bulk_latencia_objetivo)
+            else:
+                controlador.aumentar()
             
-            return {
-                'success': True,
-                'indexados': success,
-                'fallidos': len(failed) if failed else 0,
-                'errores': failed if failed else []
-            }
+            if not rechazadas:
+                break
+            lote['rechazados'] += len(rechazadas) // 2
+            if intento >= self.bulk_reintentos:
+                # Sin más reintentos: los rechazados quedan como fallidos, nunca se descartan en silencio
+                print(f"Lote {numero}: {len(rechazadas) // 2} documentos rechazados después de {intento} reintentos")
+                lote['fallidos'] += len(rechazadas) // 2
+                lote['errores'].extend(rechazos_ultimo)
+                break
+            intento += 1
+            lote['reintentos'] += 1
+            espera = min(self.bulk_espera_maxima, self.bulk_espera_base * (2 ** (intento - 1)))
+            time.sleep(random.uniform(espera / 2, espera))
+            pendientes = rechazadas
+        
+        lote['segundos'] = round(time.perf_counter() - inicio, 4)
+        return lote
+    
+    @staticmethod
+    def _fallar_lote(lote: Dict, pendientes: List[bytes], error: Exception, inicio: float) -> Dict:
+        """Marca como fallidos los documentos pendientes de un lote"""
+        print(f"Error al enviar el lote {lote['numero']} ({len(pendientes) // 2} documentos): {error}")
+        lote['fallidos'] += len(pendientes) // 2
+        lote['errores'].append({'lote': lote['numero'], 'error': str(error)})
+        lote['segundos'] = round(time.perf_counter() - inicio, 4)
+        return lote
+    
+    @staticmethod
+    def _estadisticas_bulk(lotes: List[Dict], segundos: float, hilos: int) -> Dict:
+        """Totales, rendimiento y latencia por lote de una carga masiva"""
+        lotes.sort(key=lambda lote: lote['numero'])
+        documentos = sum(lote['documentos'] for lote in lotes)
+        total_bytes = sum(lote['bytes'] for lote in lotes)
+        latencias = [lote['segundos'] for lote in lotes]
+        for lote in lotes:
+            lote['docs_por_segundo'] = round(lote['documentos'] / lote['segundos'], 1) if lote['segundos'] > 0 else 0.0
+        return {
+            'lotes': len(lotes),
+            'documentos': documentos,
+            'bytes': total_bytes,
+            'hilos': hilos,
+            'segundos': round(segundos, 3),
+            'docs_por_segundo': round(documentos / segundos, 1) if segundos > 0 else 0.0,
+            'mb_por_segundo': round(total_bytes / 1048576 / segundos, 2) if segundos > 0 else 0.0,
+            'latencia_p50': round(Funciones.percentil(latencias, 50), 4),
+            'latencia_p95': round(Funciones.percentil(latencias, 95), 4),
+            'latencia_max': round(max(latencias), 4) if latencias else 0.0,
+            'reintentos': sum(lote['reintentos'] for lote in lotes),
+            'rechazados': sum(lote['rechazados'] for lote in lotes),
+            'detalle_lotes': lotes
+        }
+    
+    @contextmanager
+    def modo_carga_masiva(self, index: str, force_merge: bool = False, max_segmentos: int = 1):
+        """
+        Ajusta el índice para una carga masiva y restaura su configuración al salir
+        
+        Durante la carga se desactiva el refresco (refresh_interval -1) y las
+        réplicas (number_of_replicas 0), así los segmentos no se refrescan ni se
+        replican en cada lote. Mientras tanto las búsquedas no ven los documentos
+        nuevos y el índice queda sin copias, y al salir hay que reconstruir las
+        réplicas: usarlo solo en cargas grandes. Al salir, aunque la carga falle,
+        se restauran los valores anteriores y se refresca el índice; si la carga
+        terminó bien y force_merge es True, se fusionan los segmentos. Las cargas
+        se cuentan por índice real (un alias y el nombre de su índice comparten la
+        cuenta): si hay varias a la vez sobre el mismo índice, la primera guarda
+        la configuración y la última en terminar la restaura.
+        
+        El conteo de cargas es del proceso: con varios procesos (ej: workers de
+        gunicorn) cargando el mismo índice, uno puede leer la configuración ya
+        ajustada por otro. Por eso un refresh_interval de -1 nunca se restaura
+        (se vuelve al default del clúster) y un índice que ya tiene 0 réplicas
+        no se toca: la carga que las quitó es la que restaura el valor real.
+        
+        Args:
+            index: Nombre del índice o alias (se ajusta cada índice al que apunta)
+            force_merge: Si True, fusiona los segmentos al terminar una carga exitosa
+            max_segmentos: Segmentos por shard después de la fusión
+            
+        Returns:
+            Diccionario 'carga' con 'exito' (True): quien carga debe poner False si la
+            carga falló sin lanzar una excepción (ej: resultado['success'] de indexar_bulk)
+            
+        Ejemplo:
+            with elastic.modo_carga_masiva('mi_indice') as carga:
+                resultado = elastic.indexar_bulk('mi_indice', documentos)
+                carga['exito'] = resultado['success']
+        """
+        indices = self._indices_reales(index)
+        
+        # Registrar la carga en cada índice real. Las llamadas al clúster se hacen
+        # fuera del lock para que un clúster lento no frene las cargas de otros índices:
+        # quien llega primero ajusta el índice y las demás cargas esperan su evento
+        propios = []
+        esperas = []
+        with self._lock_cargas:
+            for nombre in indices:
+                estado = self._cargas_activas.get(nombre)
+                if estado is None:
+                    estado = self._cargas_activas[nombre] = {
+                        'cargas': 0, 'fallidas': 0, 'anterior': None, 'listo': threading.Event()
+                    }
+                    propios.append((nombre, estado))
+                else:
+                    esperas.append(estado['listo'])
+                estado['cargas'] += 1
+        
+        carga = {'exito': True}
+        exito = False
+        try:
+            try:
+                if propios:
+                    anteriores = self._ajustar_para_carga([nombre for nombre, _ in propios])
+                    with self._lock_cargas:
+                        for nombre, estado in propios:
+                            estado['anterior'] = anteriores.get(nombre)
+            finally:
+                for _, estado in propios:
+                    estado['listo'].set()
+            for listo in esperas:
+                listo.wait()
+            yield carga
+            exito = bool(carga['exito'])
+        finally:
+            restaurar = {}
+            fallidas = False
+            with self._lock_cargas:
+                for nombre in indices:
+                    estado = self._cargas_activas[nombre]
+                    estado['cargas'] -= 1
+                    if not exito:
+                        estado['fallidas'] += 1
+                    if estado['cargas'] == 0:
+                        del self._cargas_activas[nombre]
+                        restaurar[nombre] = estado['anterior']
+                        fallidas = fallidas or bool(estado['fallidas'])
+            if restaurar:
+                # Solo se fusiona si ninguna de las cargas concurrentes falló
+                self._restaurar_despues_de_carga(index, restaurar, force_merge and not fallidas, max_segmentos)
+    
+    def _indices_reales(self, index: str) -> List[str]:
+        """Retorna los índices reales a los que apunta index (un alias puede apuntar a varios)"""
+        try:
+            return list(self.client.indices.get_settings(index=index, name='index.refresh_interval'))
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+            print(f"Modo carga masiva: no se pudo leer la configuración de {index} ({e}). Se carga sin ajustes")
+            return []
     
-    def buscar(self, index: str, query: Dict, aggs=None, size: int = 10) -> Dict:
+    def _ajustar_para_carga(self, indices: List[str]) -> Dict:
+        """
+        Guarda refresh_interval y number_of_replicas de cada índice real y los
+        ajusta para la carga. Retorna {índice: valores anteriores}
+        """
+        try:
+            respuesta = self.client.indices.get_settings(index=','.join(indices),
+                                                         name='index.refresh_interval,index.number_of_replicas')
+        except Exception as e:
+            print(f"Modo carga masiva: no se pudo leer la configuración de {','.join(indices)} ({e}). Se carga sin ajustes")
+            return {}
+        
+        anteriores = {}
+        for nombre in respuesta:
+            actuales = respuesta[nombre].get('settings', {}).get('index', {})
+            refresco = actuales.get('refresh_interval')
+            replicas = actuales.get('number_of_replicas')
+            # Un valor ausente es el default del clúster: al restaurar se envía null. Un -1 no se
+            # restaura y 0 réplicas no se tocan: pueden venir de otra carga en curso en otro proceso
+            anterior = {'refresh_interval': None if refresco == '-1' else refresco}
+            ajuste = {'refresh_interval': '-1'}
+            if str(replicas) != '0':
+                anterior['number_of_replicas'] = replicas
+                ajuste['number_of_replicas'] = 0
+            try:
+                self.client.indices.put_settings(index=nombre, settings={'index': ajuste})
+            except Exception as e:
+                if 'number_of_replicas' not in ajuste:
+                    print(f"Modo carga masiva: no se pudo desactivar el refresco de {nombre} ({e})")
+                    continue
+                # Algunos despliegues (ej: serverless) no permiten cambiar las réplicas
+                print(f"Modo carga masiva: no se pudieron quitar las réplicas de {nombre} ({e})")
+                anterior.pop('number_of_replicas')
+                try:
+                    self.client.indices.put_settings(index=nombre, settings={'index': {'refresh_interval': '-1'}})
+                except Exception as e:
+                    print(f"Modo carga masiva: no se pudo desactivar el refresco de {nombre} ({e})")
+                    continue
+            anteriores[nombre] = anterior
+            print(f"Modo carga masiva en {nombre}: ajustado {ajuste} (antes: {anterior})")
+        return anteriores
+    
+    def _restaurar_despues_de_carga(self, index: str, anteriores: Dict, force_merge: bool,
+                                    max_segmentos: int):
+        """
+        Restaura la configuración anterior de cada índice real, los refresca y
+        opcionalmente fusiona sus segmentos
+        """
+        for nombre, anterior in anteriores.items():
+            if not anterior:
+                continue
+            try:
+                self.client.indices.put_settings(index=nombre, settings={'index': anterior})
+                print(f"Modo carga masiva en {nombre}: configuración restaurada {anterior}")
+            except Exception as e:
+                print(f"❌ Modo carga masiva: no se pudo restaurar la configuración de {nombre} {anterior}: {e}")
+        indices = ','.join(anteriores)
+        try:
+            self.client.indices.refresh(index=indices)
+            # Con el refresco desactivado los documentos recién se ven ahora
+            self._invalidar_cache(index)
+            for nombre in anteriores:
+                self._invalidar_cache(nombre)
+            if force_merge:
+                inicio = time.perf_counter()
+                # La fusión puede tardar mucho más que el timeout normal de una petición
+                self.client.options(request_timeout=3600).indices.forcemerge(
+                    index=indices, max_num_segments=max_segmentos
+                )
+                print(f"Modo carga masiva en {indices}: segmentos fusionados en {time.perf_counter() - inicio:.1f}s")
+        except Exception as e:
+            print(f"Modo carga masiva: error al refrescar o fusionar {indices}: {e}")
+    
+    def buscar(self, index: str, query: Dict, aggs=None, size: int = 10, desde: int = 0,
+               usar_cache: bool = True) -> Dict:
         """
         Realiza una búsqueda en ElasticSearch
         
@@ -206,6 +696,11 @@ class ElasticSearch:
             query: Query de búsqueda (puede ser un dict completo con 'query' o solo la query)
             aggs: Agregaciones a ejecutar (opcional)
             size: Número de resultados
+            desde: Posición del primer resultado (paginación)
+            usar_cache: Si True y hay cache_busqueda, sirve y guarda el resultado en la caché
+            
+        Returns:
+            Diccionario con 'success', 'total', 'resultados', 'aggs' y 'desde_cache'
         """
         try:
             # Construir el body de la búsqueda
@@ -215,21 +710,38 @@ class ElasticSearch:
             if aggs:
                 body['aggs'] = aggs
             
+            cache = self.cache_busqueda if usar_cache else None
+            if cache is not None:
+                # La clave es el body completo en forma canónica (query, campo, aggs) más la página
+                clave = (index, json.dumps(body, sort_keys=True, ensure_ascii=False, default=str), size, desde)
+                guardado = cache.obtener(index, clave)
+                if guardado is not None:
+                    return {**guardado, 'desde_cache': True}
+                generacion = cache.generacion(index)
+            
             # Ejecutar búsqueda
-            response = self.client.search(index=index, body=body, size=size)
+            response = self.client.search(index=index, body=body, size=size, from_=desde)
             
-            return {
+            resultado = {
                 'success': True,
                 'total': response['hits']['total']['value'],
                 'resultados': response['hits']['hits'],
                 'aggs': aggs
             }
+            if cache is not None:
+                cache.guardar(index, clave, resultado, generacion)
+            return {**resultado, 'desde_cache': False}
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def _invalidar_cache(self, index: Optional[str]):
+        """Invalida las búsquedas en caché del índice después de una escritura"""
+        if self.cache_busqueda is not None:
+            self.cache_busqueda.invalidar(index)
+    
     def ejecutar_query(self, query_json: str) -> Dict:
         """
         Ejecuta una query en ElasticSearch
@@ -278,46 +790,52 @@ class ElasticSearch:
             
             operacion = comando.get('operacion')
             
-            if operacion == 'index' or operacion == 'create':
-                # Indexar documento
-                index = comando.get('index')
-                documento = comando.get('documento', comando.get('body', {}))
-                doc_id = comando.get('id')
+            try:
+                if operacion == 'index' or operacion == 'create':
+                    # Indexar documento
+                    index = comando.get('index')
+                    documento = comando.get('documento', comando.get('body', {}))
+                    doc_id = comando.get('id')
                 
-                if doc_id:
-                    response = self.client.index(index=index, id=doc_id, document=documento)
-                else:
-                    response = self.client.index(index=index, document=documento)
+                    if doc_id:
+                        response = self.client.index(index=index, id=doc_id, document=documento)
+                    else:
+                        response = self.client.index(index=index, document=documento)
                 
-                return {'success': True, 'data': response}
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'update':
-                # Actualizar documento
-                index = comando.get('index')
-                doc_id = comando.get('id')
-                doc = comando.get('doc', comando.get('documento', {}))
+                elif operacion == 'update':
+                    # Actualizar documento
+                    index = comando.get('index')
+                    doc_id = comando.get('id')
+                    doc = comando.get('doc', comando.get('documento', {}))
                 
-                response = self.client.update(index=index, id=doc_id, doc=doc)
-                return {'success': True, 'data': response}
+                    response = self.client.update(index=index, id=doc_id, doc=doc)
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'delete':
-                # Eliminar documento
-                index = comando.get('index')
-                doc_id = comando.get('id')
+                elif operacion == 'delete':
+                    # Eliminar documento
+                    index = comando.get('index')
+                    doc_id = comando.get('id')
                 
-                response = self.client.delete(index=index, id=doc_id)
-                return {'success': True, 'data': response}
+                    response = self.client.delete(index=index, id=doc_id)
+                    return {'success': True, 'data': response}
                 
-            elif operacion == 'delete_by_query':
-                # Eliminar por query
-                index = comando.get('index')
-                query = comando.get('query', {})
+                elif operacion == 'delete_by_query':
+                    # Eliminar por query
+                    index = comando.get('index')
+                    query = comando.get('query', {})
                 
-                response = self.client.delete_by_query(index=index, body={'query': query})
-                return {'success': True, 'data': response}
+                    response = self.client.delete_by_query(index=index, body={'query': query})
+                    return {'success': True, 'data': response}
                 
-            else:
-                return {'success': False, 'error': f'Operación DML no soportada: {operacion}'}
+                else:
+                    return {'success': False, 'error': f'Operación DML no soportada: {operacion}'}
+            finally:
+                # Cualquier DML puede cambiar los resultados de búsqueda del índice (aunque falle a
+                # medias); se invalida después de la escritura para que una búsqueda hecha mientras
+                # tanto no quede guardada como vigente
+                self._invalidar_cache(comando.get('index'))
                 
         except json.JSONDecodeError as e:
             return {'success': False, 'error': f'JSON inválido: {str(e)}'}
@@ -354,7 +872,7 @@ class ElasticSearch:
                     }
                 }
             
-            return self.buscar(index, query, size)
+            return self.buscar(index, query, size=size)
         except Exception as e:
             return {
                 'success': False,
@@ -374,6 +892,7 @@ class ElasticSearch:
         """Actualiza un documento existente"""
         try:
             self.client.update(index=index, id=doc_id, doc=datos)
+            self._invalidar_cache(index)
             return True
         except Exception as e:
             print(f"Error al actualizar documento: {e}")
@@ -383,6 +902,7 @@ class ElasticSearch:
         """Elimina un documento"""
         try:
             self.client.delete(index=index, id=doc_id)
+            self._invalidar_cache(index)
             return True
         except Exception as e:
             print(f"Error al eliminar documento: {e}")
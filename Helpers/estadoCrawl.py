@@ -0,0 +1,190 @@
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+
+class EstadoCrawl:
+    """
+    Estado persistente de un rastreo como bitácora de solo-anexar.
+
+    Cada evento (link descubierto, página encolada, página visitada, archivo
+    descargado) se agrega como una línea JSON a '<json>.log'. Cada cierto número de eventos
+    el estado se compacta en el propio archivo JSON (que mantiene la clave
+    "links", compatible con el links.json de siempre) y la bitácora se vacía.
+    Si el proceso se interrumpe, el estado se reconstruye con el último
+    checkpoint más los eventos de la bitácora.
+    """
+
+    def __init__(self, json_file_path: str, intervalo_checkpoint: int = 500):
+        """
+        Inicializa el estado
+
+        Args:
+            json_file_path: Ruta del checkpoint JSON (la bitácora es <ruta>.log)
+            intervalo_checkpoint: Eventos entre checkpoints compactados
+        """
+        self.json_file_path = json_file_path
+        self.ruta_log = f"{json_file_path}.log"
+        self.intervalo_checkpoint = max(1, intervalo_checkpoint)
+        self._lock = threading.Lock()
+        self._archivo_log = None
+        self._eventos_pendientes = 0
+
+        # Estado en memoria: 'links', 'encoladas', 'visitadas', 'descargados' y 'completado'
+        self.datos = self.leer(json_file_path)
+
+    @staticmethod
+    def leer(json_file_path: str) -> Dict:
+        """
+        Reconstruye el estado desde el checkpoint y la bitácora sin modificarlos
+
+        Returns:
+            Diccionario con 'links' (lista), 'encoladas' (lista de URLs que
+            entraron a la cola de visitas, None si el checkpoint es anterior a
+            este evento), 'visitadas' (set), 'descargados' (dict url -> info)
+            y 'completado' (bool)
+        """
+        datos = {'links': [], 'encoladas': [], 'visitadas': set(), 'descargados': {}, 'completado': False}
+
+        if os.path.exists(json_file_path):
+            try:
+                with open(json_file_path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+                datos['links'] = checkpoint.get('links', [])
+                datos['encoladas'] = checkpoint.get('encoladas')
+                datos['visitadas'] = set(checkpoint.get('visitadas', []))
+                datos['descargados'] = checkpoint.get('descargados', {})
+                datos['completado'] = checkpoint.get('completado', False)
+            except json.JSONDecodeError:
+                print(f"Advertencia: {json_file_path} contiene JSON inválido. Se usará solo la bitácora.")
+
+        ruta_log = f"{json_file_path}.log"
+        if os.path.exists(ruta_log):
+            eventos = 0
+            with open(ruta_log, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        evento = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea truncada por una interrupción
+                        continue
+                    EstadoCrawl._aplicar(datos, evento)
+                    eventos += 1
+            if eventos:
+                print(f"Reaplicados {eventos} eventos de {ruta_log}")
+
+        return datos
+
+    @staticmethod
+    def _aplicar(datos: Dict, evento: Dict):
+        """Aplica un evento de la bitácora sobre el estado"""
+        tipo = evento.get('evento')
+        if tipo == 'link':
+            datos['links'].append(evento['link'])
+        elif tipo == 'encolada':
+            if datos['encoladas'] is None:
+                datos['encoladas'] = []
+            datos['encoladas'].append(evento['url'])
+        elif tipo == 'visitada':
+            datos['visitadas'].add(evento['url'])
+        elif tipo == 'descargado':
+            datos['descargados'][evento['url']] = evento.get('info', {})
+        elif tipo == 'fin':
+            datos['completado'] = True
+
+    def _anexar(self, evento: Dict):
+        """Agrega un evento a la bitácora y compacta si corresponde"""
+        with self._lock:
+            if self._archivo_log is None:
+                directorio = os.path.dirname(self.json_file_path)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                self._archivo_log = open(self.ruta_log, 'a', encoding='utf-8')
+                if self._termina_en_linea_incompleta():
+                    self._archivo_log.write('\n')
+            self._archivo_log.write(json.dumps(evento, ensure_ascii=False) + '\n')
+            self._archivo_log.flush()
+            self._aplicar(self.datos, evento)
+            self._eventos_pendientes += 1
+            if self._eventos_pendientes >= self.intervalo_checkpoint:
+                self._checkpoint()
+
+    def _termina_en_linea_incompleta(self) -> bool:
+        """Detecta si la bitácora quedó con una línea a medio escribir"""
+        if os.path.getsize(self.ruta_log) == 0:
+            return False
+        with open(self.ruta_log, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def registrar_link(self, link: Dict):
+        """Registra un link descubierto"""
+        self._anexar({'evento': 'link', 'link': link})
+
+    def registrar_encolada(self, url: str):
+        """Registra una página que entró a la cola de visitas"""
+        self._anexar({'evento': 'encolada', 'url': url})
+
+    def registrar_visitada(self, url: str):
+        """Registra una página cuyos links ya fueron registrados"""
+        self._anexar({'evento': 'visitada', 'url': url})
+
+    def registrar_descarga(self, url: str, info: Optional[Dict] = None):
+        """Registra un archivo descargado"""
+        self._anexar({'evento': 'descargado', 'url': url, 'info': info or {}})
+
+    def marcar_completado(self):
+        """Registra que el rastreo terminó normalmente"""
+        self._anexar({'evento': 'fin'})
+
+    def _checkpoint(self):
+        """Escribe el estado compactado y vacía la bitácora (requiere el lock)"""
+        directorio = os.path.dirname(self.json_file_path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        # De la cola solo interesan las páginas que aún no se visitaron
+        encoladas = self.datos['encoladas']
+        if encoladas is not None:
+            encoladas = [url for url in encoladas if url not in self.datos['visitadas']]
+            self.datos['encoladas'] = encoladas
+
+        temporal = f"{self.json_file_path}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'links': self.datos['links'],
+                'encoladas': encoladas,
+                'visitadas': sorted(self.datos['visitadas']),
+                'descargados': self.datos['descargados'],
+                'completado': self.datos['completado']
+            }, f, ensure_ascii=False)
+        os.replace(temporal, self.json_file_path)
+
+        # El checkpoint ya contiene todos los eventos: la bitácora puede vaciarse
+        if self._archivo_log is not None:
+            self._archivo_log.close()
+            self._archivo_log = None
+        if os.path.exists(self.ruta_log):
+            os.remove(self.ruta_log)
+        self._eventos_pendientes = 0
+
+    def checkpoint(self):
+        """Fuerza un checkpoint compactado"""
+        with self._lock:
+            self._checkpoint()
+
+    def reiniciar(self):
+        """
+        Descarta el estado del rastreo para comenzar uno nuevo. Los archivos
+        descargados se conservan (y se escriben en el checkpoint) porque la
+        descarga que sigue al rastreo nuevo debe poder omitirlos.
+        """
+        with self._lock:
+            self.datos = {'links': [], 'encoladas': [], 'visitadas': set(),
+                          'descargados': self.datos['descargados'], 'completado': False}
+            self._checkpoint()
+
+    def cerrar(self):
+        """Compacta el estado y cierra la bitácora"""
+        self.checkpoint()
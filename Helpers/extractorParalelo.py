@@ -0,0 +1,201 @@
+import os
+import time
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional
+
+from Helpers.funciones import Funciones, PERFILES_OCR, PERFIL_OCR_DEFAULT
+from Helpers.almacenDocumentos import AlmacenDocumentos
+from Helpers.cacheExtraccion import CacheExtraccion
+
+
+class _TiempoAgotado(BaseException):
+    # BaseException: los 'except Exception' de las funciones de extracción no deben atraparla
+    pass
+
+
+def _alarma(signum, frame):
+    raise _TiempoAgotado()
+
+
+def _extraer_en_worker(ruta: str, extension: str, timeout: Optional[float],
+                       ocr_workers: int, perfil_ocr: str) -> Dict:
+    """Extrae el texto de un archivo dentro de un proceso del pool"""
+    inicio = time.perf_counter()
+    # El proceso atiende un archivo a la vez: el límite de hilos de tesseract solo lo afecta a él
+    Funciones.limitar_hilos_tesseract(perfil_ocr)
+    # El límite de tiempo se aplica dentro del proceso con SIGALRM (no existe en Windows)
+    usar_alarma = bool(timeout) and hasattr(signal, 'setitimer')
+    if usar_alarma:
+        signal.signal(signal.SIGALRM, _alarma)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        extraido = Funciones.extraer_texto_archivo(ruta, extension, ocr_workers=ocr_workers, perfil_ocr=perfil_ocr)
+        return {**extraido, 'error': None, 'duracion_segundos': round(time.perf_counter() - inicio, 3)}
+    except _TiempoAgotado:
+        return {'texto': '', 'metodo': None, 'paginas': [], 'error': f'Tiempo agotado ({timeout}s)',
+                'duracion_segundos': round(time.perf_counter() - inicio, 3)}
+    finally:
+        if usar_alarma:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ExtractorParalelo:
+    """
+    Extracción de texto de muchos archivos en un pool de procesos.
+
+    Cada archivo se procesa en un proceso distinto (PyPDF2 y el OCR son
+    intensivos en CPU y el GIL impide aprovechar varios núcleos con hilos).
+    Los resultados se entregan a medida que terminan, no en el orden de entrada.
+    Con una CacheExtraccion, los archivos cuyo contenido ya fue extraído con el
+    mismo perfil se entregan de inmediato sin pasar por el pool.
+
+    El pool es uno solo para toda la vida del extractor y lo comparten las
+    peticiones. Los procesos se crean con fork, que en un proceso con hilos
+    puede heredar locks tomados por otro hilo y bloquearse: llamar a iniciar()
+    al arrancar la aplicación, antes de crear conexiones o pools de hilos.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout_archivo: Optional[float] = 300,
+                 perfil_ocr: str = PERFIL_OCR_DEFAULT, cache: Optional[CacheExtraccion] = None):
+        """
+        Inicializa el extractor (el pool se crea con iniciar() o en la primera extracción)
+
+        Args:
+            max_workers: Procesos del pool (None para usar todos los núcleos)
+            timeout_archivo: Segundos máximos por archivo (None para no limitar)
+            perfil_ocr: Perfil de OCR por defecto de PERFILES_OCR ('rapido', 'balanceado' o 'preciso')
+            cache: Caché de extracción por contenido (None para extraer siempre)
+        """
+        if perfil_ocr not in PERFILES_OCR:
+            raise ValueError(f"Perfil de OCR desconocido: {perfil_ocr}. Opciones: {', '.join(PERFILES_OCR)}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout_archivo = timeout_archivo
+        self.perfil_ocr = perfil_ocr
+        self.cache = cache
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock_pool = threading.Lock()
+
+    def iniciar(self):
+        """Crea el pool y lanza todos sus procesos ahora (con fork se lanzan juntos en el primer envío)"""
+        self._obtener_pool().submit(os.getpid).result()
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        """Retorna el pool, creándolo si no existe o si un proceso murió y lo dejó inservible"""
+        with self._lock_pool:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _descartar_pool(self, pool: ProcessPoolExecutor):
+        """Descarta un pool roto para que la próxima extracción cree otro"""
+        with self._lock_pool:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extraer(self, archivos: List[Dict], perfil_ocr: Optional[str] = None,
+                max_workers: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Extrae el texto de los archivos en paralelo
+
+        Args:
+            archivos: Lista de diccionarios con 'ruta', 'extension' y opcionalmente 'nombre'
+            perfil_ocr: Perfil de OCR de esta extracción (None para el del extractor)
+            max_workers: Archivos de esta extracción procesados a la vez (None para todo el pool)
+
+        Returns:
+            Iterador de diccionarios en orden de finalización con el archivo original
+            ('archivo'), 'texto', 'metodo', 'paginas' (método y tiempo por página),
+            'parcial' (falló el OCR de alguna página), 'error', 'duracion_segundos' y 'desde_cache'
+        """
+        perfil_ocr = perfil_ocr or self.perfil_ocr
+        if perfil_ocr not in PERFILES_OCR:
+            raise ValueError(f"Perfil de OCR desconocido: {perfil_ocr}. Opciones: {', '.join(PERFILES_OCR)}")
+
+        pendientes = []
+        hashes = {}
+        for archivo in archivos:
+            ruta = archivo.get('ruta')
+            if not ruta or not os.path.exists(ruta):
+                yield {'archivo': archivo, 'texto': '', 'metodo': None, 'paginas': [],
+                       'error': 'Archivo no encontrado', 'duracion_segundos': 0.0, 'desde_cache': False}
+                continue
+            
+            if self.cache is not None:
+                # El hash se calcula aquí y no se toma del cliente: la clave debe ser el contenido real
+                inicio = time.perf_counter()
+                hash_contenido = AlmacenDocumentos.calcular_hash(ruta)
+                guardado = self.cache.obtener(hash_contenido, perfil_ocr)
+                if guardado is not None:
+                    yield {'archivo': archivo, **guardado, 'parcial': False, 'error': None, 'desde_cache': True,
+                           'duracion_segundos': round(time.perf_counter() - inicio, 3)}
+                    continue
+                hashes[id(archivo)] = hash_contenido
+            pendientes.append(archivo)
+
+        if not pendientes:
+            return
+
+        workers = min(max_workers or self.max_workers, self.max_workers, len(pendientes))
+        # Los núcleos que sobran del pool se usan para OCR de páginas en paralelo dentro de cada
+        # archivo, contando los hilos de cada tesseract para no sobresuscribir la CPU
+        hilos = PERFILES_OCR[perfil_ocr]['hilos_tesseract']
+        ocr_workers = max(1, (os.cpu_count() or 1) // (workers * hilos))
+        pool = self._obtener_pool()
+        # Solo 'workers' archivos en vuelo: el pool es compartido con otras extracciones
+        futuros = {}
+        try:
+            while pendientes or futuros:
+                while pendientes and len(futuros) < workers:
+                    archivo = pendientes.pop(0)
+                    try:
+                        futuro = pool.submit(_extraer_en_worker, archivo['ruta'], archivo.get('extension', '').lower(),
+                                             self.timeout_archivo, ocr_workers, perfil_ocr)
+                    except BrokenProcessPool:
+                        # Otra extracción rompió el pool: se sigue con uno nuevo
+                        self._descartar_pool(pool)
+                        pool = self._obtener_pool()
+                        pendientes.insert(0, archivo)
+                        continue
+                    futuros[futuro] = archivo
+
+                completados, _ = wait(futuros, return_when=FIRST_COMPLETED)
+                for futuro in completados:
+                    archivo = futuros.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except BrokenProcessPool:
+                        # Un proceso murió (ej: sin memoria): los archivos que quedaban en él fallan
+                        self._descartar_pool(pool)
+                        resultado = {'texto': '', 'metodo': None, 'paginas': [], 'duracion_segundos': 0.0,
+                                     'error': 'El proceso de extracción terminó inesperadamente'}
+                    except _TiempoAgotado:
+                        # La alarma llegó justo al terminar, fuera del try del worker
+                        resultado = {'texto': '', 'metodo': None, 'paginas': [], 'duracion_segundos': 0.0,
+                                     'error': f'Tiempo agotado ({self.timeout_archivo}s)'}
+                    except Exception as e:
+                        resultado = {'texto': '', 'metodo': None, 'paginas': [], 'duracion_segundos': 0.0,
+                                     'error': str(e)}
+
+                    if resultado['error']:
+                        print(f"Error al extraer {archivo.get('nombre') or archivo['ruta']}: {resultado['error']}")
+                    elif self.cache is not None and resultado['texto'] and not resultado.get('parcial'):
+                        # Sin texto o con páginas fallidas no se guarda: puede deberse a que falta
+                        # tesseract y no al documento. Sin OCR, el resultado sirve para cualquier perfil
+                        usa_ocr = any(pagina.get('ocr_intentado') for pagina in resultado['paginas'])
+                        self.cache.guardar(hashes[id(archivo)], perfil_ocr if usa_ocr else None, resultado)
+                    yield {'archivo': archivo, **resultado, 'desde_cache': False}
+        finally:
+            # Si quien consume deja de iterar, los archivos de esta extracción no siguen ocupando el pool
+            for futuro in futuros:
+                futuro.cancel()
+
+    def cerrar(self):
+        """Termina los procesos del pool"""
+        with self._lock_pool:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
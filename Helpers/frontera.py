@@ -0,0 +1,160 @@
+import re
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, quote
+from typing import Dict, Iterable, List, Optional
+
+# Caracteres no reservados (RFC 3986): si llegan codificados se decodifican
+_NO_RESERVADOS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+# Caracteres permitidos sin codificar en ruta y query
+_SEGUROS_RUTA = "/:@!$&'()*+,;=" + "-._~"
+_SEGUROS_QUERY = "/?:@!$'()*+,;=" + "-._~"
+_PUERTOS_DEFECTO = {'http': 80, 'https': 443}
+_PATRON_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+
+def _normalizar_escapes(texto: str, seguros: str) -> str:
+    """
+    Normaliza la codificación porcentual de un componente de la URL:
+    decodifica los caracteres no reservados, pasa a mayúsculas el resto
+    de escapes y codifica lo que no debería ir en claro (espacios, tildes...)
+    """
+    def _reemplazar(match):
+        caracter = chr(int(match.group(1), 16))
+        if caracter in _NO_RESERVADOS:
+            return caracter
+        return '%' + match.group(1).upper()
+
+    texto = _PATRON_ESCAPE.sub(_reemplazar, texto)
+    return quote(texto, safe=seguros + '%')
+
+
+def canonicalizar_url(url: str) -> str:
+    """
+    Retorna la forma canónica de una URL para usarla como clave de deduplicación.
+
+    - Esquema y host en minúsculas, sin puerto por defecto
+    - Sin fragmento (#...)
+    - Parámetros de la query ordenados
+    - Codificación porcentual normalizada (%20 y ' ' son equivalentes)
+    """
+    try:
+        partes = urlsplit(url.strip())
+    except ValueError:
+        return url
+
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or '').lower()
+    try:
+        puerto = partes.port
+    except ValueError:
+        puerto = None
+
+    netloc = host
+    if partes.username:
+        credenciales = partes.username
+        if partes.password:
+            credenciales += f':{partes.password}'
+        netloc = f'{credenciales}@{netloc}'
+    if puerto and puerto != _PUERTOS_DEFECTO.get(esquema):
+        netloc += f':{puerto}'
+
+    ruta = _normalizar_escapes(partes.path, _SEGUROS_RUTA) or '/'
+
+    parametros = [p for p in partes.query.split('&') if p]
+    query = '&'.join(sorted(_normalizar_escapes(p, _SEGUROS_QUERY) for p in parametros))
+
+    return urlunsplit((esquema, netloc, ruta, query, ''))
+
+
+class FronteraURL:
+    """
+    Frontera de rastreo: links descubiertos, cola de páginas por visitar y
+    conjunto de páginas visitadas. Todas las comprobaciones de pertenencia
+    se hacen sobre URLs canónicas en conjuntos hash (O(1)) y la cola es un
+    deque, por lo que el rastreo completo es lineal en el número de links.
+    """
+
+    def __init__(self, links: Optional[Iterable[Dict]] = None):
+        """
+        Inicializa la frontera
+
+        Args:
+            links: Links ya conocidos (ej: cargados desde links.json)
+        """
+        self.links: List[Dict] = []
+        self._vistos = set()
+        self._cola = deque()
+        self._encolados = set()
+        self._visitados = set()
+
+        for link in links or []:
+            self.agregar_link(link)
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalizar_url(url) in self._vistos
+
+    @property
+    def visitados(self) -> set:
+        """Conjunto de URLs canónicas ya visitadas"""
+        return self._visitados
+
+    def agregar_link(self, link: Dict) -> bool:
+        """
+        Registra un link descubierto guardando su URL canónica
+
+        Returns:
+            True si el link es nuevo, False si ya estaba registrado
+        """
+        url = canonicalizar_url(link['url'])
+        if url in self._vistos:
+            return False
+        self._vistos.add(url)
+        self.links.append({**link, 'url': url})
+        return True
+
+    def encolar(self, url: str) -> bool:
+        """
+        Agrega una URL a la cola de visitas si no fue visitada ni encolada antes
+
+        Returns:
+            True si la URL quedó en la cola
+        """
+        url = canonicalizar_url(url)
+        if url in self._visitados or url in self._encolados:
+            return False
+        self._encolados.add(url)
+        self._cola.append(url)
+        return True
+
+    def siguiente(self) -> Optional[str]:
+        """Retorna la siguiente URL pendiente de visitar (o None si la cola está vacía)"""
+        while self._cola:
+            url = self._cola.popleft()
+            self._encolados.discard(url)
+            if url not in self._visitados:
+                return url
+        return None
+
+    def hay_pendientes(self) -> bool:
+        """Indica si quedan URLs en la cola"""
+        return bool(self._cola)
+
+    def pendientes(self) -> int:
+        """Número de URLs en la cola"""
+        return len(self._cola)
+
+    def marcar_visitada(self, url: str) -> bool:
+        """
+        Marca una URL como visitada
+
+        Returns:
+            True si no había sido visitada antes
+        """
+        url = canonicalizar_url(url)
+        if url in self._visitados:
+            return False
+        self._visitados.add(url)
+        return True
@@ -1,13 +1,226 @@
+import io
 import os
+import math
+import zlib
 import zipfile
 import requests
 import json
+import time
+import random
 import PyPDF2
+from PyPDF2.errors import PdfReadError
 from PIL import Image
 import pytesseract
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from Helpers.zipRemoto import ZipRemoto
+
+# Perfiles de OCR: resolución de rasterizado, preprocesamiento de la imagen,
+# modo de tesseract (--oem 1 = LSTM, --psm 6 = un bloque de texto uniforme,
+# --psm 3 = segmentación automática) e hilos de cada proceso tesseract
+PERFILES_OCR = {
+    'rapido': {
+        'dpi': 150, 'escala_grises': True, 'binarizar': False, 'enderezar': False,
+        'config': '--oem 1 --psm 6', 'hilos_tesseract': 1
+    },
+    'balanceado': {
+        'dpi': 200, 'escala_grises': True, 'binarizar': True, 'enderezar': False,
+        'config': '--oem 1 --psm 3', 'hilos_tesseract': 1
+    },
+    'preciso': {
+        'dpi': 300, 'escala_grises': True, 'binarizar': True, 'enderezar': True,
+        'config': '--oem 1 --psm 3', 'hilos_tesseract': 2
+    },
+}
+PERFIL_OCR_DEFAULT = 'balanceado'
+
+# Versión de la lógica de extracción de texto: cambiarla invalida la caché de extracción
+VERSION_EXTRACTOR = '1'
+
+class _LectorJSON:
+    """
+    Lector incremental de JSON sobre un archivo de texto.
+    
+    Mantiene un buffer de tamaño acotado y decodifica un valor a la vez con
+    JSONDecoder.raw_decode, leyendo más del archivo solo cuando el valor
+    actual no cabe en el buffer. Permite recorrer objetos y arreglos sin
+    decodificarlos completos, para llegar a la lista de registros y
+    entregarlos de a uno. Un valor que no cabe en tamaño_maximo caracteres
+    se reporta como JSON malformado en lugar de seguir creciendo el buffer.
+    """
+    
+    _decoder = json.JSONDecoder()
+    
+    # Caracteres finales del buffer donde un error puede deberse a un valor
+    # cortado por el bloque (el literal más largo es '-Infinity')
+    _COLA_INCOMPLETA = 9
+    
+    def __init__(self, archivo, tamaño_bloque: int = 65536, tamaño_maximo: int = 67108864):
+        self.archivo = archivo
+        self.tamaño_bloque = tamaño_bloque
+        self.tamaño_maximo = max(tamaño_maximo, tamaño_bloque)
+        self.buffer = ""
+        self.pos = 0
+        self.desplazamiento = 0
+        self.fin = False
+    
+    def _leer_mas(self, minimo: int = 0) -> bool:
+        """Agrega texto al buffer descartando lo ya consumido. Retorna False al final del archivo"""
+        if self.fin:
+            return False
+        pendiente = len(self.buffer) - self.pos
+        cantidad = min(max(self.tamaño_bloque, minimo), self.tamaño_maximo - pendiente)
+        if cantidad <= 0:
+            raise json.JSONDecodeError(f"Un valor supera el máximo de {self.tamaño_maximo} caracteres",
+                                       self.buffer, self.pos)
+        self.desplazamiento += self.pos
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        bloque = self.archivo.read(cantidad)
+        if not bloque:
+            self.fin = True
+            return False
+        self.buffer += bloque
+        return True
+    
+    def caracter(self) -> str:
+        """Retorna el siguiente carácter no blanco sin consumirlo ('' al final del archivo)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._leer_mas():
+                return ''
+    
+    def esperar(self, caracteres: str) -> str:
+        """Consume el siguiente carácter no blanco, que debe ser uno de 'caracteres'"""
+        c = self.caracter()
+        if not c or c not in caracteres:
+            raise json.JSONDecodeError(f"Se esperaba uno de {caracteres!r}", self.buffer, self.pos)
+        self.pos += 1
+        return c
+    
+    def _incompleto(self, error: json.JSONDecodeError) -> bool:
+        """Indica si el error puede deberse a que el valor sigue en el próximo bloque"""
+        return (error.pos >= len(self.buffer) - self._COLA_INCOMPLETA
+                or error.msg.startswith('Unterminated string'))
+    
+    def valor(self):
+        """Decodifica y consume el siguiente valor completo"""
+        self.caracter()
+        while True:
+            try:
+                valor, fin = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Un error antes del final del buffer es JSON malformado: leer más solo
+                # cargaría el resto del archivo. Si el valor está incompleto se lee el
+                # doble para no reintentar en O(n²)
+                if not self._incompleto(e) or not self._leer_mas(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # Un número al final del buffer puede continuar en el bloque siguiente
+            if fin == len(self.buffer) and not isinstance(valor, (dict, list, str)) and self._leer_mas():
+                continue
+            self.pos = fin
+            return valor
+    
+    def registros(self, ruta_puntero: List[str]) -> Iterator:
+        """Recorre hasta el valor indicado por el puntero y entrega sus elementos"""
+        for parte in ruta_puntero:
+            c = self.caracter()
+            if c == '{':
+                self._entrar_objeto(parte)
+            elif c == '[' and parte.isdigit():
+                self._entrar_arreglo(int(parte))
+            else:
+                raise KeyError(parte)
+        
+        if self.caracter() == '[':
+            yield from self._elementos()
+        else:
+            yield self.valor()
+    
+    def documentos_raiz(self, errores: Optional[List[str]] = None) -> Iterator:
+        """Entrega los valores de primer nivel: un arreglo se recorre elemento a elemento
+        y varios valores seguidos (JSON Lines o JSON concatenado) se entregan en orden.
+        Con una lista de errores, una línea malformada de JSON Lines se omite y su
+        error se agrega a la lista en lugar de detener el recorrido"""
+        while self.caracter():
+            if self.caracter() == '[':
+                yield from self._elementos()
+                continue
+            inicio = self.desplazamiento + self.pos
+            try:
+                valor = self.valor()
+            except json.JSONDecodeError as e:
+                if errores is None:
+                    raise
+                posicion = self.desplazamiento + e.pos
+                if not self._saltar_linea(e):
+                    raise
+                errores.append(f"{e.msg}: carácter {posicion} (registro en el carácter {inicio} omitido)")
+                continue
+            yield valor
+    
+    def _saltar_linea(self, error: json.JSONDecodeError) -> bool:
+        """
+        Descarta la línea del valor que empieza en la posición actual. Retorna
+        False si el error no está en esa línea ni al inicio de la siguiente (una
+        línea truncada), es decir, si el documento no es JSON Lines
+        """
+        salto = self.buffer.find('\n', self.pos)
+        if salto != -1:
+            siguiente = salto + 1
+            while siguiente < len(self.buffer) and self.buffer[siguiente] in ' \t\r\n':
+                siguiente += 1
+            if error.pos > siguiente:
+                return False
+        while salto == -1:
+            # Línea más larga que el buffer: descartarla por bloques
+            self.pos = len(self.buffer)
+            if not self._leer_mas():
+                return True
+            salto = self.buffer.find('\n')
+        self.pos = salto + 1
+        return True
+    
+    def _elementos(self) -> Iterator:
+        self.esperar('[')
+        if self.caracter() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.valor()
+            if self.esperar(',]') == ']':
+                return
+    
+    def _entrar_objeto(self, clave: str):
+        self.esperar('{')
+        while self.caracter() != '}':
+            actual = self.valor()
+            self.esperar(':')
+            if actual == clave:
+                return
+            self.valor()
+            if self.esperar(',}') == '}':
+                break
+        raise KeyError(clave)
+    
+    def _entrar_arreglo(self, indice: int):
+        self.esperar('[')
+        for _ in range(indice):
+            if self.caracter() == ']':
+                raise KeyError(str(indice))
+            self.valor()
+            if self.esperar(',]') == ']':
+                raise KeyError(str(indice))
+        if self.caracter() == ']':
+            raise KeyError(str(indice))
+
 
 class Funciones:
     @staticmethod
@@ -21,15 +234,24 @@ class Funciones:
             print(f"Error al crear carpeta: {e}")
             return False
     
+    @staticmethod
+    def percentil(valores: List[float], p: float) -> float:
+        """
+        Calcula el percentil p (0-100) de una lista de valores por rango más cercano
+        """
+        if not valores:
+            return 0.0
+        ordenados = sorted(valores)
+        posicion = min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))
+        return ordenados[posicion]
+    
     @staticmethod
     def descomprimir_zip_local(ruta_file_zip: str, ruta_descomprimir: str) -> List[Dict]:
         """Descomprime un archivo ZIP y retorna info de archivos"""
         archivos = []
         try:
             with zipfile.ZipFile(ruta_file_zip, 'r') as zip_ref:
-                # Verificar que el archivo ZIP no esté corrupto
-                zip_ref.testzip()
-                
+                # extract() verifica el CRC de cada miembro al leerlo: no hace falta testzip()
                 for file_info in zip_ref.namelist():
                     if not file_info.endswith('/'):
                         # Extraer carpeta padre
@@ -40,7 +262,15 @@ class Funciones:
                         # Solo procesar txt, pdf y json
                         if extension in ['.txt', '.pdf', '.json']:
                             # Extraer archivo
-                            zip_ref.extract(file_info, ruta_descomprimir)
+                            try:
+                                zip_ref.extract(file_info, ruta_descomprimir)
+                            except zipfile.BadZipFile as e:
+                                print(f"❌ Miembro corrupto {file_info}: {e}")
+                                # No dejar el archivo a medio escribir
+                                ruta_parcial = os.path.join(ruta_descomprimir, file_info)
+                                if os.path.exists(ruta_parcial):
+                                    os.remove(ruta_parcial)
+                                continue
                             ruta_extraida = os.path.join(ruta_descomprimir, file_info)
                             
                             # Verificar que el archivo se extrajo correctamente
@@ -64,22 +294,251 @@ class Funciones:
             return []
     
     @staticmethod
-    def descargar_y_descomprimir_zip(url: str, carpeta_destino: str, tipoArchivo: str = '') -> List[Dict]:
-        """Descarga y descomprime un ZIP desde URL"""
+    def iterar_documentos_zip(origen_zip, extensiones: Iterable[str] = ('json', 'jsonl', 'ndjson'),
+                              puntero: str = '') -> Iterator[Dict]:
+        """
+        Recorre los documentos JSON de un ZIP sin extraerlo a disco
+        
+        Cada miembro se lee con ZipFile.open y sus registros se parsean de
+        forma incremental (ver iterar_registros_json), así que un JSON Lines o
+        un arreglo grande no se carga completo en memoria. La lectura verifica
+        el CRC del miembro al llegar al final, así que no hace falta una pasada
+        previa con testzip(). Un miembro corrupto o malformado no detiene el
+        recorrido: se entrega con su error (después de los registros que se
+        alcanzaron a leer); una línea malformada de JSON Lines se entrega con su
+        error y el recorrido del miembro continúa.
+        
+        Args:
+            origen_zip: Ruta del ZIP o archivo binario con seek (ej: el stream de un upload)
+            extensiones: Extensiones de los miembros a leer
+            puntero: Puntero JSON a la lista de registros en cada miembro ('' para la raíz)
+            
+        Returns:
+            Iterador de diccionarios con 'nombre', 'miembro', 'carpeta', 'documento'
+            y 'error' (None si el registro se leyó bien)
+        """
+        extensiones = {ext.lower().replace('.', '') for ext in extensiones}
+        try:
+            with zipfile.ZipFile(origen_zip, 'r') as zip_ref:
+                for info in zip_ref.infolist():
+                    if info.is_dir():
+                        continue
+                    nombre = os.path.basename(info.filename)
+                    if os.path.splitext(nombre)[1].lower().replace('.', '') not in extensiones:
+                        continue
+                    
+                    base = {'nombre': nombre, 'miembro': info.filename,
+                            'carpeta': os.path.dirname(info.filename) or 'raiz'}
+                    errores = []
+                    try:
+                        with zip_ref.open(info) as miembro:
+                            for documento in Funciones.iterar_registros_json(miembro, puntero, errores=errores):
+                                # Las líneas malformadas de JSON Lines se omiten y se entregan con su error
+                                while errores:
+                                    yield {**base, 'documento': None, 'error': f'JSON malformado: {errores.pop(0)}'}
+                                yield {**base, 'documento': documento, 'error': None}
+                            while errores:
+                                yield {**base, 'documento': None, 'error': f'JSON malformado: {errores.pop(0)}'}
+                            # Con puntero el parser puede terminar antes del final: leer el resto verifica el CRC
+                            while miembro.read(1048576):
+                                pass
+                    except (zipfile.BadZipFile, zlib.error) as e:
+                        print(f"❌ Miembro corrupto {info.filename}: {e}")
+                        yield {**base, 'documento': None, 'error': f'Miembro corrupto: {e}'}
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        print(f"Error: JSON malformado en {info.filename}: {e}")
+                        yield {**base, 'documento': None, 'error': f'JSON malformado: {e}'}
+                    except KeyError as e:
+                        yield {**base, 'documento': None, 'error': f'No existe {puntero} (falta la clave {e})'}
+        except zipfile.BadZipFile as e:
+            print(f"Error: Archivo ZIP corrupto - {e}")
+            yield {'nombre': '', 'miembro': '', 'carpeta': '', 'documento': None,
+                   'error': f'Archivo ZIP corrupto: {e}'}
+    
+    @staticmethod
+    def descargar_archivo_reanudable(url: str, ruta_destino: str, session: Optional[requests.Session] = None,
+                                     chunk_size: int = 1048576, timeout: float = 60,
+                                     reintentos: int = 3, backoff: float = 0.5,
+                                     headers: Optional[Dict] = None) -> Dict:
+        """
+        Descarga un archivo de forma reanudable.
+        
+        Los datos se escriben en '<ruta_destino>.part'. Si la conexión se corta,
+        el siguiente intento (o una llamada posterior) continúa desde el último
+        byte recibido con una petición HTTP Range, protegida con If-Range para no
+        mezclar versiones distintas del archivo. Al terminar se verifica el tamaño
+        contra Content-Length antes de mover el archivo a su ruta final. Se pide
+        el archivo sin compresión (Accept-Encoding: identity): con gzip, los bytes
+        decodificados no coinciden con Content-Length ni con los offsets de Range;
+        si el servidor comprime igual, la descarga no se puede reanudar.
+        
+        Args:
+            url: URL del archivo
+            ruta_destino: Ruta final del archivo
+            session: Sesión de requests a reutilizar (opcional)
+            chunk_size: Tamaño de bloque de lectura/escritura en bytes
+            timeout: Timeout de conexión y lectura en segundos
+            reintentos: Reintentos ante cortes de conexión
+            backoff: Factor de espera exponencial entre reintentos (segundos)
+            headers: Cabeceras adicionales (ej: If-None-Match de una caché)
+            
+        Returns:
+            Diccionario con bytes transferidos, tamaño final, si se reanudó, si el
+            servidor respondió 304 y los validadores (etag, last_modified)
+        """
+        cliente = session or requests
+        ruta_part = f"{ruta_destino}.part"
+        ruta_meta = f"{ruta_part}.json"
+        resultado = {'bytes': 0, 'tamaño': 0, 'reanudado': False, 'no_modificado': False,
+                     'etag': None, 'last_modified': None}
+        
+        # Validadores de una descarga parcial previa
+        meta = {}
+        if os.path.exists(ruta_part) and os.path.exists(ruta_meta):
+            try:
+                with open(ruta_meta, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                if meta.get('url') != url:
+                    meta = {}
+            except (json.JSONDecodeError, OSError):
+                meta = {}
+        if not meta and os.path.exists(ruta_part):
+            os.remove(ruta_part)
+        
+        intento = 0
+        while True:
+            offset = os.path.getsize(ruta_part) if os.path.exists(ruta_part) else 0
+            if offset and not meta:
+                # Parte sin validadores (ej: de una respuesta comprimida): no se puede reanudar
+                os.remove(ruta_part)
+                offset = 0
+            cabeceras = dict(headers or {})
+            cabeceras['Accept-Encoding'] = 'identity'
+            validador = meta.get('etag') or meta.get('last_modified')
+            if offset:
+                cabeceras['Range'] = f"bytes={offset}-"
+                if validador:
+                    cabeceras['If-Range'] = validador
+            
+            try:
+                response = cliente.get(url, headers=cabeceras, stream=True, timeout=timeout)
+                
+                if response.status_code == 304:
+                    response.close()
+                    resultado['no_modificado'] = True
+                    for ruta in (ruta_part, ruta_meta):
+                        if os.path.exists(ruta):
+                            os.remove(ruta)
+                    return resultado
+                
+                if response.status_code == 416:
+                    # El rango pedido no existe: la parte local no es reutilizable
+                    response.close()
+                    os.remove(ruta_part)
+                    meta = {}
+                    continue
+                
+                response.raise_for_status()
+                
+                # Con Content-Encoding, iter_content entrega los bytes ya descomprimidos
+                codificado = response.headers.get('Content-Encoding', 'identity').lower() not in ('', 'identity')
+                if codificado and response.status_code == 206:
+                    # El rango es del contenido comprimido: no se puede unir a la parte local
+                    response.close()
+                    os.remove(ruta_part)
+                    meta = {}
+                    continue
+                
+                if response.status_code == 206:
+                    rango = response.headers.get('Content-Range', '')
+                    if not rango.startswith(f"bytes {offset}-"):
+                        raise IOError(f"Content-Range inesperado: {rango}")
+                    total = rango.rsplit('/', 1)[-1]
+                    tamaño_esperado = int(total) if total.isdigit() else None
+                    modo = 'ab'
+                    resultado['reanudado'] = True
+                    print(f"Reanudando {url} desde el byte {offset}")
+                else:
+                    # El servidor ignoró el Range (o el archivo cambió): empezar de cero
+                    longitud = response.headers.get('Content-Length')
+                    tamaño_esperado = int(longitud) if longitud and longitud.isdigit() and not codificado else None
+                    modo = 'wb'
+                    validadores = {
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')
+                    }
+                    resultado['etag'] = validadores['etag']
+                    resultado['last_modified'] = validadores['last_modified']
+                    if codificado:
+                        # Sin metadatos la parte no se reanuda: un corte vuelve a empezar de cero
+                        meta = {}
+                        if os.path.exists(ruta_meta):
+                            os.remove(ruta_meta)
+                    else:
+                        meta = validadores
+                        with open(ruta_meta, 'w', encoding='utf-8') as f:
+                            json.dump(meta, f)
+                
+                if meta:
+                    resultado['etag'] = meta.get('etag')
+                    resultado['last_modified'] = meta.get('last_modified')
+                
+                with open(ruta_part, modo) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            resultado['bytes'] += len(chunk)
+                
+                tamaño_final = os.path.getsize(ruta_part)
+                if tamaño_esperado is not None and tamaño_final != tamaño_esperado:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Descarga incompleta: {tamaño_final} de {tamaño_esperado} bytes"
+                    )
+                
+                os.replace(ruta_part, ruta_destino)
+                if os.path.exists(ruta_meta):
+                    os.remove(ruta_meta)
+                resultado['tamaño'] = tamaño_final
+                return resultado
+            
+            except (requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                intento += 1
+                if intento > reintentos:
+                    raise
+                espera = backoff * (2 ** (intento - 1))
+                print(f"Descarga interrumpida ({e}). Reintento {intento}/{reintentos} en {espera:.1f}s")
+                time.sleep(espera + random.uniform(0, espera))
+    
+    @staticmethod
+    def descargar_y_descomprimir_zip(url: str, carpeta_destino: str, tipoArchivo: str = '',
+                                     chunk_size: int = 1048576) -> List[Dict]:
+        """
+        Descarga y descomprime los TXT, PDF y JSON de un ZIP remoto
+        
+        Si el servidor acepta HTTP Range solo se descargan el directorio central
+        y los miembros que interesan (ver ZipRemoto). Si no, se descarga el ZIP
+        completo de forma reanudable y se descomprime localmente.
+        """
         try:
             if not Funciones.crear_carpeta(carpeta_destino):
                 return []
             
-            # Descargar archivo con timeout
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()  # Lanza excepción para códigos de error HTTP
+            zip_remoto = ZipRemoto(url, timeout=30)
+            if zip_remoto.soporta_rango():
+                try:
+                    return zip_remoto.extraer(carpeta_destino, extensiones=['txt', 'pdf', 'json'])
+                except (zipfile.BadZipFile, IOError) as e:
+                    print(f"Error al leer el ZIP remoto por rangos ({e}). Se descargará completo")
+                finally:
+                    zip_remoto.close()
             
             zip_path = os.path.join(carpeta_destino, 'temp.zip')
             
-            with open(zip_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            # Descargar archivo con timeout; si se corta, se reanuda desde temp.zip.part
+            Funciones.descargar_archivo_reanudable(url, zip_path, chunk_size=chunk_size, timeout=30)
             
             # Descomprimir
             archivos = Funciones.descomprimir_zip_local(zip_path, carpeta_destino)
@@ -138,66 +597,484 @@ class Funciones:
     @staticmethod
     def extraer_texto_pdf(ruta_pdf: str) -> str:
         """
-        Extrae texto de un archivo PDF
+        Extrae texto de un archivo PDF (capa de texto, sin OCR)
+        """
+        if not os.path.exists(ruta_pdf):
+            print(f"Error: Archivo PDF no encontrado - {ruta_pdf}")
+            return ""
+        
+        return "\n".join(
+            pagina['texto'] for pagina in Funciones.iterar_paginas_pdf(ruta_pdf, ocr='nunca') if pagina['texto']
+        ).strip()
+    
+    @staticmethod
+    def extraer_texto_pdf_ocr(ruta_pdf: str, max_workers: Optional[int] = None,
+                              paginas_por_lote: int = 4,
+                              max_paginas_en_vuelo: Optional[int] = None,
+                              perfil: str = PERFIL_OCR_DEFAULT) -> str:
+        """
+        Extrae texto de un PDF usando OCR (útil para PDFs escaneados)
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            max_workers: Páginas procesadas con OCR a la vez (None según los núcleos y el perfil)
+            paginas_por_lote: Páginas rasterizadas por cada llamada a pdftoppm
+            max_paginas_en_vuelo: Máximo de páginas rasterizadas pendientes de OCR
+                                  (None para 2 por worker)
+            perfil: Perfil de OCR de PERFILES_OCR ('rapido', 'balanceado' o 'preciso')
         """
         try:
-            if not os.path.exists(ruta_pdf):
-                print(f"Error: Archivo PDF no encontrado - {ruta_pdf}")
-                return ""
+            paginas = Funciones.iterar_paginas_pdf(
+                ruta_pdf, ocr='siempre', perfil=perfil, max_workers=max_workers,
+                paginas_por_lote=paginas_por_lote, max_paginas_en_vuelo=max_paginas_en_vuelo
+            )
+            return "\n".join(
+                f"--- Página {pagina['numero']} ---\n{pagina['texto']}" for pagina in paginas if pagina['texto'].strip()
+            ).strip()
+        except Exception as e:
+            print(f"Error al extraer texto con OCR del PDF {ruta_pdf}: {e}")
+            return ""
+    
+    @staticmethod
+    def iterar_paginas_pdf(ruta_pdf: str, ocr: str = 'auto', min_caracteres_pagina: int = 50,
+                           perfil: str = PERFIL_OCR_DEFAULT, max_workers: Optional[int] = None,
+                           paginas_por_lote: int = 4,
+                           max_paginas_en_vuelo: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Recorre las páginas de un PDF entregándolas en orden a medida que se extraen
+        
+        Con ocr='auto' cada página usa su capa de texto y solo las que no la
+        tienen pasan por OCR (ej: anexos escaneados dentro de un PDF digital).
+        Las páginas para OCR se rasterizan por lotes de páginas consecutivas
+        (first_page/last_page) y se procesan en un pool de hilos (tesseract corre
+        como subproceso, así que los hilos sí trabajan en paralelo). Nunca hay
+        más de max_paginas_en_vuelo imágenes en memoria ni más de unas pocas
+        páginas de texto esperando a que termine el OCR de una página anterior,
+        por lo que el consumo de memoria no depende del largo del documento.
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            ocr: 'auto' (OCR solo en páginas sin capa de texto), 'siempre' o 'nunca'
+            min_caracteres_pagina: Caracteres mínimos de la capa de texto para no usar OCR en la página
+            perfil: Perfil de OCR de PERFILES_OCR ('rapido', 'balanceado' o 'preciso')
+            max_workers: Páginas procesadas con OCR a la vez (None según los núcleos y el perfil)
+            paginas_por_lote: Páginas rasterizadas por cada llamada a pdftoppm
+            max_paginas_en_vuelo: Máximo de páginas rasterizadas pendientes de OCR
+                                  (None para 2 por worker)
             
-            texto = ""
+        Returns:
+            Iterador de diccionarios con 'numero', 'texto', 'metodo' ('texto' u 'ocr'),
+            'segundos' (incluye la parte proporcional de la rasterización del lote),
+            'ocr_intentado' (si la página pasó por OCR, se haya usado o no su texto) y
+            'error' (None, o el motivo si falló el OCR de la página: se entrega la capa de texto)
+        """
+        if not os.path.exists(ruta_pdf):
+            print(f"Error: Archivo PDF no encontrado - {ruta_pdf}")
+            return
+        
+        if ocr == 'nunca':
+            for numero, texto, segundos in Funciones._iterar_capa_texto(ruta_pdf):
+                yield {'numero': numero, 'texto': texto, 'metodo': 'texto', 'segundos': round(segundos, 3),
+                       'ocr_intentado': False, 'error': None}
+            return
+        
+        # Verificar dependencias
+        try:
+            from pdf2image import pdfinfo_from_path
+        except ImportError:
+            print("Error: pdf2image no está instalado. Instala con: pip install pdf2image")
+            if ocr == 'auto':
+                yield from Funciones.iterar_paginas_pdf(ruta_pdf, ocr='nunca')
+            return
+        
+        if perfil not in PERFILES_OCR:
+            raise ValueError(f"Perfil de OCR desconocido: {perfil}. Opciones: {', '.join(PERFILES_OCR)}")
+        
+        if ocr == 'siempre':
+            total_paginas = pdfinfo_from_path(ruta_pdf)['Pages']
+            fuente = ((numero, "", 0.0) for numero in range(1, total_paginas + 1))
+            yield from Funciones._canalizar_ocr(ruta_pdf, fuente, lambda texto: True, perfil,
+                                                max_workers, paginas_por_lote, max_paginas_en_vuelo)
+            return
+        
+        entregadas = 0
+        for pagina in Funciones._canalizar_ocr(
+                ruta_pdf, Funciones._iterar_capa_texto(ruta_pdf),
+                lambda texto: len(texto.strip()) < min_caracteres_pagina,
+                perfil, max_workers, paginas_por_lote, max_paginas_en_vuelo):
+            entregadas += 1
+            yield pagina
+        
+        # PyPDF2 no pudo leer el PDF (dañado o encriptado): OCR de todas las páginas
+        if entregadas == 0:
+            yield from Funciones.iterar_paginas_pdf(
+                ruta_pdf, ocr='siempre', perfil=perfil, max_workers=max_workers,
+                paginas_por_lote=paginas_por_lote, max_paginas_en_vuelo=max_paginas_en_vuelo
+            )
+    
+    @staticmethod
+    def _iterar_capa_texto(ruta_pdf: str) -> Iterator[tuple]:
+        """Recorre la capa de texto de un PDF. Entrega tuplas (número, texto, segundos)"""
+        try:
             with open(ruta_pdf, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 
                 # Verificar si el PDF está encriptado
                 if pdf_reader.is_encrypted:
                     print(f"Advertencia: PDF encriptado - {ruta_pdf}")
-                    return ""
+                    return
                 
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        texto += page_text + "\n"
-            
-            return texto.strip()
-        except PyPDF2.PdfReadError as e:
+                for numero, page in enumerate(pdf_reader.pages, 1):
+                    inicio = time.perf_counter()
+                    try:
+                        page_text = page.extract_text() or ""
+                    except Exception as e:
+                        print(f"Error al extraer texto de la página {numero} de {ruta_pdf}: {e}")
+                        page_text = ""
+                    yield numero, page_text, time.perf_counter() - inicio
+        except PdfReadError as e:
             print(f"Error al leer PDF {ruta_pdf}: {e}")
-            return ""
         except Exception as e:
             print(f"Error al extraer texto del PDF {ruta_pdf}: {e}")
-            return ""
     
     @staticmethod
-    def extraer_texto_pdf_ocr(ruta_pdf: str) -> str:
+    def _canalizar_ocr(ruta_pdf: str, fuente: Iterable[tuple], necesita_ocr: Callable[[str], bool],
+                       perfil: str, max_workers: Optional[int], paginas_por_lote: int,
+                       max_paginas_en_vuelo: Optional[int]) -> Iterator[Dict]:
         """
-        Extrae texto de un PDF usando OCR (útil para PDFs escaneados)
+        Pasa por OCR las páginas de 'fuente' que lo necesitan y entrega todas en orden
+        
+        El perfil fija la resolución, el preprocesamiento y la configuración de
+        tesseract. Su límite de hilos no se aplica aquí (ver limitar_hilos_tesseract).
         """
+        from pdf2image import convert_from_path
+        
+        opciones = PERFILES_OCR[perfil]
+        
+        # Por defecto, tantos tesseract en paralelo como quepan en los núcleos con sus hilos
+        max_workers = max(1, max_workers or (os.cpu_count() or 1) // opciones['hilos_tesseract'])
+        paginas_por_lote = max(1, paginas_por_lote)
+        max_en_vuelo = max(paginas_por_lote, max_paginas_en_vuelo or 2 * max_workers)
+        # Páginas ya extraídas que pueden esperar en cola a que termine el OCR de una anterior
+        max_en_cola = 4 * max_en_vuelo
+        
+        def ocr_pagina(imagen):
+            inicio = time.perf_counter()
+            imagen = Funciones.preprocesar_imagen_ocr(
+                imagen, binarizar=opciones['binarizar'], enderezar=opciones['enderezar']
+            )
+            texto = pytesseract.image_to_string(imagen, lang='spa', config=opciones['config'])
+            return texto, time.perf_counter() - inicio
+        
+        cola = deque()
+        lote = []
+        en_vuelo = set()
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        terminado = False
         try:
-            # Verificar dependencias
-            try:
-                from pdf2image import convert_from_path
-            except ImportError:
-                print("Error: pdf2image no está instalado. Instala con: pip install pdf2image")
-                return ""
+            def enviar_lote():
+                """Rasteriza el lote de páginas consecutivas y envía cada una al pool"""
+                if not lote:
+                    return
+                # Esperar cupo para el lote: acota las imágenes en memoria
+                while en_vuelo and len(en_vuelo) + len(lote) > max_en_vuelo:
+                    completados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    en_vuelo.difference_update(completados)
+                
+                inicio = time.perf_counter()
+                try:
+                    imagenes = convert_from_path(ruta_pdf, dpi=opciones['dpi'], grayscale=opciones['escala_grises'],
+                                                 first_page=lote[0]['numero'], last_page=lote[-1]['numero'])
+                except Exception as e:
+                    # Sin poppler o con páginas dañadas: el lote se entrega con su capa de texto
+                    for pagina in lote:
+                        pagina['futuro'] = Future()
+                        pagina['futuro'].set_exception(e)
+                    lote.clear()
+                    return
+                segundos_raster = (time.perf_counter() - inicio) / max(1, len(imagenes))
+                for pagina, imagen in zip(lote, imagenes):
+                    pagina['segundos'] += segundos_raster
+                    pagina['futuro'] = executor.submit(ocr_pagina, imagen)
+                    en_vuelo.add(pagina['futuro'])
+                del imagenes
+                lote.clear()
             
-            if not os.path.exists(ruta_pdf):
-                print(f"Error: Archivo PDF no encontrado - {ruta_pdf}")
-                return ""
+            def entregar(max_pendientes):
+                """Entrega las páginas listas de la cabeza de la cola (y espera si hay demasiadas)"""
+                while cola:
+                    pagina = cola[0]
+                    esperar = len(cola) > max_pendientes
+                    if pagina['metodo'] == 'ocr':
+                        if pagina['futuro'] is None:
+                            if not esperar:
+                                return
+                            enviar_lote()
+                        if not pagina['futuro'].done() and not esperar:
+                            return
+                        en_vuelo.discard(pagina['futuro'])
+                        try:
+                            texto_ocr, segundos = pagina['futuro'].result()
+                        except Exception as e:
+                            # Un fallo de OCR (ej: falta tesseract) no corta el documento
+                            print(f"Error de OCR en la página {pagina['numero']} de {ruta_pdf}: {e}")
+                            pagina['error'] = str(e)
+                            pagina['metodo'] = 'texto'
+                        else:
+                            # Se conserva la capa de texto si el OCR no encontró nada mejor;
+                            # 'metodo' indica el texto que se entrega, no si se intentó OCR
+                            if len(texto_ocr.strip()) > len(pagina['texto'].strip()):
+                                pagina['texto'] = texto_ocr
+                            else:
+                                pagina['metodo'] = 'texto'
+                            pagina['segundos'] += segundos
+                    cola.popleft()
+                    yield {'numero': pagina['numero'], 'texto': pagina['texto'],
+                           'metodo': pagina['metodo'], 'segundos': round(pagina['segundos'], 3),
+                           'ocr_intentado': pagina['futuro'] is not None, 'error': pagina['error']}
+            
+            for numero, texto, segundos in fuente:
+                pagina = {'numero': numero, 'texto': texto, 'metodo': 'texto', 'segundos': segundos,
+                          'futuro': None, 'error': None}
+                if necesita_ocr(texto):
+                    pagina['metodo'] = 'ocr'
+                    if lote and (numero != lote[-1]['numero'] + 1 or len(lote) >= paginas_por_lote):
+                        enviar_lote()
+                    lote.append(pagina)
+                elif lote:
+                    enviar_lote()
+                cola.append(pagina)
+                yield from entregar(max_en_cola)
+            
+            enviar_lote()
+            yield from entregar(0)
+            terminado = True
+        finally:
+            if terminado:
+                executor.shutdown(wait=True)
+            else:
+                # Tiempo agotado (SIGALRM del ExtractorParalelo), error o consumidor que dejó de
+                # iterar: se descartan las páginas en cola y no se espera a las que están en OCR
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def limitar_hilos_tesseract(perfil: str = PERFIL_OCR_DEFAULT):
+        """
+        Limita los hilos de cada tesseract que lance el proceso según el perfil
+        
+        tesseract lee OMP_THREAD_LIMIT del entorno, que es común a todo el
+        proceso: llamarla solo en procesos dedicados a una extracción a la vez
+        (ej: los workers de ExtractorParalelo o un script), nunca en el servidor.
+        
+        Args:
+            perfil: Perfil de OCR de PERFILES_OCR
+        """
+        os.environ['OMP_THREAD_LIMIT'] = str(PERFILES_OCR[perfil]['hilos_tesseract'])
+    
+    @staticmethod
+    def fragmentar_paginas(paginas: Iterable[Dict], max_caracteres: int = 2000,
+                           solapamiento: int = 200) -> Iterator[Dict]:
+        """
+        Agrupa el texto de un flujo de páginas en fragmentos de tamaño acotado,
+        sin tener el documento completo en memoria (ej: para indexar por partes)
+        
+        Args:
+            paginas: Iterador de páginas con 'numero' y 'texto' (ej: iterar_paginas_pdf)
+            max_caracteres: Tamaño máximo de cada fragmento
+            solapamiento: Caracteres del final de un fragmento que se repiten al inicio del siguiente
             
-            # Convertir PDF a imágenes
-            images = convert_from_path(ruta_pdf)
+        Returns:
+            Iterador de diccionarios con 'indice', 'texto', 'pagina_inicio' y 'pagina_fin'
+        """
+        solapamiento = min(solapamiento, max_caracteres // 2)
+        buffer = ""
+        pagina_inicio = pagina_fin = None
+        indice = 0
+        
+        for pagina in paginas:
+            texto = pagina['texto'].strip()
+            if not texto:
+                continue
+            if pagina_inicio is None:
+                pagina_inicio = pagina['numero']
+            pagina_fin = pagina['numero']
+            buffer = f"{buffer}\n{texto}" if buffer else texto
             
-            texto = ""
-            for i, image in enumerate(images):
-                # Aplicar OCR a cada página
-                page_text = pytesseract.image_to_string(image, lang='spa')
-                if page_text.strip():
-                    texto += f"--- Página {i+1} ---\n{page_text}\n"
+            while len(buffer) > max_caracteres:
+                # Cortar en el último espacio antes del límite para no partir palabras
+                corte = buffer.rfind(' ', solapamiento + 1, max_caracteres)
+                if corte == -1:
+                    corte = max_caracteres
+                yield {'indice': indice, 'texto': buffer[:corte].strip(),
+                       'pagina_inicio': pagina_inicio, 'pagina_fin': pagina_fin}
+                indice += 1
+                buffer = buffer[corte - solapamiento:] if solapamiento else buffer[corte:]
+                pagina_inicio = pagina_fin
+        
+        if buffer.strip():
+            yield {'indice': indice, 'texto': buffer.strip(),
+                   'pagina_inicio': pagina_inicio, 'pagina_fin': pagina_fin}
+    
+    @staticmethod
+    def preprocesar_imagen_ocr(imagen: Image.Image, binarizar: bool = False, enderezar: bool = False) -> Image.Image:
+        """
+        Prepara una página rasterizada para OCR
+        
+        Args:
+            imagen: Imagen de la página
+            binarizar: Si True, umbraliza a blanco y negro con el método de Otsu
+            enderezar: Si True, corrige la inclinación (hasta ±5°) del escaneo
             
-            return texto.strip()
+        Returns:
+            Imagen en escala de grises, opcionalmente binarizada y enderezada
+        """
+        if imagen.mode != 'L':
+            imagen = imagen.convert('L')
+        
+        if binarizar or enderezar:
+            umbral = Funciones._umbral_otsu(imagen)
+            if enderezar:
+                imagen = imagen.rotate(Funciones._angulo_inclinacion(imagen, umbral), resample=Image.BICUBIC,
+                                       expand=True, fillcolor=255)
+            if binarizar:
+                imagen = imagen.point(lambda p: 255 if p > umbral else 0)
+        
+        return imagen
+    
+    @staticmethod
+    def _umbral_otsu(imagen: Image.Image) -> int:
+        """Umbral de Otsu a partir del histograma de una imagen en escala de grises"""
+        histograma = imagen.histogram()[:256]
+        total = sum(histograma)
+        suma_total = sum(i * h for i, h in enumerate(histograma))
+        suma_fondo = peso_fondo = 0
+        mejor_umbral, mejor_varianza = 127, -1.0
+        for i, h in enumerate(histograma):
+            peso_fondo += h
+            if peso_fondo == 0:
+                continue
+            peso_frente = total - peso_fondo
+            if peso_frente == 0:
+                break
+            suma_fondo += i * h
+            media_fondo = suma_fondo / peso_fondo
+            media_frente = (suma_total - suma_fondo) / peso_frente
+            varianza = peso_fondo * peso_frente * (media_fondo - media_frente) ** 2
+            if varianza > mejor_varianza:
+                mejor_umbral, mejor_varianza = i, varianza
+        return mejor_umbral
+    
+    @staticmethod
+    def _angulo_inclinacion(imagen: Image.Image, umbral: int, max_angulo: float = 5.0,
+                            paso: float = 0.5) -> float:
+        """
+        Estima la inclinación del texto por perfil de proyección: con las líneas
+        horizontales, la suma de píxeles de tinta por fila varía al máximo
+        """
+        import numpy as np
+        
+        # Se trabaja sobre una copia reducida: la estimación no necesita toda la resolución
+        escala = min(1.0, 800 / max(imagen.size))
+        reducida = imagen.resize((max(1, int(imagen.width * escala)), max(1, int(imagen.height * escala))))
+        tinta = reducida.point(lambda p: 255 if p <= umbral else 0)
+        
+        mejor_angulo, mejor_puntaje = 0.0, -1.0
+        pasos = int(max_angulo / paso)
+        for k in range(-pasos, pasos + 1):
+            angulo = k * paso
+            filas = np.asarray(tinta.rotate(angulo, expand=True, fillcolor=0), dtype=np.float32).sum(axis=1)
+            puntaje = float(np.var(filas))
+            if puntaje > mejor_puntaje:
+                mejor_angulo, mejor_puntaje = angulo, puntaje
+        return mejor_angulo
+    
+    @staticmethod
+    def extraer_texto_pdf_hibrido(ruta_pdf: str, min_caracteres_pagina: int = 50,
+                                  max_workers: Optional[int] = None,
+                                  paginas_por_lote: int = 4,
+                                  max_paginas_en_vuelo: Optional[int] = None,
+                                  perfil: str = PERFIL_OCR_DEFAULT) -> Dict:
+        """
+        Extrae texto de un PDF página por página: usa la capa de texto cuando
+        existe y aplica OCR solo a las páginas sin ella (ver iterar_paginas_pdf)
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            min_caracteres_pagina: Caracteres mínimos de la capa de texto para no usar OCR en la página
+            max_workers: Páginas procesadas con OCR a la vez (None para usar todos los núcleos)
+            paginas_por_lote: Páginas rasterizadas por cada llamada a pdftoppm
+            max_paginas_en_vuelo: Máximo de páginas rasterizadas pendientes de OCR
+            perfil: Perfil de OCR de PERFILES_OCR ('rapido', 'balanceado' o 'preciso')
+            
+        Returns:
+            Diccionario con 'texto', 'metodo' ('texto', 'ocr', 'hibrido' o None),
+            'paginas' (lista con 'numero', 'metodo', 'caracteres', 'segundos', 'ocr_intentado' y 'error'),
+            'paginas_ocr', 'paginas_con_error', 'segundos' y 'error' (None, o el motivo si la
+            extracción se cortó antes de la última página)
+        """
+        inicio = time.perf_counter()
+        resultado = {'texto': "", 'metodo': None, 'paginas': [], 'paginas_ocr': 0, 'paginas_con_error': 0,
+                     'segundos': 0.0, 'error': None}
+        
+        metodos = set()
+        textos = []
+        try:
+            for pagina in Funciones.iterar_paginas_pdf(
+                    ruta_pdf, ocr='auto', min_caracteres_pagina=min_caracteres_pagina, perfil=perfil,
+                    max_workers=max_workers, paginas_por_lote=paginas_por_lote,
+                    max_paginas_en_vuelo=max_paginas_en_vuelo):
+                texto_pagina = pagina.pop('texto').strip()
+                pagina['caracteres'] = len(texto_pagina)
+                resultado['paginas'].append(pagina)
+                if texto_pagina:
+                    textos.append(texto_pagina)
+                    metodos.add(pagina['metodo'])
         except Exception as e:
-            print(f"Error al extraer texto con OCR del PDF {ruta_pdf}: {e}")
-            return ""
+            print(f"Error al extraer texto del PDF {ruta_pdf}: {e}")
+            resultado['error'] = str(e)
+        
+        resultado['texto'] = "\n".join(textos)
+        resultado['paginas_ocr'] = sum(1 for p in resultado['paginas'] if p['metodo'] == 'ocr')
+        resultado['paginas_con_error'] = sum(1 for p in resultado['paginas'] if p['error'])
+        if metodos:
+            resultado['metodo'] = metodos.pop() if len(metodos) == 1 else 'hibrido'
+        resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+        return resultado
+    
+    @staticmethod
+    def extraer_texto_archivo(ruta: str, extension: str, ocr_workers: Optional[int] = None,
+                              perfil_ocr: str = PERFIL_OCR_DEFAULT) -> Dict:
+        """
+        Extrae el texto de un archivo PDF o TXT. Los PDF se procesan con
+        extraer_texto_pdf_hibrido: OCR solo en las páginas sin capa de texto
+        
+        Args:
+            ruta: Ruta del archivo
+            extension: Extensión del archivo ('pdf' o 'txt')
+            ocr_workers: Páginas procesadas con OCR a la vez (None para usar todos los núcleos)
+            perfil_ocr: Perfil de OCR de PERFILES_OCR
+        
+        Returns:
+            Diccionario con 'texto', 'metodo' ('texto', 'ocr', 'hibrido' o None si no
+            hubo texto), 'paginas' (detalle por página de los PDF) y 'parcial' (True si
+            falló el OCR de alguna página o la extracción se cortó)
+        """
+        extension = extension.lower()
+        if extension == 'pdf':
+            resultado = Funciones.extraer_texto_pdf_hibrido(ruta, max_workers=ocr_workers, perfil=perfil_ocr)
+            return {'texto': resultado['texto'], 'metodo': resultado['metodo'], 'paginas': resultado['paginas'],
+                    'parcial': bool(resultado['error'] or resultado['paginas_con_error'])}
+        
+        if extension == 'txt':
+            for encoding in ('utf-8', 'latin-1'):
+                try:
+                    with open(ruta, 'r', encoding=encoding) as f:
+                        return {'texto': f.read(), 'metodo': 'texto', 'paginas': [], 'parcial': False}
+                except UnicodeDecodeError:
+                    continue
+        
+        return {'texto': "", 'metodo': None, 'paginas': [], 'parcial': False}
     
     @staticmethod
     def listar_archivos_json(ruta_carpeta: str) -> List[Dict]:
@@ -281,6 +1158,54 @@ class Funciones:
             print(f"Error al leer JSON {ruta_json}: {e}")
             return {}
     
+    @staticmethod
+    def iterar_registros_json(archivo, puntero: str = '', tamaño_bloque: int = 65536,
+                              errores: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Recorre los registros de un archivo JSON sin cargarlo completo en memoria
+        
+        Acepta un documento JSON, un arreglo de documentos, JSON Lines (NDJSON)
+        o varios documentos concatenados. Con un puntero JSON (RFC 6901, ej:
+        '/peliculas') se entregan los elementos del arreglo al que apunta. Solo
+        se entregan los registros que son objetos (los demás valores se omiten).
+        Un error de sintaxis se reporta sin leer el resto del archivo.
+        
+        Args:
+            archivo: Ruta del archivo o archivo abierto (texto o binario, ej: un miembro de ZIP)
+            puntero: Puntero JSON a la lista de registros ('' para la raíz)
+            tamaño_bloque: Caracteres leídos del archivo por vez
+            errores: Lista donde anotar las líneas malformadas de JSON Lines, que se
+                     omiten sin detener el recorrido (None para fallar en la primera)
+            
+        Returns:
+            Iterador de diccionarios
+            
+        Raises:
+            json.JSONDecodeError: Si el JSON está malformado (los registros previos ya se entregaron)
+            KeyError: Si el puntero no existe en el documento
+        """
+        partes = [parte.replace('~1', '/').replace('~0', '~') for parte in puntero.split('/')[1:]] if puntero else []
+        
+        if isinstance(archivo, str):
+            with open(archivo, 'r', encoding='utf-8-sig') as f:
+                yield from Funciones.iterar_registros_json(f, puntero, tamaño_bloque, errores)
+            return
+        
+        envoltorio = None
+        if not isinstance(archivo, io.TextIOBase):
+            archivo = envoltorio = io.TextIOWrapper(archivo, encoding='utf-8-sig')
+        
+        try:
+            lector = _LectorJSON(archivo, tamaño_bloque)
+            registros = lector.registros(partes) if partes else lector.documentos_raiz(errores)
+            for registro in registros:
+                if isinstance(registro, dict) and registro:
+                    yield registro
+        finally:
+            # Separar el envoltorio para que al liberarlo no cierre el archivo de quien llama
+            if envoltorio is not None:
+                envoltorio.detach()
+    
     @staticmethod
     def guardar_json(ruta_json: str, datos: Dict) -> bool:
         """
@@ -0,0 +1,249 @@
+import time
+import threading
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from typing import Dict, Optional
+
+import requests
+
+
+class ControladorAIMD:
+    """
+    Controlador de aumento aditivo / disminución multiplicativa (AIMD).
+
+    Mientras todo va bien el valor sube de a 'incremento'; ante una señal de
+    saturación se multiplica por 'factor_reduccion'. Siempre queda entre
+    'minimo' y 'maximo'.
+    """
+
+    def __init__(self, inicial: float, minimo: float, maximo: float,
+                 incremento: float, factor_reduccion: float = 0.5):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.incremento = incremento
+        self.factor_reduccion = factor_reduccion
+        self.valor = min(max(inicial, minimo), maximo)
+        self._ultima_reduccion = float('-inf')
+        self._lock = threading.Lock()
+
+    def aumentar(self) -> float:
+        """Aumento aditivo"""
+        with self._lock:
+            self.valor = min(self.maximo, self.valor + self.incremento)
+            return self.valor
+
+    def reducir(self, ventana: float = 0.0) -> float:
+        """
+        Disminución multiplicativa
+        
+        Args:
+            ventana: Segundos desde la última reducción durante los que se ignoran otras
+                     (varias señales de la misma saturación, ej: de peticiones en paralelo,
+                     reducen una sola vez)
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora - self._ultima_reduccion >= ventana:
+                self.valor = max(self.minimo, self.valor * self.factor_reduccion)
+                self._ultima_reduccion = ahora
+            return self.valor
+
+    def limitar(self, maximo: float):
+        """Reduce el máximo permitido (ej: por un Crawl-delay)"""
+        with self._lock:
+            self.maximo = max(self.minimo, min(self.maximo, maximo))
+            self.valor = min(self.valor, self.maximo)
+
+
+class _EstadoHost:
+    """Cubo de tokens y control AIMD de un host"""
+
+    def __init__(self, controlador: ControladorAIMD, rafaga: int):
+        self.controlador = controlador
+        self.capacidad = rafaga
+        self.tokens = float(rafaga)
+        self.ultima_recarga = time.monotonic()
+        self.pausa_hasta = 0.0
+        self.robots: Optional[RobotFileParser] = None
+        # Se activa cuando robots.txt ya se leyó (o no hace falta leerlo)
+        self.listo = threading.Event()
+        self.peticiones = 0
+        self.rechazos = 0
+
+
+class PlanificadorCortesia:
+    """
+    Planificador de cortesía compartido entre hilos y rastreos.
+
+    Para cada host mantiene un cubo de tokens cuya tasa (peticiones/segundo)
+    se ajusta con AIMD: sube mientras la latencia observada está por debajo
+    del objetivo y baja a la mitad ante latencias altas o respuestas 429/503.
+    El Crawl-delay de robots.txt fija el máximo de la tasa y el Retry-After
+    de una respuesta 429/503 pausa el host.
+    """
+
+    def __init__(self, tasa_inicial: float = 2.0, tasa_minima: float = 0.2,
+                 tasa_maxima: float = 20.0, incremento: float = 0.5,
+                 latencia_objetivo: float = 2.0, rafaga: int = 2,
+                 respetar_robots: bool = True, user_agent: str = '*',
+                 session: Optional[requests.Session] = None):
+        """
+        Inicializa el planificador
+
+        Args:
+            tasa_inicial: Peticiones por segundo iniciales por host
+            tasa_minima: Tasa mínima por host
+            tasa_maxima: Tasa máxima por host
+            incremento: Aumento aditivo de la tasa por respuesta rápida
+            latencia_objetivo: Latencia (segundos) por encima de la cual se reduce la tasa
+            rafaga: Peticiones que pueden salir seguidas sin esperar
+            respetar_robots: Si True, lee robots.txt (Disallow y Crawl-delay)
+            user_agent: User-Agent con el que se evalúa robots.txt
+            session: Sesión para descargar robots.txt (opcional)
+        """
+        self.tasa_inicial = tasa_inicial
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        self.incremento = incremento
+        self.latencia_objetivo = latencia_objetivo
+        self.rafaga = max(1, rafaga)
+        self.respetar_robots = respetar_robots
+        self.user_agent = user_agent
+        self.session = session or requests.Session()
+        self._hosts: Dict[str, _EstadoHost] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave_host(url: str) -> str:
+        partes = urlsplit(url)
+        return f"{partes.scheme}://{partes.netloc.lower()}"
+
+    def _host(self, url: str) -> _EstadoHost:
+        """Obtiene (o crea) el estado del host de la URL, leyendo su robots.txt la primera vez"""
+        clave = self._clave_host(url)
+        with self._lock:
+            host = self._hosts.get(clave)
+            nuevo = host is None
+            if nuevo:
+                host = _EstadoHost(
+                    ControladorAIMD(self.tasa_inicial, self.tasa_minima, self.tasa_maxima, self.incremento),
+                    self.rafaga
+                )
+                self._hosts[clave] = host
+
+        if not nuevo:
+            # Otro hilo puede estar leyendo robots.txt: hasta que termine no se sabe qué está
+            # permitido ni cuál es el Crawl-delay
+            host.listo.wait()
+            return host
+        # robots.txt se lee fuera del lock global para no frenar a los demás hosts
+        try:
+            if self.respetar_robots:
+                self._cargar_robots(clave, host)
+        finally:
+            host.listo.set()
+        return host
+
+    def _cargar_robots(self, clave: str, host: _EstadoHost):
+        """Descarga y aplica robots.txt; si no está disponible no hay restricciones"""
+        robots = RobotFileParser()
+        try:
+            response = self.session.get(f"{clave}/robots.txt", timeout=10)
+            if response.status_code in (401, 403):
+                robots.disallow_all = True
+            elif response.ok:
+                robots.parse(response.text.splitlines())
+            else:
+                robots.allow_all = True
+        except requests.exceptions.RequestException as e:
+            print(f"No se pudo leer {clave}/robots.txt: {e}")
+            robots.allow_all = True
+
+        host.robots = robots
+        retraso = robots.crawl_delay(self.user_agent)
+        if retraso:
+            print(f"Crawl-delay de {clave}: {retraso}s")
+            host.controlador.limitar(1.0 / float(retraso))
+            host.capacidad = 1
+            host.tokens = min(host.tokens, 1.0)
+
+    def permitido(self, url: str) -> bool:
+        """Indica si robots.txt permite rastrear la URL"""
+        if not self.respetar_robots:
+            return True
+        host = self._host(url)
+        return host.robots is None or host.robots.can_fetch(self.user_agent, url)
+
+    def esperar(self, url: str) -> float:
+        """
+        Bloquea hasta que el host de la URL tenga un token disponible
+
+        Returns:
+            Segundos esperados
+        """
+        host = self._host(url)
+        with self._lock:
+            ahora = time.monotonic()
+            tasa = host.controlador.valor
+            host.tokens = min(host.capacidad, host.tokens + (ahora - host.ultima_recarga) * tasa)
+            host.ultima_recarga = ahora
+            # Los tokens pueden quedar negativos: cada hilo reserva su turno
+            host.tokens -= 1
+            espera = max(-host.tokens / tasa if host.tokens < 0 else 0.0, host.pausa_hasta - ahora)
+            host.peticiones += 1
+
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def registrar_respuesta(self, url: str, status_code: Optional[int] = None,
+                            latencia: Optional[float] = None,
+                            retry_after: Optional[str] = None):
+        """
+        Ajusta la tasa del host según la respuesta observada
+
+        Args:
+            url: URL solicitada
+            status_code: Código HTTP (None si falló la conexión)
+            latencia: Segundos hasta la respuesta (None para no evaluarla, ej: descargas grandes)
+            retry_after: Cabecera Retry-After de la respuesta, si la hubo
+        """
+        host = self._host(url)
+        # Las respuestas de una misma ráfaga (peticiones en vuelo a la vez) reducen la
+        # tasa una sola vez: se ignoran las reducciones durante aproximadamente un RTT
+        ventana = max(self.latencia_objetivo, latencia or 0.0)
+        if status_code in (429, 503):
+            host.rechazos += 1
+            tasa = host.controlador.reducir(ventana=ventana)
+            pausa = self._segundos_retry_after(retry_after)
+            if pausa:
+                with self._lock:
+                    host.pausa_hasta = max(host.pausa_hasta, time.monotonic() + pausa)
+            print(f"Servidor saturado ({status_code}) en {self._clave_host(url)}: tasa {tasa:.2f} req/s")
+        elif status_code is None or (latencia is not None and latencia > self.latencia_objetivo):
+            host.controlador.reducir(ventana=ventana)
+        elif status_code < 400:
+            host.controlador.aumentar()
+
+    @staticmethod
+    def _segundos_retry_after(retry_after: Optional[str]) -> float:
+        """Interpreta Retry-After en segundos (se ignoran las fechas HTTP)"""
+        if not retry_after:
+            return 0.0
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            return 0.0
+
+    def estadisticas(self) -> Dict:
+        """Tasa actual, peticiones y rechazos por host"""
+        with self._lock:
+            return {
+                clave: {
+                    'tasa': round(host.controlador.valor, 3),
+                    'tasa_maxima': host.controlador.maximo,
+                    'peticiones': host.peticiones,
+                    'rechazos': host.rechazos
+                }
+                for clave, host in self._hosts.items()
+            }
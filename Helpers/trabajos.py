@@ -0,0 +1,199 @@
+import time
+import uuid
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class Trabajo:
+    """
+    Trabajo en segundo plano con etapa, contadores, ETA y cancelación.
+
+    La función del trabajo recibe el propio Trabajo y reporta su avance con
+    progreso(etapa, hecho, total, **contadores). La cancelación es cooperativa:
+    la función debe revisar trabajo.cancelacion (un threading.Event) y
+    terminar en cuanto se active.
+    """
+
+    def __init__(self, tipo: str, usuario: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.usuario = usuario
+        self.estado = 'en_cola'
+        self.etapa = None
+        self.hecho = 0
+        self.total = None
+        self.contadores: Dict = {}
+        self.resultado = None
+        self.error = None
+        self.creado = datetime.now()
+        self.iniciado = None
+        self.terminado = None
+        self.cancelacion = threading.Event()
+        self._inicio_etapa = None
+        self._futuro = None
+        self._lock = threading.Lock()
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in ('completado', 'fallido', 'cancelado')
+
+    def progreso(self, etapa: str, hecho: int = 0, total: Optional[int] = None, **contadores):
+        """
+        Reporta el avance del trabajo
+
+        Args:
+            etapa: Nombre de la etapa actual (ej: 'rastreo', 'descarga')
+            hecho: Unidades terminadas en la etapa
+            total: Unidades totales de la etapa (None si no se conocen)
+            **contadores: Contadores adicionales (ej: errores=2)
+        """
+        with self._lock:
+            if etapa != self.etapa:
+                self.etapa = etapa
+                self._inicio_etapa = time.monotonic()
+                self.contadores = {}
+            self.hecho = hecho
+            self.total = total
+            self.contadores.update(contadores)
+
+    def eta_segundos(self) -> Optional[float]:
+        """Estimación del tiempo restante de la etapa actual según su ritmo"""
+        if not self._inicio_etapa or not self.total or self.hecho <= 0:
+            return None
+        transcurrido = time.monotonic() - self._inicio_etapa
+        return max(0.0, transcurrido / self.hecho * (self.total - self.hecho))
+
+    def a_dict(self) -> Dict:
+        """Representación JSON del trabajo"""
+        with self._lock:
+            eta = self.eta_segundos() if self.estado == 'ejecutando' else None
+            datos = {
+                'id': self.id,
+                'tipo': self.tipo,
+                'estado': self.estado,
+                'etapa': self.etapa,
+                'hecho': self.hecho,
+                'total': self.total,
+                'porcentaje': round(100 * self.hecho / self.total, 1) if self.total else None,
+                'contadores': dict(self.contadores),
+                'eta_segundos': round(eta, 1) if eta is not None else None,
+                'cancelacion_solicitada': self.cancelacion.is_set(),
+                'creado': self.creado.isoformat(),
+                'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+                'terminado': self.terminado.isoformat() if self.terminado else None,
+            }
+        if self.error:
+            datos['error'] = self.error
+        if self.resultado is not None:
+            datos['resultado'] = self.resultado
+        return datos
+
+
+class GestorTrabajos:
+    """
+    Cola de trabajos en segundo plano sobre un ThreadPoolExecutor.
+
+    Los trabajos viven en memoria del proceso: con gunicorn debe usarse un
+    solo proceso (con varios hilos) para que GET /jobs/<id> llegue al mismo
+    proceso que aceptó el trabajo.
+    """
+
+    def __init__(self, max_workers: int = 2, max_terminados: int = 50):
+        """
+        Inicializa el gestor
+
+        Args:
+            max_workers: Trabajos ejecutados simultáneamente (el resto espera en cola)
+            max_terminados: Trabajos terminados que se conservan para consulta
+        """
+        self.max_terminados = max_terminados
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='trabajo')
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, tipo: str, funcion: Callable, *args, usuario: Optional[str] = None, **kwargs) -> Trabajo:
+        """
+        Encola un trabajo
+
+        Args:
+            tipo: Tipo de trabajo (informativo)
+            funcion: Función a ejecutar; recibe el Trabajo como primer argumento
+                     y su valor de retorno queda como resultado del trabajo
+            usuario: Usuario que envió el trabajo
+            *args, **kwargs: Argumentos adicionales de la función
+
+        Returns:
+            Trabajo creado
+        """
+        trabajo = Trabajo(tipo, usuario)
+        with self._lock:
+            self._purgar()
+            self._trabajos[trabajo.id] = trabajo
+        trabajo._futuro = self._executor.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        return trabajo
+
+    def _ejecutar(self, trabajo: Trabajo, funcion: Callable, args: tuple, kwargs: Dict):
+        if trabajo.cancelacion.is_set():
+            trabajo.terminado = datetime.now()
+            trabajo.estado = 'cancelado'
+            return
+
+        trabajo.estado = 'ejecutando'
+        trabajo.iniciado = datetime.now()
+        try:
+            trabajo.resultado = funcion(trabajo, *args, **kwargs)
+            estado = 'cancelado' if trabajo.cancelacion.is_set() else 'completado'
+        except Exception as e:
+            print(f"Error en trabajo {trabajo.id} ({trabajo.tipo}): {e}")
+            trabajo.error = str(e)
+            estado = 'fallido'
+        # 'terminado' se asigna antes que el estado final: _purgar ordena por él
+        trabajo.terminado = datetime.now()
+        trabajo.estado = estado
+
+    def obtener(self, trabajo_id: str) -> Optional[Trabajo]:
+        """Retorna un trabajo por su id (None si no existe)"""
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """
+        Solicita la cancelación de un trabajo
+
+        Returns:
+            True si el trabajo existía y no había terminado
+        """
+        trabajo = self.obtener(trabajo_id)
+        if trabajo is None or trabajo.finalizado:
+            return False
+        trabajo.cancelacion.set()
+        # Si aún no empezó, sale de la cola sin ejecutarse
+        if trabajo._futuro is not None and trabajo._futuro.cancel():
+            trabajo.terminado = datetime.now()
+            trabajo.estado = 'cancelado'
+        return True
+
+    def listar(self, usuario: Optional[str] = None) -> List[Dict]:
+        """Lista los trabajos (opcionalmente solo los de un usuario), del más reciente al más antiguo"""
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        if usuario is not None:
+            trabajos = [t for t in trabajos if t.usuario == usuario]
+        return [t.a_dict() for t in sorted(trabajos, key=lambda t: t.creado, reverse=True)]
+
+    def _purgar(self):
+        """Descarta los trabajos terminados más antiguos (requiere el lock)"""
+        terminados = sorted((t for t in self._trabajos.values() if t.finalizado), key=lambda t: t.terminado)
+        for trabajo in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[trabajo.id]
+
+    def cerrar(self, esperar: bool = False):
+        """Cancela los trabajos pendientes y cierra el pool"""
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        for trabajo in trabajos:
+            if not trabajo.finalizado:
+                self.cancelar(trabajo.id)
+        self._executor.shutdown(wait=esperar)
@@ -1,35 +1,160 @@
+import re
 import requests
+import lxml.html
+from lxml import etree
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
-import json
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 import os
-from typing import List, Dict
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Callable, List, Dict, Optional
 from Helpers import Funciones
+from Helpers.cacheHttp import CacheHTTP
+from Helpers.almacenDocumentos import AlmacenDocumentos
+from Helpers.frontera import FronteraURL, canonicalizar_url
+from Helpers.estadoCrawl import EstadoCrawl
+from Helpers.planificador import PlanificadorCortesia
+
+# <a href> del primer div con clase containerblanco (equivale a soup.find + find_all('a'))
+_XPATH_LINKS_CONTENEDOR = etree.XPath(
+    "(//div[contains(concat(' ', normalize-space(@class), ' '), ' containerblanco ')])[1]//a/@href"
+)
 
 
 class WebScraping:
     """Clase para realizar web scraping y extracción de enlaces"""
     
-    def __init__(self, dominio_base: str = "https://www.minsalud.gov.co/Normativa/"):
+    def __init__(self, dominio_base: str = "https://www.minsalud.gov.co/Normativa/",
+                 carpeta_cache: Optional[str] = None,
+                 planificador: Optional[PlanificadorCortesia] = None):
         """
         Inicializa la clase WebScraping
         
         Args:
             dominio_base: Dominio base para validar enlaces
+            carpeta_cache: Carpeta de la caché HTTP condicional (None para desactivarla)
+            planificador: Planificador de cortesía compartido (None para no limitar la tasa)
         """
         self.dominio_base = dominio_base
+        self.cache = CacheHTTP(carpeta_cache) if carpeta_cache else None
+        self.planificador = planificador
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Semáforos por (host, límite) para limitar peticiones simultáneas al mismo servidor
+        self._semaforos_host = {}
+        self._lock_semaforos = threading.Lock()
+    
+    def _ajustar_pool_conexiones(self, tamaño: int, reintentos: int = 0, backoff: float = 0):
+        """
+        Ajusta el pool de conexiones de la sesión al número de hilos que la usan
+        
+        Args:
+            tamaño: Conexiones que se mantienen abiertas por host
+            reintentos: Reintentos ante errores de conexión y respuestas 429/5xx
+            backoff: Factor de espera exponencial entre reintentos (segundos)
+        """
+        # Con planificador, los 429/503 deben llegar a él para que ajuste la tasa
+        estados = [500, 502, 504] if self.planificador else [429, 500, 502, 503, 504]
+        max_retries = Retry(
+            total=reintentos,
+            backoff_factor=backoff,
+            status_forcelist=estados,
+            allowed_methods=['HEAD', 'GET'],
+            raise_on_status=False
+        ) if reintentos else 0
+        adaptador = HTTPAdapter(pool_connections=tamaño, pool_maxsize=tamaño, max_retries=max_retries)
+        self.session.mount('http://', adaptador)
+        self.session.mount('https://', adaptador)
+    
+    def _semaforo_host(self, url: str, max_por_host: int) -> threading.BoundedSemaphore:
+        """
+        Retorna el semáforo que limita la concurrencia hacia el host de la URL.
+        La clave incluye el límite para que cada llamada use el tamaño que pidió
+        y no el del primer rastreo que llegó a ese host.
+        """
+        clave = (urlsplit(url).netloc.lower(), max_por_host)
+        with self._lock_semaforos:
+            if clave not in self._semaforos_host:
+                self._semaforos_host[clave] = threading.BoundedSemaphore(max_por_host)
+            return self._semaforos_host[clave]
     
-    def extract_links(self, url: str, listado_extensiones: List[str] = None) -> List[Dict]:
+    def _extract_links_limitado(self, url: str, listado_extensiones: List[str], max_por_host: int) -> List[Dict]:
+        """Ejecuta extract_links respetando el límite de concurrencia por host"""
+        with self._semaforo_host(url, max_por_host):
+            return self.extract_links(url, listado_extensiones)
+    
+    def _peticion_planificada(self, url: str, peticion, evaluar_latencia: bool = True,
+                              reintentos_saturacion: int = 3):
+        """
+        Ejecuta una petición respetando el planificador de cortesía: espera un
+        token del host, informa el resultado para el ajuste AIMD y, ante
+        429/503, reintenta cuando el planificador lo permita
+        
+        Args:
+            url: URL solicitada
+            peticion: Función sin argumentos que realiza la petición
+            evaluar_latencia: False para descargas grandes, donde el tiempo total no indica saturación
+            reintentos_saturacion: Reintentos ante respuestas 429/503
+        """
+        if not self.planificador:
+            return peticion()
+        
+        intento = 0
+        while True:
+            self.planificador.esperar(url)
+            inicio = time.perf_counter()
+            try:
+                resultado = peticion()
+            except requests.exceptions.HTTPError as e:
+                respuesta = e.response
+                status = respuesta.status_code if respuesta is not None else None
+                self.planificador.registrar_respuesta(
+                    url, status, retry_after=respuesta.headers.get('Retry-After') if respuesta is not None else None
+                )
+                intento += 1
+                if status in (429, 503) and intento <= reintentos_saturacion:
+                    continue
+                raise
+            except requests.exceptions.RequestException:
+                self.planificador.registrar_respuesta(url, None)
+                raise
+            
+            latencia = time.perf_counter() - inicio
+            self.planificador.registrar_respuesta(url, 200, latencia if evaluar_latencia else None)
+            return resultado
+    
+    def _obtener_contenido(self, url: str, timeout: float = 30) -> bytes:
+        """Descarga el contenido de una página, pasando por la caché HTTP si está activa"""
+        if self.cache:
+            contenido, _ = self._peticion_planificada(
+                url, lambda: self.cache.obtener(self.session, url, timeout=timeout)
+            )
+            return contenido
+        
+        def peticion():
+            response = self.session.get(url, timeout=timeout)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            return response.content
+        
+        return self._peticion_planificada(url, peticion)
+    
+    def extract_links(self, url: str, listado_extensiones: List[str] = None, motor: str = 'lxml',
+                      lanzar_errores: bool = False) -> List[Dict]:
         """
         Extrae links internos según listado de extensiones que puede ser "PDF, ASPX, PHP"
         
         Args:
             url: URL de la página a analizar
             listado_extensiones: Lista de extensiones a filtrar (ej: ['pdf', 'aspx', 'php'])
+            motor: 'lxml' (XPath directo, rápido) o 'bs4' (BeautifulSoup, implementación original)
+            lanzar_errores: Si True, un error al obtener o procesar la página se propaga
+                            en lugar de retornar una lista vacía
             
         Returns:
             Lista de diccionarios con 'url' y 'type' de cada enlace encontrado
@@ -38,54 +163,148 @@ class WebScraping:
         if listado_extensiones is None:
             listado_extensiones = ['pdf', 'aspx']
         
+        if self.planificador and not self.planificador.permitido(url):
+            print(f"Omitido por robots.txt: {url}")
+            return []
+        
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            
-            soup = BeautifulSoup(response.content, 'lxml')
-            container_div = soup.find('div', class_='containerblanco')
-            print(f"Encontrado div containerblanco: {container_div is not None}")
+            contenido = self._obtener_contenido(url, timeout=30)
             
-            links = []
-            if container_div:
-                for link in container_div.find_all('a'):
-                    href = link.get('href')
-                    if href:
-                        print(f"Encontrado link: {href}")
-                        full_url = urljoin(url, href)
-                        # Verificar extensión
-                        for ext in listado_extensiones:
-                            ext_lower = ext.lower().strip()
-                            if full_url.lower().endswith(f'.{ext_lower}'):
-                                print(f"Agregando link: {full_url} de tipo [{ext_lower}]")
-                                links.append({
-                                    'url': full_url,
-                                    'type': ext_lower
-                                })
-                                break  # Solo agregar una vez
-                            else:
-                                print(f"Link {full_url} NO coincide con la extensión {ext_lower}")
+            if motor == 'bs4':
+                links = self.parsear_links_bs4(contenido, url, listado_extensiones)
+            else:
+                links = self.parsear_links_lxml(contenido, url, listado_extensiones)
             
+            print(f"Encontrados {len(links)} links en {url}")
             return links
             
         except requests.exceptions.RequestException as e:
             print(f"Error fetching {url}: {e}")
+            if lanzar_errores:
+                raise
             return []
         except Exception as e:
             print(f"Error procesando {url}: {e}")
+            if lanzar_errores:
+                raise
             return []
     
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _patron_extensiones(extensiones: tuple):
+        """
+        Compila una sola expresión regular que reconoce cualquiera de las
+        extensiones al final de la URL (en lugar de un endswith por extensión)
+        """
+        alternativas = '|'.join(re.escape(ext) for ext in extensiones)
+        return re.compile(rf'\.({alternativas})$', re.IGNORECASE)
+    
+    @staticmethod
+    def _normalizar_extensiones(listado_extensiones: List[str]) -> tuple:
+        """Normaliza y deduplica las extensiones conservando su orden"""
+        return tuple(dict.fromkeys(ext.lower().strip() for ext in listado_extensiones if ext.strip()))
+    
+    @staticmethod
+    def parsear_links_lxml(contenido: bytes, url: str, listado_extensiones: List[str]) -> List[Dict]:
+        """
+        Extrae los links del div.containerblanco con lxml y XPath, sin construir
+        el árbol de BeautifulSoup. Solo se recorren los <a href> del contenedor;
+        los href vacíos o de solo fragmento ('#') se omiten, como en parsear_links_bs4.
+        """
+        if not contenido:
+            return []
+        extensiones = WebScraping._normalizar_extensiones(listado_extensiones)
+        if not extensiones:
+            return []
+        patron = WebScraping._patron_extensiones(extensiones)
+        
+        # Sin charset declarado lxml asume latin-1; BeautifulSoup detecta UTF-8 y los
+        # enlaces con tildes deben salir iguales con ambos motores
+        parser = None
+        if b'charset' not in contenido[:4096].lower():
+            try:
+                contenido.decode('utf-8')
+                parser = lxml.html.HTMLParser(encoding='utf-8')
+            except UnicodeDecodeError:
+                pass
+        arbol = lxml.html.fromstring(contenido, parser=parser)
+        
+        links = []
+        for href in _XPATH_LINKS_CONTENEDOR(arbol):
+            href = href.strip()
+            # Un href vacío o '#' apunta a la misma página: urljoin lo convertiría en un auto-enlace
+            if not href or href.startswith('#'):
+                continue
+            full_url = urljoin(url, href)
+            coincidencia = patron.search(full_url)
+            if coincidencia:
+                links.append({
+                    'url': full_url,
+                    'type': coincidencia.group(1).lower()
+                })
+        return links
+    
+    @staticmethod
+    def parsear_links_bs4(contenido: bytes, url: str, listado_extensiones: List[str]) -> List[Dict]:
+        """
+        Extrae los links del div.containerblanco con BeautifulSoup (implementación
+        original, se conserva como referencia para el benchmark)
+        """
+        soup = BeautifulSoup(contenido, 'lxml')
+        container_div = soup.find('div', class_='containerblanco')
+        
+        links = []
+        if container_div:
+            for link in container_div.find_all('a'):
+                href = (link.get('href') or '').strip()
+                if href and not href.startswith('#'):
+                    full_url = urljoin(url, href)
+                    # Verificar extensión
+                    for ext in listado_extensiones:
+                        ext_lower = ext.lower().strip()
+                        if full_url.lower().endswith(f'.{ext_lower}'):
+                            links.append({
+                                'url': full_url,
+                                'type': ext_lower
+                            })
+                            break  # Solo agregar una vez
+        return links
+    
     def extraer_todos_los_links(self, url_inicial: str, json_file_path: str, 
                                 listado_extensiones: List[str] = None,
-                                max_iteraciones: int = 100) -> Dict:
+                                max_iteraciones: int = 100,
+                                concurrente: bool = False,
+                                max_workers: int = 8,
+                                max_por_host: int = 4,
+                                intervalo_checkpoint: int = 500,
+                                progreso: Optional[Callable] = None,
+                                cancelacion: Optional[threading.Event] = None,
+                                reintentos: int = 3, backoff: float = 0.5) -> Dict:
         """
-        Extrae todos los links de forma recursiva desde una URL inicial
+        Extrae todos los links de forma recursiva desde una URL inicial.
+        
+        El estado del rastreo se guarda como bitácora de solo-anexar junto al
+        JSON (ver EstadoCrawl). Si un rastreo anterior se interrumpió, se reanuda
+        con su misma cola de páginas pendientes y las iteraciones ya hechas
+        cuentan para max_iteraciones; si terminó, se comienza uno nuevo. El
+        rastreo solo termina cuando la cola queda vacía: si se detiene por
+        max_iteraciones, una llamada con un límite mayor continúa donde quedó.
+        Si la URL inicial no se puede obtener (tras los reintentos) se retorna
+        success False y el rastreo no se da por terminado.
         
         Args:
             url_inicial: URL inicial para comenzar la extracción
             json_file_path: Ruta del archivo JSON para guardar/cargar links
             listado_extensiones: Lista de extensiones a filtrar
             max_iteraciones: Número máximo de iteraciones para evitar loops infinitos
+            concurrente: Si True, visita las páginas ASPX con un pool de hilos
+            max_workers: Número máximo de páginas visitadas en paralelo (modo concurrente)
+            max_por_host: Número máximo de peticiones simultáneas a un mismo host (modo concurrente)
+            intervalo_checkpoint: Eventos de la bitácora entre checkpoints compactados
+            progreso: Función progreso(etapa, hecho, total, **contadores) llamada tras cada página
+            cancelacion: Evento que detiene el rastreo; el estado queda pendiente y se reanuda luego
+            reintentos: Reintentos por página ante errores de conexión y respuestas 5xx
+            backoff: Factor de espera exponencial entre reintentos (segundos)
             
         Returns:
             Diccionario con el resultado de la extracción
@@ -93,104 +312,257 @@ class WebScraping:
         if listado_extensiones is None:
             listado_extensiones = ['pdf', 'aspx']
         
-        # Cargar links existentes del archivo JSON
-        all_links = self._cargar_links_desde_json(json_file_path)
+        inicio = time.perf_counter()
+        max_workers = max(1, max_workers)
+        # Un pool del tamaño de los hilos y con reintentos en ambos modos (incluida la URL inicial)
+        self._ajustar_pool_conexiones(max_workers if concurrente else 1, reintentos, backoff)
+        
+        # Cargar el estado del rastreo (checkpoint + bitácora)
+        estado = EstadoCrawl(json_file_path, intervalo_checkpoint=intervalo_checkpoint)
+        if estado.datos['completado']:
+            print(f"El rastreo anterior de {json_file_path} terminó. Se inicia uno nuevo.")
+            estado.reiniciar()
+        
+        frontera = FronteraURL(estado.datos['links'])
+        for url_visitada in estado.datos['visitadas']:
+            frontera.marcar_visitada(url_visitada)
+        reanudado = bool(len(frontera))
+        # Cada iteración registra exactamente una página visitada
+        iteraciones_previas = len(frontera.visitados)
+        if reanudado:
+            print(f"Reanudando rastreo: {len(frontera)} links, {iteraciones_previas} páginas visitadas")
         
         # Si no hay links, extraer de la URL inicial
-        if not all_links:
+        if not len(frontera):
             print(f"Extrayendo links de la URL inicial: {url_inicial}")
-            all_links = self.extract_links(url_inicial, listado_extensiones)
-        
-        # Obtener links ASPX para visitar
-        aspx_links_to_visit = [
-            link['url'] for link in all_links 
-            if link['type'] == 'aspx' and link['url'].startswith(self.dominio_base)
-        ]
+            try:
+                links_iniciales = self.extract_links(url_inicial, listado_extensiones, lanzar_errores=True)
+            except Exception as e:
+                # Sin la URL inicial el rastreo quedaría vacío: no se marca como terminado
+                estado.cerrar()
+                return {
+                    'success': False,
+                    'error': f'No se pudo obtener la URL inicial {url_inicial}: {e}',
+                    'total_links': 0,
+                    'links': [],
+                    'iteraciones': 0
+                }
+            for link in links_iniciales:
+                if frontera.agregar_link(link):
+                    estado.registrar_link(frontera.links[-1])
         
-        visited_aspx_links = set()
-        iteraciones = 0
+        if reanudado and estado.datos['encoladas'] is not None:
+            # La bitácora guarda la cola real; encolar descarta las ya visitadas
+            for url_pendiente in estado.datos['encoladas']:
+                frontera.encolar(url_pendiente)
+        else:
+            # Rastreo nuevo (o checkpoint sin cola): links ASPX del dominio base
+            dominio_base = canonicalizar_url(self.dominio_base)
+            for link in frontera.links:
+                if link['type'] == 'aspx' and link['url'].startswith(dominio_base):
+                    if frontera.encolar(link['url']):
+                        estado.registrar_encolada(link['url'])
         
-        # Recorrer links ASPX
-        while aspx_links_to_visit and iteraciones < max_iteraciones:
-            iteraciones += 1
-            current_aspx_url = aspx_links_to_visit.pop(0)
+        try:
+            if concurrente:
+                iteraciones = self._recorrer_concurrente(
+                    frontera, estado, listado_extensiones, max_iteraciones, max_workers, max_por_host,
+                    progreso, cancelacion, iteraciones_previas
+                )
+            else:
+                iteraciones = self._recorrer_secuencial(
+                    frontera, estado, listado_extensiones, max_iteraciones, progreso, cancelacion,
+                    iteraciones_previas
+                )
             
-            if current_aspx_url not in visited_aspx_links:
-                visited_aspx_links.add(current_aspx_url)
-                print(f"Iteración {iteraciones}: Visitando: {current_aspx_url}")
-                
-                new_links = self.extract_links(current_aspx_url, listado_extensiones)
-                
-                for link in new_links:
-                    # Verificar si el link no está ya en la lista
-                    if not any(existing_link['url'] == link['url'] for existing_link in all_links):
-                        all_links.append(link)
-                        
-                        # Si es ASPX, agregarlo a la cola de visitas
-                        if link['type'] == 'aspx' and link['url'] not in visited_aspx_links:
-                            aspx_links_to_visit.append(link['url'])
-        
-        if iteraciones >= max_iteraciones:
-            print(f"Advertencia: Se alcanzó el máximo de {max_iteraciones} iteraciones")
+            cancelado = cancelacion is not None and cancelacion.is_set()
+            completado = not cancelado and not frontera.hay_pendientes()
+            if cancelado:
+                print(f"Rastreo cancelado tras {iteraciones} páginas")
+            elif frontera.hay_pendientes():
+                # La cola se conserva: el rastreo se reanuda con un max_iteraciones mayor
+                print(f"Advertencia: Se alcanzó el máximo de {max_iteraciones} iteraciones "
+                      f"con {frontera.pendientes()} páginas pendientes")
+            else:
+                estado.marcar_completado()
+        finally:
+            # Checkpoint compactado (también si el rastreo se interrumpe con una excepción)
+            estado.cerrar()
         
-        # Guardar en JSON
-        json_output = {"links": all_links}
-        self._guardar_links_en_json(json_file_path, json_output)
+        all_links = frontera.links
+        duracion = time.perf_counter() - inicio
+        paginas_por_segundo = (iteraciones - iteraciones_previas) / duracion if duracion > 0 else 0.0
         
         print(f"Finalizado: Se encontraron {len(all_links)} links en total")
+        print(f"Páginas visitadas: {iteraciones} ({paginas_por_segundo:.2f} páginas/s)")
         
         return {
             'success': True,
             'total_links': len(all_links),
             'links': all_links,
-            'iteraciones': iteraciones
+            'iteraciones': iteraciones,
+            'reanudado': reanudado,
+            'cancelado': cancelado,
+            'completado': completado,
+            'paginas_visitadas': len(frontera.visitados),
+            'duracion_segundos': round(duracion, 3),
+            'paginas_por_segundo': round(paginas_por_segundo, 3)
         }
     
-    def _cargar_links_desde_json(self, json_file_path: str) -> List[Dict]:
-        """Carga links desde un archivo JSON"""
-        if os.path.exists(json_file_path):
-            try:
-                with open(json_file_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                all_links = json_data.get("links", [])
-                print(f"Cargados {len(all_links)} links desde {json_file_path}")
-                return all_links
-            except json.JSONDecodeError:
-                print(f"Advertencia: {json_file_path} contiene JSON inválido. Inicializando con lista vacía.")
-                return []
-        else:
-            print(f"{json_file_path} no encontrado. Se creará un nuevo archivo.")
-            return []
+    def _agregar_links_nuevos(self, frontera: FronteraURL, estado: EstadoCrawl,
+                              url_visitada: str, new_links: List[Dict]):
+        """
+        Registra en la frontera y en la bitácora los links nuevos, encola los
+        ASPX pendientes y por último marca la página como visitada, de modo que
+        una interrupción nunca deja una página visitada con links sin registrar
+        """
+        for link in new_links:
+            if frontera.agregar_link(link):
+                estado.registrar_link(frontera.links[-1])
+                # Si es ASPX, agregarlo a la cola de visitas
+                if link['type'] == 'aspx' and frontera.encolar(link['url']):
+                    estado.registrar_encolada(frontera.links[-1]['url'])
+        estado.registrar_visitada(url_visitada)
     
-    def _guardar_links_en_json(self, json_file_path: str, data: Dict):
-        """Guarda links en un archivo JSON"""
-        try:
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(json_file_path), exist_ok=True) if os.path.dirname(json_file_path) else None
+    @staticmethod
+    def _siguiente_visita(frontera: FronteraURL, iteraciones: int, max_iteraciones: int) -> Optional[str]:
+        """
+        Toma la siguiente página pendiente y la marca como visitada si queda
+        presupuesto de iteraciones. Ambos modos cuentan así una iteración por
+        página despachada, de modo que el mismo límite visita las mismas páginas.
+        
+        Returns:
+            URL a visitar, o None si se agotó el presupuesto o la cola
+        """
+        if iteraciones >= max_iteraciones:
+            return None
+        url = frontera.siguiente()
+        if url is None:
+            return None
+        frontera.marcar_visitada(url)
+        print(f"Iteración {iteraciones + 1}: Visitando: {url}")
+        return url
+    
+    @staticmethod
+    def _reportar_rastreo(progreso: Optional[Callable], frontera: FronteraURL,
+                          iteraciones: int, en_curso: int, max_iteraciones: int):
+        """Reporta el avance del rastreo; el total es una estimación que crece con la cola"""
+        if progreso is None:
+            return
+        total = min(max_iteraciones, iteraciones + frontera.pendientes())
+        progreso('rastreo', iteraciones - en_curso, total, links=len(frontera))
+    
+    def _recorrer_secuencial(self, frontera: FronteraURL, estado: EstadoCrawl,
+                             listado_extensiones: List[str], max_iteraciones: int,
+                             progreso: Optional[Callable] = None,
+                             cancelacion: Optional[threading.Event] = None,
+                             iteraciones_previas: int = 0) -> int:
+        """
+        Visita las páginas ASPX una a una. Retorna el número de iteraciones,
+        contando las iteraciones_previas de un rastreo reanudado
+        """
+        iteraciones = iteraciones_previas
+        
+        # Recorrer links ASPX
+        while not (cancelacion is not None and cancelacion.is_set()):
+            current_aspx_url = self._siguiente_visita(frontera, iteraciones, max_iteraciones)
+            if current_aspx_url is None:
+                break
+            iteraciones += 1
             
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            print(f"Links guardados en {json_file_path}")
-        except Exception as e:
-            print(f"Error al guardar JSON: {e}")
+            new_links = self.extract_links(current_aspx_url, listado_extensiones)
+            self._agregar_links_nuevos(frontera, estado, current_aspx_url, new_links)
+            self._reportar_rastreo(progreso, frontera, iteraciones, 0, max_iteraciones)
+        
+        return iteraciones
+    
+    def _recorrer_concurrente(self, frontera: FronteraURL, estado: EstadoCrawl,
+                              listado_extensiones: List[str], max_iteraciones: int,
+                              max_workers: int, max_por_host: int,
+                              progreso: Optional[Callable] = None,
+                              cancelacion: Optional[threading.Event] = None,
+                              iteraciones_previas: int = 0) -> int:
+        """
+        Visita las páginas ASPX con un pool de hilos acotado. Retorna el número
+        de iteraciones, contando las iteraciones_previas de un rastreo reanudado.
+        
+        Solo el hilo principal modifica la frontera y la bitácora; los hilos del
+        pool únicamente descargan y parsean páginas. Cada página enviada al pool
+        cuenta como una iteración, igual que en el modo secuencial, y una página
+        que falla se registra como visitada sin links (como hace extract_links),
+        de modo que el mismo max_iteraciones visita el mismo número de páginas.
+        Al cancelar no se envían páginas nuevas y se esperan (y registran) las
+        que están en curso.
+        """
+        iteraciones = iteraciones_previas
+        pendientes = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while frontera.hay_pendientes() or pendientes:
+                # Llenar el pool con páginas aún no visitadas
+                cancelado = cancelacion is not None and cancelacion.is_set()
+                while not cancelado and len(pendientes) < max_workers:
+                    current_aspx_url = self._siguiente_visita(frontera, iteraciones, max_iteraciones)
+                    if current_aspx_url is None:
+                        break
+                    iteraciones += 1
+                    futuro = executor.submit(
+                        self._extract_links_limitado, current_aspx_url, listado_extensiones, max_por_host
+                    )
+                    pendientes[futuro] = current_aspx_url
+                
+                if not pendientes:
+                    break
+                
+                completados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in completados:
+                    url_visitada = pendientes.pop(futuro)
+                    try:
+                        new_links = futuro.result()
+                    except Exception as e:
+                        print(f"Error procesando {url_visitada}: {e}")
+                        new_links = []
+                    self._agregar_links_nuevos(frontera, estado, url_visitada, new_links)
+                self._reportar_rastreo(progreso, frontera, iteraciones, len(pendientes), max_iteraciones)
+        
+        return iteraciones
     
-    def descargar_pdfs(self, json_file_path: str, carpeta_destino: str = "static/uploads") -> Dict:
+    def descargar_pdfs(self, json_file_path: str, carpeta_destino: str = "static/uploads",
+                       max_workers: int = 8, timeout: float = 60,
+                       reintentos: int = 3, backoff: float = 0.5,
+                       almacen: Optional[AlmacenDocumentos] = None,
+                       chunk_size: int = 1048576,
+                       progreso: Optional[Callable] = None,
+                       cancelacion: Optional[threading.Event] = None) -> Dict:
         """
         Recorre el archivo JSON y descarga los archivos PDF en la carpeta especificada
         
         Args:
             json_file_path: Ruta del archivo JSON con los links
             carpeta_destino: Carpeta donde se descargarán los PDFs (default: static/uploads)
+            max_workers: Número de descargas simultáneas
+            timeout: Timeout (segundos) de conexión y lectura por archivo
+            reintentos: Reintentos por archivo ante errores de red o respuestas 429/5xx
+            backoff: Factor de espera exponencial entre reintentos (segundos)
+            almacen: Almacén direccionado por contenido. Si se indica, la carpeta de
+                     destino no se borra, cada PDF se guarda en el almacén asociado
+                     a su URL y el resultado incluye 'archivos' sin contenido repetido
+            chunk_size: Tamaño de bloque de escritura en bytes
+            progreso: Función progreso(etapa, hecho, total, **contadores) llamada tras cada archivo
+            cancelacion: Evento que descarta las descargas que aún no empezaron
             
         Returns:
-            Diccionario con el resultado de la descarga
+            Diccionario con el resultado de la descarga y estadísticas de throughput
         """
+        estado = None
         try:
-            # Cargar links desde JSON
-            all_links = self._cargar_links_desde_json(json_file_path)
+            # Cargar links desde el estado del rastreo; las descargas se registran en su bitácora
+            estado = EstadoCrawl(json_file_path)
+            all_links = estado.datos['links']
+            print(f"Cargados {len(all_links)} links desde {json_file_path}")
             
-            # Filtrar solo links PDF
-            pdf_links = [link for link in all_links if link.get('type') == 'pdf']
+            # Filtrar solo links PDF (sin repetir URLs equivalentes)
+            pdf_links = [link for link in FronteraURL(all_links).links if link.get('type') == 'pdf']
             
             if not pdf_links:
                 return {
@@ -203,73 +575,117 @@ class WebScraping:
             # Crear carpeta de destino si no existe
             Funciones.crear_carpeta(carpeta_destino)
             
-            # Borrar contenido de la carpeta antes de descargar
-            print(f"Limpiando contenido de la carpeta: {carpeta_destino}")
-            Funciones.borrar_contenido_carpeta(carpeta_destino)
+            # Borrar contenido de la carpeta antes de descargar (con almacén la
+            # carpeta solo recibe temporales que se mueven al almacén)
+            if almacen is None:
+                print(f"Limpiando contenido de la carpeta: {carpeta_destino}")
+                Funciones.borrar_contenido_carpeta(carpeta_destino)
+            
+            # Un pool de conexiones del tamaño del número de hilos evita que las
+            # descargas esperen por una conexión libre o abran conexiones descartables
+            max_workers = max(1, max_workers)
+            self._ajustar_pool_conexiones(max_workers, reintentos, backoff)
+            
+            # Asignar nombres de archivo antes de lanzar los hilos para evitar colisiones
+            tareas = []
+            nombres_usados = set()
+            omitidos = 0
+            for i, link in enumerate(pdf_links, 1):
+                # Los PDFs ya descargados en una ejecución interrumpida siguen en el almacén
+                if (almacen is not None and link['url'] in estado.datos['descargados']
+                        and almacen.tiene_origen(link['url'])):
+                    omitidos += 1
+                    continue
+                nombre_archivo = self._nombre_archivo_pdf(link['url'], i, nombres_usados)
+                ruta_archivo = os.path.join(carpeta_destino, nombre_archivo)
+                if almacen is not None:
+                    ruta_archivo += '.descarga'
+                tareas.append((i, link['url'], ruta_archivo))
             
             # Descargar PDFs
             descargados = 0
             errores = 0
             archivos_errores = []
+            latencias = []
+            total_bytes = 0
+            desde_cache_total = 0
             
-            print(f"Iniciando descarga de {len(pdf_links)} archivos PDF...")
+            print(f"Iniciando descarga de {len(pdf_links)} archivos PDF con {max_workers} hilos...")
+            inicio = time.perf_counter()
             
-            for i, link in enumerate(pdf_links, 1):
-                pdf_url = link['url']
-                try:
-                    # Obtener nombre del archivo desde la URL
-                    nombre_archivo = os.path.basename(pdf_url.split('?')[0])  # Remover query params
-                    
-                    # Si no tiene extensión .pdf, agregarla
-                    if not nombre_archivo.lower().endswith('.pdf'):
-                        nombre_archivo += '.pdf'
-                    
-                    # Limpiar nombre de archivo (remover caracteres especiales)
-                    from werkzeug.utils import secure_filename
-                    nombre_archivo = secure_filename(nombre_archivo)
-                    
-                    # Si el nombre está vacío, generar uno
-                    if not nombre_archivo or nombre_archivo == '.pdf':
-                        nombre_archivo = f"archivo_{i}.pdf"
-                    
-                    ruta_archivo = os.path.join(carpeta_destino, nombre_archivo)
-                    
-                    # Descargar archivo
-                    print(f"Descargando [{i}/{len(pdf_links)}]: {nombre_archivo}")
-                    response = self.session.get(pdf_url, stream=True, timeout=60)
-                    response.raise_for_status()
-                    
-                    # Guardar archivo
-                    with open(ruta_archivo, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    descargados += 1
-                    
-                except Exception as e:
-                    errores += 1
-                    archivos_errores.append({
-                        'url': pdf_url,
-                        'error': str(e)
-                    })
-                    print(f"Error al descargar {pdf_url}: {e}")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futuros = {
+                    executor.submit(self._descargar_archivo, pdf_url, ruta_archivo, timeout, reintentos, backoff, chunk_size): (i, pdf_url, ruta_archivo)
+                    for i, pdf_url, ruta_archivo in tareas
+                }
+                
+                cancelado = False
+                for futuro in as_completed(futuros):
+                    if not cancelado and cancelacion is not None and cancelacion.is_set():
+                        # Las descargas en curso terminan y se registran; las demás se descartan
+                        cancelado = True
+                        for pendiente in futuros:
+                            pendiente.cancel()
+                        print("Descarga cancelada")
+                    if futuro.cancelled():
+                        continue
+                    i, pdf_url, ruta_archivo = futuros[futuro]
+                    try:
+                        num_bytes, latencia, desde_cache = futuro.result()
+                        nombre_archivo = os.path.basename(ruta_archivo)
+                        if almacen is not None:
+                            nombre_archivo = nombre_archivo[:-len('.descarga')]
+                            almacen.guardar_archivo(ruta_archivo, origen=pdf_url, nombre=nombre_archivo, mover=True)
+                        estado.registrar_descarga(pdf_url, {'nombre': nombre_archivo, 'bytes': num_bytes})
+                        descargados += 1
+                        if desde_cache:
+                            desde_cache_total += 1
+                        total_bytes += num_bytes
+                        latencias.append(latencia)
+                        print(f"Descargado [{i}/{len(pdf_links)}]: {nombre_archivo} ({num_bytes} bytes, {latencia:.2f}s)")
+                    except Exception as e:
+                        errores += 1
+                        archivos_errores.append({
+                            'url': pdf_url,
+                            'error': str(e)
+                        })
+                        print(f"Error al descargar {pdf_url}: {e}")
+                    if progreso is not None:
+                        progreso('descarga', descargados + errores, len(tareas), descargados=descargados,
+                                 errores=errores, desde_cache=desde_cache_total, bytes=total_bytes)
+            
+            duracion = time.perf_counter() - inicio
             
             resultado = {
                 'success': True,
                 'total': len(pdf_links),
                 'descargados': descargados,
+                'omitidos': omitidos,
                 'errores': errores,
-                'carpeta_destino': carpeta_destino
+                'cancelado': cancelado,
+                'carpeta_destino': carpeta_destino,
+                'bytes_descargados': total_bytes,
+                'desde_cache': desde_cache_total,
+                'duracion_segundos': round(duracion, 3),
+                'bytes_por_segundo': round(total_bytes / duracion, 1) if duracion > 0 else 0.0,
+                'latencia_p50': round(Funciones.percentil(latencias, 50), 3),
+                'latencia_p95': round(Funciones.percentil(latencias, 95), 3)
             }
             
             if archivos_errores:
                 resultado['archivos_con_error'] = archivos_errores
             
+            if almacen is not None:
+                almacen.guardar_manifiesto()
+                resultado['archivos'] = almacen.listar_documentos(origenes=[link['url'] for link in pdf_links])
+            
             print(f"\nDescarga completada:")
             print(f"  Total: {len(pdf_links)}")
             print(f"  Descargados: {descargados}")
             print(f"  Errores: {errores}")
+            print(f"  Servidos desde caché (304): {desde_cache_total}")
+            print(f"  Throughput: {resultado['bytes_por_segundo'] / 1048576:.2f} MB/s")
+            print(f"  Latencia p50/p95: {resultado['latencia_p50']}s / {resultado['latencia_p95']}s")
             
             return resultado
             
@@ -281,6 +697,72 @@ class WebScraping:
                 'descargados': 0,
                 'errores': 0
             }
+        finally:
+            # Checkpoint compactado y bitácora cerrada también si la descarga falla
+            if estado is not None:
+                estado.cerrar()
+    
+    @staticmethod
+    def _nombre_archivo_pdf(pdf_url: str, indice: int, nombres_usados: set) -> str:
+        """Genera un nombre de archivo seguro y único para la URL de un PDF"""
+        from werkzeug.utils import secure_filename
+        
+        # Obtener nombre del archivo desde la URL
+        nombre_archivo = os.path.basename(pdf_url.split('?')[0])  # Remover query params
+        
+        # Si no tiene extensión .pdf, agregarla
+        if not nombre_archivo.lower().endswith('.pdf'):
+            nombre_archivo += '.pdf'
+        
+        # Limpiar nombre de archivo (remover caracteres especiales)
+        nombre_archivo = secure_filename(nombre_archivo)
+        
+        # Si el nombre está vacío, generar uno
+        if not nombre_archivo or nombre_archivo == '.pdf':
+            nombre_archivo = f"archivo_{indice}.pdf"
+        
+        # Evitar que dos URLs distintas escriban sobre el mismo archivo
+        if nombre_archivo.lower() in nombres_usados:
+            base, extension = os.path.splitext(nombre_archivo)
+            nombre_archivo = f"{base}_{indice}{extension}"
+        
+        nombres_usados.add(nombre_archivo.lower())
+        return nombre_archivo
+    
+    def _descargar_archivo(self, url: str, ruta_archivo: str, timeout: float,
+                           reintentos: int, backoff: float, chunk_size: int) -> tuple:
+        """
+        Descarga un archivo de forma reanudable. Los errores de conexión y los
+        estados 429/5xx los reintenta el adaptador; los cortes a mitad de la
+        transferencia se reanudan con HTTP Range desde el archivo .part.
+        
+        Returns:
+            Tupla (bytes transferidos por la red, latencia en segundos, desde_cache)
+        """
+        if self.planificador and not self.planificador.permitido(url):
+            raise PermissionError(f"Descarga no permitida por robots.txt: {url}")
+        
+        inicio = time.perf_counter()
+        if self.cache:
+            num_bytes, desde_cache = self._peticion_planificada(
+                url,
+                lambda: self.cache.descargar(
+                    self.session, url, ruta_archivo, timeout=timeout, chunk_size=chunk_size,
+                    reintentos=reintentos, backoff=backoff
+                ),
+                evaluar_latencia=False
+            )
+            return num_bytes, time.perf_counter() - inicio, desde_cache
+        
+        resultado = self._peticion_planificada(
+            url,
+            lambda: Funciones.descargar_archivo_reanudable(
+                url, ruta_archivo, session=self.session, chunk_size=chunk_size,
+                timeout=timeout, reintentos=reintentos, backoff=backoff
+            ),
+            evaluar_latencia=False
+        )
+        return resultado['bytes'], time.perf_counter() - inicio, False
     
     def close(self):
         """Cierra la sesión de requests"""
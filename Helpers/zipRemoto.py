@@ -0,0 +1,297 @@
+import io
+import os
+import zipfile
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class ArchivoHTTP(io.RawIOBase):
+    """
+    Archivo remoto de solo lectura con seek, leído con peticiones HTTP Range.
+
+    Sirve para abrir un ZIP remoto con zipfile sin descargarlo: las lecturas
+    se resuelven primero con los segmentos ya descargados (el final del
+    archivo, donde está el directorio central, y los que se precarguen con
+    precargar()) y solo lo que falte se pide al servidor. Todas las
+    peticiones llevan If-Range con el ETag inicial, de modo que si el archivo
+    cambia en el servidor la lectura falla en vez de mezclar versiones.
+    """
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None, timeout: float = 30,
+                 bloque_minimo: int = 65536):
+        """
+        Inicializa el archivo y comprueba que el servidor acepte Range
+
+        Args:
+            url: URL del archivo
+            session: Sesión de requests a reutilizar (opcional)
+            timeout: Timeout de conexión y lectura en segundos
+            bloque_minimo: Bytes mínimos por petición (lectura anticipada para lecturas pequeñas)
+
+        Raises:
+            IOError: Si el servidor no responde 206 a una petición Range
+        """
+        super().__init__()
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.bloque_minimo = bloque_minimo
+        self.peticiones = 0
+        self.bytes_descargados = 0
+        self._posicion = 0
+        self._segmentos: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+        response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=timeout)
+        try:
+            response.raise_for_status()
+            rango = response.headers.get('Content-Range', '')
+            total = rango.rsplit('/', 1)[-1]
+            if response.status_code != 206 or not total.isdigit():
+                raise IOError(f"El servidor no soporta HTTP Range para {url}")
+            self.tamaño = int(total)
+            self.validador = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        finally:
+            response.close()
+
+    # ------------------------------------------------------------------ red
+    def _pedir_rango(self, inicio: int, fin: int) -> bytes:
+        """Descarga los bytes [inicio, fin) del archivo"""
+        cabeceras = {'Range': f"bytes={inicio}-{fin - 1}"}
+        if self.validador:
+            cabeceras['If-Range'] = self.validador
+        response = self.session.get(self.url, headers=cabeceras, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            # Con If-Range, un 200 significa que el archivo cambió desde que se abrió
+            raise IOError(f"El archivo remoto cambió o ignoró el Range: {self.url}")
+        datos = response.content
+        if len(datos) != fin - inicio:
+            raise IOError(f"Rango incompleto: {len(datos)} de {fin - inicio} bytes")
+        with self._lock:
+            self.peticiones += 1
+            self.bytes_descargados += len(datos)
+        return datos
+
+    def precargar(self, inicio: int, fin: int):
+        """Descarga el segmento [inicio, fin) y lo deja disponible para read() (seguro entre hilos)"""
+        datos = self._pedir_rango(inicio, min(fin, self.tamaño))
+        with self._lock:
+            self._segmentos[inicio] = datos
+
+    def descartar(self, inicio: int):
+        """Libera un segmento precargado"""
+        with self._lock:
+            self._segmentos.pop(inicio, None)
+
+    # ------------------------------------------------------------------ io
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            posicion = offset
+        elif whence == io.SEEK_CUR:
+            posicion = self._posicion + offset
+        elif whence == io.SEEK_END:
+            posicion = self.tamaño + offset
+        else:
+            raise ValueError(f"whence no válido: {whence}")
+        if posicion < 0:
+            raise OSError("Posición negativa")
+        self._posicion = posicion
+        return posicion
+
+    def _buscar_segmento(self, posicion: int) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            for inicio, datos in self._segmentos.items():
+                if inicio <= posicion < inicio + len(datos):
+                    return inicio, datos
+        return None
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.tamaño - self._posicion
+        size = min(size, self.tamaño - self._posicion)
+        if size <= 0:
+            return b""
+
+        partes = []
+        while size > 0:
+            encontrado = self._buscar_segmento(self._posicion)
+            if encontrado is None:
+                # Lectura anticipada: zipfile hace muchas lecturas pequeñas seguidas
+                fin = min(self.tamaño, self._posicion + max(size, self.bloque_minimo))
+                self.precargar(self._posicion, fin)
+                continue
+            inicio, datos = encontrado
+            desde = self._posicion - inicio
+            parte = datos[desde:desde + size]
+            partes.append(parte)
+            self._posicion += len(parte)
+            size -= len(parte)
+        return b"".join(partes)
+
+    def readinto(self, buffer) -> int:
+        datos = self.read(len(buffer))
+        buffer[:len(datos)] = datos
+        return len(datos)
+
+
+class ZipRemoto:
+    """
+    Lectura selectiva de un ZIP remoto con HTTP Range.
+
+    Descarga el final del archivo (registro de fin y directorio central),
+    elige los miembros por extensión y pide en paralelo solo sus bytes,
+    agrupando miembros vecinos en una misma petición. La descompresión y la
+    verificación del CRC quedan a cargo de zipfile. Si el servidor no acepta
+    Range, soporta_rango() es False y quien llama debe descargar el ZIP completo.
+    """
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None, timeout: float = 30,
+                 max_workers: int = 4, max_hueco: int = 65536, max_grupo: int = 8 * 1024 * 1024):
+        """
+        Inicializa el lector
+
+        Args:
+            url: URL del ZIP
+            session: Sesión de requests a reutilizar (opcional)
+            timeout: Timeout de conexión y lectura en segundos
+            max_workers: Peticiones Range en paralelo
+            max_hueco: Bytes no pedidos que se aceptan entre dos miembros para unirlos en una petición
+            max_grupo: Tamaño máximo de una petición que agrupa varios miembros
+        """
+        self.url = url
+        self.max_workers = max(1, max_workers)
+        self.max_hueco = max_hueco
+        self.max_grupo = max_grupo
+        self.archivo = None
+        try:
+            archivo = ArchivoHTTP(url, session=session, timeout=timeout)
+            # El registro de fin y, casi siempre, el directorio central están en los últimos 64 KB
+            archivo.precargar(max(0, archivo.tamaño - 65536), archivo.tamaño)
+            self.archivo = archivo
+        except (IOError, requests.exceptions.RequestException) as e:
+            print(f"ZIP remoto sin lectura por rangos ({e})")
+
+    def soporta_rango(self) -> bool:
+        """Indica si el servidor acepta Range y el ZIP se puede leer por partes"""
+        return self.archivo is not None
+
+    def _agrupar(self, miembros: List[zipfile.ZipInfo], todos: List[zipfile.ZipInfo],
+                 fin_datos: int) -> List[Tuple[int, int, List[zipfile.ZipInfo]]]:
+        """
+        Calcula los segmentos a descargar: cada miembro ocupa desde su cabecera
+        local hasta la cabecera siguiente (incluye nombre, extra y descriptor de datos)
+        """
+        offsets = sorted({info.header_offset for info in todos} | {fin_datos})
+        siguiente = {inicio: fin for inicio, fin in zip(offsets, offsets[1:])}
+
+        grupos = []
+        for info in sorted(miembros, key=lambda i: i.header_offset):
+            inicio, fin = info.header_offset, siguiente[info.header_offset]
+            if grupos:
+                g_inicio, g_fin, g_miembros = grupos[-1]
+                if inicio - g_fin <= self.max_hueco and fin - g_inicio <= self.max_grupo:
+                    grupos[-1] = (g_inicio, max(g_fin, fin), g_miembros + [info])
+                    continue
+            grupos.append((inicio, fin, [info]))
+        return grupos
+
+    def extraer(self, carpeta_destino: str, extensiones: Iterable[str] = ('txt', 'pdf', 'json')) -> List[Dict]:
+        """
+        Extrae a disco solo los miembros con las extensiones indicadas
+
+        Args:
+            carpeta_destino: Carpeta donde se escriben los miembros (con sus subcarpetas)
+            extensiones: Extensiones de los miembros a extraer
+
+        Returns:
+            Lista de diccionarios con 'carpeta', 'nombre', 'ruta', 'extension' y 'tamaño'
+            (mismo formato que Funciones.descomprimir_zip_local)
+            
+        Raises:
+            IOError: Si falló la descarga de algún grupo de miembros (ej: el archivo cambió
+                     en el servidor); quien llama debe descargar el ZIP completo
+        """
+        if not self.soporta_rango():
+            return []
+        extensiones = {ext.lower().replace('.', '') for ext in extensiones}
+        archivos = []
+
+        with zipfile.ZipFile(self.archivo, 'r') as zip_ref:
+            todos = zip_ref.infolist()
+            miembros = [info for info in todos if not info.is_dir() and
+                        os.path.splitext(info.filename)[1].lower().replace('.', '') in extensiones]
+            # Los datos de los miembros terminan donde empieza el directorio central
+            fin_datos = zip_ref.start_dir
+            grupos = self._agrupar(miembros, todos, fin_datos)
+            print(f"ZIP remoto: {len(miembros)} de {len(todos)} miembros en {len(grupos)} peticiones")
+
+            error = None
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pendientes = list(grupos)
+                en_vuelo = {}
+                # Se acota lo precargado en memoria a dos grupos por worker
+                while pendientes or en_vuelo:
+                    while pendientes and len(en_vuelo) < 2 * self.max_workers:
+                        inicio, fin, infos = pendientes.pop(0)
+                        en_vuelo[executor.submit(self.archivo.precargar, inicio, fin)] = (inicio, infos)
+                    completados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in completados:
+                        inicio, infos = en_vuelo.pop(futuro)
+                        try:
+                            futuro.result()
+                        except (IOError, requests.exceptions.RequestException) as e:
+                            print(f"❌ Error al descargar {len(infos)} miembros: {e}")
+                            # El resultado quedaría incompleto: no se piden más grupos
+                            error = error or e
+                            pendientes.clear()
+                            continue
+                        # zipfile lee del segmento precargado y verifica el CRC de cada miembro
+                        for info in infos:
+                            archivo = self._extraer_miembro(zip_ref, info, carpeta_destino)
+                            if archivo:
+                                archivos.append(archivo)
+                        self.archivo.descartar(inicio)
+
+        if error is not None:
+            raise IOError(f"ZIP remoto incompleto ({len(archivos)} de {len(miembros)} miembros): {error}")
+        print(f"ZIP remoto: {self.archivo.bytes_descargados} de {self.archivo.tamaño} bytes "
+              f"en {self.archivo.peticiones} peticiones")
+        return archivos
+
+    @staticmethod
+    def _extraer_miembro(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, carpeta_destino: str) -> Optional[Dict]:
+        """Extrae un miembro y retorna su info, o None si está corrupto"""
+        try:
+            ruta_extraida = zip_ref.extract(info, carpeta_destino)
+        except zipfile.BadZipFile as e:
+            print(f"❌ Miembro corrupto {info.filename}: {e}")
+            ruta_parcial = os.path.join(carpeta_destino, info.filename)
+            if os.path.exists(ruta_parcial):
+                os.remove(ruta_parcial)
+            return None
+        nombre_archivo = os.path.basename(info.filename)
+        print(f"✅ Archivo extraído: {nombre_archivo}")
+        return {
+            'carpeta': os.path.dirname(info.filename) or 'raiz',
+            'nombre': nombre_archivo,
+            'ruta': ruta_extraida,
+            'extension': os.path.splitext(nombre_archivo)[1].lower(),
+            'tamaño': os.path.getsize(ruta_extraida)
+        }
+
+    def close(self):
+        """Cierra el archivo remoto"""
+        if self.archivo is not None:
+            self.archivo.close()
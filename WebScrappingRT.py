@@ -5,6 +5,7 @@ import os
 import time
 from urllib.parse import urljoin
 import re
+from Helpers.planificador import PlanificadorCortesia
 
 class RottenTomatoesScraper:
     def __init__(self):
@@ -14,11 +15,22 @@ class RottenTomatoesScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.movies_data = []
+        # Tasa adaptativa por host (robots.txt, 429/503 y latencia) en lugar de pausas fijas
+        self.planificador = PlanificadorCortesia(tasa_inicial=1.0)
         
     def get_soup(self, url):
         """Obtiene el contenido HTML de una URL"""
+        if not self.planificador.permitido(url):
+            print(f"Omitido por robots.txt: {url}")
+            return None
         try:
+            self.planificador.esperar(url)
+            inicio = time.perf_counter()
             response = requests.get(url, headers=self.headers, timeout=30)
+            self.planificador.registrar_respuesta(
+                url, response.status_code, time.perf_counter() - inicio,
+                retry_after=response.headers.get('Retry-After')
+            )
             response.raise_for_status()
             return BeautifulSoup(response.content, 'html.parser')
         except Exception as e:
@@ -102,9 +114,6 @@ class RottenTomatoesScraper:
                 print(f"✅ {movie_data.get('title', 'Sin título')}")
             else:
                 print(f"❌ Error procesando película {i}")
-            
-            # Pausa para no saturar el servidor
-            time.sleep(0.5)
         
         return True
     
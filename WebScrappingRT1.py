@@ -5,8 +5,11 @@ import os
 import time
 from urllib.parse import urljoin
 import re
+from Helpers.planificador import PlanificadorCortesia
 from deep_translator import GoogleTranslator
 
+URL_TRADUCTOR = "https://translate.google.com/"
+
 class RottenTomatoesScraperES:
     def __init__(self):
         self.base_url = "https://editorial.rottentomatoes.com"
@@ -15,6 +18,8 @@ class RottenTomatoesScraperES:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.movies_data = []
+        # Tasa adaptativa por host (robots.txt, 429/503 y latencia) en lugar de pausas fijas
+        self.planificador = PlanificadorCortesia(tasa_inicial=1.0)
         self.translator = GoogleTranslator(source='auto', target='es')
         
     def traducir_texto(self, texto):
@@ -22,16 +27,31 @@ class RottenTomatoesScraperES:
         try:
             if texto and texto.strip():
                 texto = texto[:4500]
-                return self.translator.translate(texto)
+                # Cada traducción es una petición a Google: también pasa por el planificador
+                self.planificador.esperar(URL_TRADUCTOR)
+                inicio = time.perf_counter()
+                traduccion = self.translator.translate(texto)
+                self.planificador.registrar_respuesta(URL_TRADUCTOR, 200, time.perf_counter() - inicio)
+                return traduccion
             return texto
         except Exception as e:
+            self.planificador.registrar_respuesta(URL_TRADUCTOR, None)
             print(f"⚠️ Error en traducción: {e}")
             return texto
     
     def get_soup(self, url):
         """Obtiene el contenido HTML de una URL"""
+        if not self.planificador.permitido(url):
+            print(f"Omitido por robots.txt: {url}")
+            return None
         try:
+            self.planificador.esperar(url)
+            inicio = time.perf_counter()
             response = requests.get(url, headers=self.headers, timeout=30)
+            self.planificador.registrar_respuesta(
+                url, response.status_code, time.perf_counter() - inicio,
+                retry_after=response.headers.get('Retry-After')
+            )
             response.raise_for_status()
             return BeautifulSoup(response.content, 'html.parser')
         except Exception as e:
@@ -224,10 +244,6 @@ class RottenTomatoesScraperES:
                 print(f"✅ {titulo} - {puntuacion} [{info_str}]")
             else:
                 print(f"❌ Error procesando película {i}")
-            
-            # Pausa para no saturar el servidor
-            if i < total_movies:
-                time.sleep(1)
         
         return True
     
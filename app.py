@@ -1,9 +1,13 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash
 from dotenv import load_dotenv
 import os
+import json
+import hashlib
+import unicodedata
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from Helpers import MongoDB, ElasticSearch, Funciones, WebScraping
+from Helpers import MongoDB, ElasticSearch, Funciones, WebScraping, AlmacenDocumentos, PlanificadorCortesia, GestorTrabajos, ExtractorParalelo, CacheExtraccion, CacheBusqueda
+from Helpers.funciones import PERFILES_OCR
 
 # Cargar variables de entorno
 load_dotenv()
@@ -20,14 +24,71 @@ MONGO_COLECCION = os.getenv('MONGO_COLECCION', 'usuario_roles')
 ELASTIC_CLOUD_URL = os.getenv('ELASTIC_CLOUD_URL')
 ELASTIC_API_KEY = os.getenv('ELASTIC_API_KEY')
 ELASTIC_INDEX_DEFAULT = os.getenv('ELASTIC_INDEX_DEFAULT', 'prueba_index')
+# Carga masiva: peticiones _bulk en paralelo y tamaño de cada lote (documentos y MB)
+BULK_HILOS = int(os.getenv('BULK_HILOS', '4'))
+BULK_TAMAÑO_LOTE = int(os.getenv('BULK_TAMANO_LOTE', '500'))
+BULK_MAX_MB = int(os.getenv('BULK_MAX_MB', '10'))
+# _id de los documentos cargados: contenido, origen, campo o vacío (Elastic genera el _id y
+# recargar los mismos archivos los duplica)
+ESTRATEGIA_ID = os.getenv('ESTRATEGIA_ID', 'contenido') or None
+# Modo carga masiva (sin refresco ni réplicas mientras se carga): solo para cargas de al menos
+# estos MB, salvo que la petición lo pida o lo desactive con 'modo_carga_masiva'
+CARGA_MASIVA_MIN_MB = int(os.getenv('CARGA_MASIVA_MIN_MB', '50'))
+# Fusionar segmentos al terminar cada carga (lento en índices grandes; acelera las búsquedas)
+CARGA_FORCE_MERGE = os.getenv('CARGA_FORCE_MERGE', 'false').lower() in ('1', 'true', 'si')
+# Latencia objetivo por petición _bulk: el tamaño de lote crece mientras se cumple y baja ante 429
+BULK_LATENCIA_OBJETIVO = float(os.getenv('BULK_LATENCIA_OBJETIVO', '2.0'))
+# Caché de resultados de /buscar-elastic: búsquedas guardadas y segundos de vida (se invalida al escribir)
+CACHE_BUSQUEDA_MAX = int(os.getenv('CACHE_BUSQUEDA_MAX', '1000'))
+CACHE_BUSQUEDA_TTL = float(os.getenv('CACHE_BUSQUEDA_TTL', '60'))
+# Resultados por página en /buscar-elastic
+RESULTADOS_POR_PAGINA = int(os.getenv('RESULTADOS_POR_PAGINA', '100'))
+
+# Caché HTTP del web scraping (fuera de static/ para que no se publique ni se borre con uploads)
+CARPETA_CACHE_HTTP = os.getenv('CARPETA_CACHE_HTTP', 'cache/http')
+
+# Almacén de documentos direccionado por contenido (compresión opcional: gzip o zstd)
+CARPETA_ALMACEN = os.getenv('CARPETA_ALMACEN', 'almacen')
+COMPRESION_ALMACEN = os.getenv('COMPRESION_ALMACEN') or None
+
+# Trabajos de ingesta ejecutados en segundo plano a la vez (el resto espera en cola)
+MAX_TRABAJOS = int(os.getenv('MAX_TRABAJOS', '2'))
+
+# Extracción de texto en paralelo: procesos (vacío = todos los núcleos) y segundos máximos por archivo
+WORKERS_EXTRACCION = int(os.getenv('WORKERS_EXTRACCION', '0')) or None
+TIMEOUT_EXTRACCION = float(os.getenv('TIMEOUT_EXTRACCION', '300'))
+# Perfil de OCR por defecto: rapido, balanceado o preciso (cada carga puede elegir otro)
+PERFIL_OCR = os.getenv('PERFIL_OCR', 'balanceado')
+
+# Caché de texto extraído por contenido (SHA-256 + versión del extractor + perfil de OCR)
+RUTA_CACHE_EXTRACCION = os.getenv('RUTA_CACHE_EXTRACCION', 'cache/extraccion.sqlite3')
+MAX_CACHE_EXTRACCION_MB = int(os.getenv('MAX_CACHE_EXTRACCION_MB', '512'))
+
+# Extensiones de los archivos de datos JSON aceptados en los ZIP (documento, arreglo o JSON Lines)
+EXTENSIONES_JSON = ['json', 'jsonl', 'ndjson']
 
 # Versión de la aplicación
 VERSION_APP = "1.2.0"
 CREATOR_APP = "JohannaLeon"
 
+# Pool de extracción de texto: se crea primero porque sus procesos se lanzan con fork y no deben
+# heredar los hilos de las conexiones (MongoDB) ni de los pools que se crean después
+cache_extraccion = CacheExtraccion(RUTA_CACHE_EXTRACCION, max_bytes=MAX_CACHE_EXTRACCION_MB * 1024 * 1024)
+extractor = ExtractorParalelo(max_workers=WORKERS_EXTRACCION, timeout_archivo=TIMEOUT_EXTRACCION,
+                              perfil_ocr=PERFIL_OCR, cache=cache_extraccion)
+extractor.iniciar()
+
 # Inicializar conexiones
 mongo = MongoDB(MONGO_URI, MONGO_DB)
-elastic = ElasticSearch(ELASTIC_CLOUD_URL, ELASTIC_API_KEY)
+cache_busqueda = CacheBusqueda(max_entradas=CACHE_BUSQUEDA_MAX, ttl_segundos=CACHE_BUSQUEDA_TTL)
+elastic = ElasticSearch(ELASTIC_CLOUD_URL, ELASTIC_API_KEY, bulk_hilos=BULK_HILOS,
+                        bulk_tamaño_lote=BULK_TAMAÑO_LOTE, bulk_max_bytes=BULK_MAX_MB * 1024 * 1024,
+                        bulk_latencia_objetivo=BULK_LATENCIA_OBJETIVO, cache_busqueda=cache_busqueda)
+almacen = AlmacenDocumentos(CARPETA_ALMACEN, compresion=COMPRESION_ALMACEN)
+# Un solo planificador para todos los rastreos: la tasa por host se comparte entre peticiones
+planificador = PlanificadorCortesia()
+# Cola de trabajos en segundo plano (en memoria: usar un solo proceso de gunicorn con varios hilos)
+gestor_trabajos = GestorTrabajos(max_workers=MAX_TRABAJOS)
 
 # ==================== RUTAS ====================
 @app.route('/')
@@ -51,7 +112,8 @@ def buscar_elastic():
     """API para realizar búsqueda en ElasticSearch"""
     try:
         data = request.get_json()
-        texto_buscar = data.get('texto', '').strip()
+        # Normalizar el texto para que variantes triviales (espacios, formas Unicode) compartan caché
+        texto_buscar = " ".join(unicodedata.normalize('NFKC', data.get('texto', '')).split())
         campo = data.get('campo', '_all')
         
         if not texto_buscar:
@@ -60,6 +122,16 @@ def buscar_elastic():
                 'error': 'Texto de búsqueda es requerido'
             }), 400
         
+        try:
+            pagina = int(data.get('pagina', 1))
+        except (TypeError, ValueError):
+            pagina = 0
+        if pagina < 1:
+            return jsonify({
+                'success': False,
+                'error': 'La página debe ser un entero mayor o igual a 1'
+            }), 400
+        
         # Definir aggregations
         query_base = {
             "query": {
@@ -89,8 +161,10 @@ def buscar_elastic():
             index=ELASTIC_INDEX_DEFAULT,
             query=query_base,
             aggs=aggs,            
-            size=100
+            size=RESULTADOS_POR_PAGINA,
+            desde=(pagina - 1) * RESULTADOS_POR_PAGINA
         )
+        resultado['pagina'] = pagina
         
         return jsonify(resultado)
         
@@ -99,6 +173,21 @@ def buscar_elastic():
             'success': False,
             'error': str(e)
         }), 500
+
+@app.route('/metricas-cache-busqueda')
+def metricas_cache_busqueda():
+    """API con las métricas de la caché de búsquedas (aciertos, fallos, entradas)"""
+    try:
+        if not session.get('logged_in'):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        
+        permisos = session.get('permisos', {})
+        if not permisos.get('admin_elastic'):
+            return jsonify({'success': False, 'error': 'No tiene permisos para gestionar ElasticSearch'}), 403
+        
+        return jsonify({'success': True, **cache_busqueda.metricas()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 # --------------rutas del buscador en elastic-fin-------------
 
 # --------------rutas de mongodb (usuarios)-inicio-------------
@@ -337,7 +426,7 @@ def cargar_doc_elastic():
 
 @app.route('/procesar-webscraping-elastic', methods=['POST'])
 def procesar_webscraping_elastic():
-    """API para procesar Web Scraping"""
+    """API para procesar Web Scraping en segundo plano (retorna el id del trabajo)"""
     try:
         if not session.get('logged_in'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 401
@@ -362,47 +451,116 @@ def procesar_webscraping_elastic():
         # Combinar ambas listas para extraer todos los enlaces
         todas_extensiones = lista_ext_navegar + lista_tipos_archivos
         
-        # Inicializar WebScraping
-        scraper = WebScraping(dominio_base=url.rsplit('/', 1)[0] + '/')
+        trabajo = gestor_trabajos.enviar(
+            'webscraping', _trabajo_webscraping, url, todas_extensiones, lista_tipos_archivos,
+            usuario=session.get('usuario')
+        )
         
-        # Limpiar carpeta de uploads
+        return jsonify({
+            'success': True,
+            'job_id': trabajo.id,
+            'estado_url': url_for('estado_trabajo', job_id=trabajo.id)
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def _trabajo_webscraping(trabajo, url, todas_extensiones, lista_tipos_archivos):
+    """Rastreo y descarga de un sitio, ejecutado en segundo plano por gestor_trabajos"""
+    # Inicializar WebScraping
+    scraper = WebScraping(dominio_base=url.rsplit('/', 1)[0] + '/', carpeta_cache=CARPETA_CACHE_HTTP,
+                          planificador=planificador)
+    
+    try:
+        # Los documentos se guardan en el almacén; la carpeta de uploads solo
+        # guarda los enlaces de este rastreo y los temporales de descarga
         carpeta_upload = 'static/uploads'
         Funciones.crear_carpeta(carpeta_upload)
-        Funciones.borrar_contenido_carpeta(carpeta_upload)
         
-        # Extraer todos los enlaces
-        json_path = os.path.join(carpeta_upload, 'links.json')
+        # Extraer todos los enlaces. El estado se guarda por URL inicial para que un
+        # rastreo interrumpido o cancelado se reanude (uno terminado vuelve a empezar)
+        json_path = os.path.join(carpeta_upload, f"links_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.json")
+        trabajo.progreso('rastreo')
         resultado = scraper.extraer_todos_los_links(
             url_inicial=url,
             json_file_path=json_path,
             listado_extensiones=todas_extensiones,
-            max_iteraciones=50
+            max_iteraciones=50,
+            concurrente=True,
+            progreso=trabajo.progreso,
+            cancelacion=trabajo.cancelacion
         )
         
         if not resultado['success']:
-            return jsonify({'success': False, 'error': 'Error al extraer enlaces'}), 500
+            return {'success': False, 'error': resultado.get('error', 'Error al extraer enlaces')}
+        if resultado.get('cancelado'):
+            return {'success': False, 'error': 'Trabajo cancelado', 'stats': {'total_enlaces': resultado['total_links']}}
         
         # Descargar archivos PDF (o los tipos especificados)
-        resultado_descarga = scraper.descargar_pdfs(json_path, carpeta_upload)
-        
+        trabajo.progreso('descarga')
+        resultado_descarga = scraper.descargar_pdfs(
+            json_path, carpeta_upload, max_workers=8, almacen=almacen,
+            progreso=trabajo.progreso, cancelacion=trabajo.cancelacion
+        )
+    finally:
         scraper.close()
-        
-        # Listar archivos descargados
-        archivos = Funciones.listar_archivos_carpeta(carpeta_upload, lista_tipos_archivos)
-        
-        return jsonify({
-            'success': True,
-            'archivos': archivos,
-            'mensaje': f'Se descargaron {len(archivos)} archivos',
-            'stats': {
-                'total_enlaces': resultado['total_links'],
-                'descargados': resultado_descarga.get('descargados', 0),
-                'errores': resultado_descarga.get('errores', 0)
-            }
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    almacen.recolectar_basura()
+    
+    # Listar archivos descargados (un documento por contenido distinto)
+    archivos = [
+        archivo for archivo in resultado_descarga.get('archivos', [])
+        if archivo['extension'] in lista_tipos_archivos
+    ]
+    
+    return {
+        'success': True,
+        'archivos': archivos,
+        'mensaje': f'Se descargaron {len(archivos)} archivos',
+        'stats': {
+            'total_enlaces': resultado['total_links'],
+            'paginas_por_segundo': resultado.get('paginas_por_segundo', 0),
+            'descargados': resultado_descarga.get('descargados', 0),
+            'errores': resultado_descarga.get('errores', 0),
+            'desde_cache': resultado_descarga.get('desde_cache', 0),
+            'bytes_por_segundo': resultado_descarga.get('bytes_por_segundo', 0),
+            'latencia_p50': resultado_descarga.get('latencia_p50', 0),
+            'latencia_p95': resultado_descarga.get('latencia_p95', 0)
+        }
+    }
+
+
+@app.route('/jobs/<job_id>')
+def estado_trabajo(job_id):
+    """API para consultar la etapa, los contadores y la ETA de un trabajo"""
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+    
+    trabajo = gestor_trabajos.obtener(job_id)
+    if trabajo is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    return jsonify({'success': True, **trabajo.a_dict()})
+
+
+@app.route('/jobs/<job_id>/cancelar', methods=['POST'])
+def cancelar_trabajo(job_id):
+    """API para cancelar un trabajo en cola o en ejecución"""
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+    
+    permisos = session.get('permisos', {})
+    if not permisos.get('admin_data_elastic'):
+        return jsonify({'success': False, 'error': 'No tiene permisos para cargar datos'}), 403
+    
+    if gestor_trabajos.obtener(job_id) is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    if not gestor_trabajos.cancelar(job_id):
+        return jsonify({'success': False, 'error': 'El trabajo ya terminó'}), 409
+    
+    return jsonify({'success': True, 'mensaje': 'Cancelación solicitada'})
 
 
 @app.route('/procesar-zip-elastic', methods=['POST'])
@@ -432,30 +590,22 @@ def procesar_zip_elastic():
         filename = secure_filename(file.filename)
         carpeta_upload = 'static/uploads'
         Funciones.crear_carpeta(carpeta_upload)
-        Funciones.borrar_contenido_carpeta(carpeta_upload)
         
         zip_path = os.path.join(carpeta_upload, filename)
         file.save(zip_path)
         print(f"Archivo ZIP guardado en: {zip_path}")
         
-        # Descomprimir ZIP
-        archivos = Funciones.descomprimir_zip_local(zip_path, carpeta_upload)
-        print(f"Archivos descomprimidos: {len(archivos)}")
+        # Guardar los miembros del ZIP en el almacén (los repetidos se guardan una vez)
+        archivos = almacen.importar_zip(zip_path, extensiones=['txt', 'pdf'] + EXTENSIONES_JSON, prefijo_origen=filename)
+        print(f"Archivos guardados en el almacén: {len(archivos)}")
         
         # Eliminar archivo ZIP
         os.remove(zip_path)
+        almacen.recolectar_basura()
         
-        # En lugar de listar archivos JSON, usar los archivos ya descomprimidos
-        # pero filtrar solo los JSON y formatear correctamente
-        archivos_json = []
-        for archivo in archivos:
-            if archivo['extension'] == '.json':
-                archivos_json.append({
-                    'nombre': archivo['nombre'],
-                    'ruta': archivo['ruta'],
-                    'extension': 'json',
-                    'tamaño': archivo.get('tamaño', 0)
-                })
+        # Listar los JSON del ZIP sin repetir contenido
+        origenes = [archivo['origen'] for archivo in archivos]
+        archivos_json = almacen.listar_documentos(origenes=origenes, extensiones=EXTENSIONES_JSON)
         
         print(f"Archivos JSON encontrados: {len(archivos_json)}")
         
@@ -520,6 +670,111 @@ def procesar_zip_elastic():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _opciones_id(datos) -> tuple:
+    """Lee y valida la estrategia de _id de una carga (JSON o formulario). Retorna (estrategia, campo, error)"""
+    estrategia = datos.get('estrategia_id', ESTRATEGIA_ID)
+    estrategia = (estrategia or '').strip() or None
+    campo = (datos.get('campo_id') or '').strip() or None
+    if estrategia not in ElasticSearch.ESTRATEGIAS_ID:
+        return None, None, f"Estrategia de _id no válida. Opciones: {', '.join(e for e in ElasticSearch.ESTRATEGIAS_ID if e)}"
+    if estrategia == 'campo' and not campo:
+        return None, None, "La estrategia de _id 'campo' requiere campo_id"
+    return estrategia, campo, None
+
+
+def _liberar_temporales(archivos: list):
+    """Libera en el almacén los miembros de ZIP ya indexados y elimina los objetos que quedaron sin uso"""
+    origenes = [origen for archivo in archivos for origen in (archivo.get('origenes') or [])]
+    if almacen.liberar_origenes(origenes):
+        almacen.recolectar_basura()
+
+
+def _indexar_carga(index: str, documentos, tamaño_bytes: int, datos, **opciones) -> dict:
+    """
+    Indexa una carga con indexar_bulk, en modo carga masiva si la petición lo pide
+    ('modo_carga_masiva') o, si no dice nada, cuando pesa al menos CARGA_MASIVA_MIN_MB
+    """
+    pedido = datos.get('modo_carga_masiva')
+    if pedido in (None, ''):
+        usar_modo = tamaño_bytes >= CARGA_MASIVA_MIN_MB * 1024 * 1024
+    else:
+        usar_modo = str(pedido).lower() in ('1', 'true', 'si', 'on')
+    if not usar_modo:
+        return elastic.indexar_bulk(index, documentos, **opciones)
+    
+    # Sin refresco ni réplicas durante la carga; se restauran al terminar aunque falle
+    with elastic.modo_carga_masiva(index, force_merge=CARGA_FORCE_MERGE) as carga:
+        resultado = elastic.indexar_bulk(index, documentos, **opciones)
+        carga['exito'] = resultado['success']
+    return resultado
+
+
+@app.route('/indexar-zip-elastic', methods=['POST'])
+def indexar_zip_elastic():
+    """API para indexar los JSON de un ZIP directamente, sin extraerlo a disco"""
+    try:
+        if not session.get('logged_in'):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        
+        permisos = session.get('permisos', {})
+        if not permisos.get('admin_data_elastic'):
+            return jsonify({'success': False, 'error': 'No tiene permisos para cargar datos'}), 403
+        
+        if 'file' not in request.files:
+            return jsonify({'success': False, 'error': 'No se envió ningún archivo'}), 400
+        
+        file = request.files['file']
+        index = request.form.get('index')
+        puntero_json = request.form.get('puntero_json', '').strip()
+        
+        if not file.filename:
+            return jsonify({'success': False, 'error': 'Archivo no válido'}), 400
+        
+        if not index:
+            return jsonify({'success': False, 'error': 'Índice no especificado'}), 400
+        
+        if puntero_json and not puntero_json.startswith('/'):
+            return jsonify({'success': False, 'error': "El puntero JSON debe empezar con '/' (ej: /peliculas)"}), 400
+        
+        estrategia_id, campo_id, error_id = _opciones_id(request.form)
+        if error_id:
+            return jsonify({'success': False, 'error': error_id}), 400
+        
+        # Los miembros se leen del stream del upload y cada documento pasa al bulk a medida
+        # que se parsea: ni el ZIP ni los JSON se escriben en static/uploads
+        fallidos = []
+        miembros = set()
+        
+        def documentos():
+            for leido in Funciones.iterar_documentos_zip(file.stream, extensiones=EXTENSIONES_JSON, puntero=puntero_json):
+                if leido['error']:
+                    fallidos.append({'nombre': leido['miembro'], 'error': leido['error']})
+                    continue
+                miembros.add(leido['miembro'])
+                yield leido['documento']
+        
+        resultado = _indexar_carga(index, documentos(), request.content_length or 0, request.form,
+                                   estrategia_id=estrategia_id, campo_id=campo_id)
+        if not resultado['success']:
+            return jsonify({'success': False, 'error': resultado['error'], 'archivos_fallidos': fallidos}), 500
+        
+        if not (resultado['indexados'] or resultado['omitidos'] or resultado['fallidos']):
+            return jsonify({'success': False, 'error': 'No se encontraron documentos JSON en el ZIP',
+                            'archivos_fallidos': fallidos}), 400
+        
+        return jsonify({
+            'success': True,
+            'indexados': resultado['indexados'],
+            'omitidos': resultado['omitidos'],
+            'errores': resultado['fallidos'],
+            'archivos_leidos': len(miembros),
+            'archivos_fallidos': fallidos
+        })
+        
+    except Exception as e:
+        print(f"Error en indexar-zip-elastic: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/cargar-documentos-elastic', methods=['POST'])
 def cargar_documentos_elastic():
     """API para cargar documentos a ElasticSearch"""
@@ -539,53 +794,96 @@ def cargar_documentos_elastic():
         if not archivos or not index:
             return jsonify({'success': False, 'error': 'Archivos e índice son requeridos'}), 400
         
+        puntero_json = (data.get('puntero_json') or '').strip()
+        if puntero_json and not puntero_json.startswith('/'):
+            return jsonify({'success': False, 'error': "El puntero JSON debe empezar con '/' (ej: /peliculas)"}), 400
+        
+        estrategia_id, campo_id, error_id = _opciones_id(data)
+        if error_id:
+            return jsonify({'success': False, 'error': error_id}), 400
+        
+        perfil_ocr = data.get('perfil_ocr') or PERFIL_OCR
+        if perfil_ocr not in PERFILES_OCR:
+            return jsonify({'success': False, 'error': f"Perfil de OCR no válido. Opciones: {', '.join(PERFILES_OCR)}"}), 400
+        
+        # Procesos de extracción para esta carga (sin indicar, los del pool compartido)
+        workers = data.get('workers')
+        if workers is not None:
+            try:
+                workers = int(workers)
+            except (TypeError, ValueError):
+                workers = 0
+            if not 1 <= workers <= extractor.max_workers:
+                return jsonify({'success': False,
+                                'error': f'workers debe ser un entero entre 1 y {extractor.max_workers}'}), 400
+        
         documentos = []
+        fallidos = []
+        extraccion = []
         
         if metodo == 'zip':
-            # Cargar archivos JSON directamente
-            for archivo in archivos:
-                ruta = archivo.get('ruta')
-                print(f"Procesando archivo JSON: {ruta}")
-                if ruta and os.path.exists(ruta):
-                    doc = Funciones.leer_json(ruta)
-                    print(doc)
-                    if doc:
-                        documentos.append(doc)
+            # Los registros de cada JSON (documento, arreglo o JSON Lines) se leen de forma
+            # incremental y pasan al bulk a medida que se parsean, sin juntarlos en una lista
+            def registros_json():
+                for archivo in archivos:
+                    ruta = archivo.get('ruta')
+                    print(f"Procesando archivo JSON: {ruta}")
+                    if not ruta or not os.path.exists(ruta):
+                        fallidos.append({'nombre': archivo.get('nombre', ''), 'error': 'Archivo no encontrado'})
+                        continue
+                    errores = []
+                    try:
+                        yield from Funciones.iterar_registros_json(ruta, puntero_json, errores=errores)
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        fallidos.append({'nombre': archivo.get('nombre', ''), 'error': f'JSON malformado: {e}'})
+                    except KeyError as e:
+                        fallidos.append({'nombre': archivo.get('nombre', ''),
+                                         'error': f'No existe {puntero_json} (falta la clave {e})'})
+                    # Líneas malformadas de JSON Lines omitidas sin detener el archivo
+                    for error in errores:
+                        fallidos.append({'nombre': archivo.get('nombre', ''), 'error': f'JSON malformado: {error}'})
+            
+            tamaño = sum(os.path.getsize(a['ruta']) for a in archivos if a.get('ruta') and os.path.exists(a['ruta']))
+            resultado = _indexar_carga(index, registros_json(), tamaño, data,
+                                       estrategia_id=estrategia_id, campo_id=campo_id)
+            if not resultado['success']:
+                return jsonify({'success': False, 'error': resultado['error'], 'archivos_fallidos': fallidos}), 500
+            if not (resultado['indexados'] or resultado['omitidos'] or resultado['fallidos']):
+                return jsonify({'success': False, 'error': 'No se pudieron procesar documentos',
+                                'archivos_fallidos': fallidos}), 400
+            _liberar_temporales(archivos)
+            
+            return jsonify({
+                'success': True,
+                'indexados': resultado['indexados'],
+                'omitidos': resultado['omitidos'],
+                'errores': resultado['fallidos'],
+                'archivos_fallidos': fallidos,
+                'extraccion': extraccion
+            })
         
         elif metodo == 'webscraping':
             # Procesar archivos con PLN
             #pln = PLN(cargar_modelos=True)
             
-            for archivo in archivos:
+            # Extraer texto en el pool de procesos; los resultados llegan en orden de finalización
+            for extraido in extractor.extraer(archivos, perfil_ocr=perfil_ocr, max_workers=workers):
+                archivo = extraido['archivo']
                 ruta = archivo.get('ruta')
-                if not ruta or not os.path.exists(ruta):
-                    continue
+                texto = extraido['texto']
                 
-                extension = archivo.get('extension', '').lower()
-                
-                # Extraer texto según tipo de archivo
-                texto = ""
-                if extension == 'pdf':
-                    # Intentar extracción normal
-                    texto = Funciones.extraer_texto_pdf(ruta)
-                    
-                    # Si no se extrajo texto, intentar con OCR
-                    if not texto or len(texto.strip()) < 100:
-                        try:
-                            texto = Funciones.extraer_texto_pdf_ocr(ruta)
-                        except:
-                            pass
+                if extraido['error']:
+                    fallidos.append({'nombre': archivo.get('nombre', ''), 'error': extraido['error']})
+                    continue
                 
-                elif extension == 'txt':
-                    try:
-                        with open(ruta, 'r', encoding='utf-8') as f:
-                            texto = f.read()
-                    except:
-                        try:
-                            with open(ruta, 'r', encoding='latin-1') as f:
-                                texto = f.read()
-                        except:
-                            pass
+                # Método y tiempo por página (capa de texto u OCR)
+                extraccion.append({
+                    'nombre': archivo.get('nombre', ''),
+                    'metodo': extraido['metodo'],
+                    'segundos': extraido['duracion_segundos'],
+                    'desde_cache': extraido['desde_cache'],
+                    'paginas': extraido['paginas']
+                })
                 
                 if not texto or len(texto.strip()) < 50:
                     continue
@@ -606,6 +904,8 @@ def cargar_documentos_elastic():
                         'fecha': datetime.now().isoformat(),
                         'ruta': ruta,
                         'nombre_archivo': archivo.get('nombre', ''),
+                        'metodo_extraccion': extraido['metodo'],
+                        'paginas_ocr': sum(1 for p in extraido['paginas'] if p['metodo'] == 'ocr'),
                         'resumen': resumen,
                         'entidades': entidades,
                         'temas': [{'palabra': palabra, 'relevancia': relevancia} for palabra, relevancia in temas]
@@ -620,15 +920,24 @@ def cargar_documentos_elastic():
             #pln.close()
         
         if not documentos:
-            return jsonify({'success': False, 'error': 'No se pudieron procesar documentos'}), 400
+            return jsonify({'success': False, 'error': 'No se pudieron procesar documentos',
+                            'archivos_fallidos': fallidos}), 400
         
         # Indexar documentos en Elastic
-        resultado = elastic.indexar_bulk(index, documentos)
+        tamaño = sum(len(documento['texto'].encode('utf-8')) for documento in documentos)
+        resultado = _indexar_carga(index, documentos, tamaño, data, estrategia_id=estrategia_id, campo_id=campo_id)
+        if not resultado['success'] and 'indexados' not in resultado:
+            return jsonify({'success': False, 'error': resultado['error'], 'archivos_fallidos': fallidos}), 500
+        if resultado['success']:
+            _liberar_temporales(archivos)
         
         return jsonify({
             'success': resultado['success'],
             'indexados': resultado['indexados'],
-            'errores': resultado['fallidos']
+            'omitidos': resultado['omitidos'],
+            'errores': resultado['fallidos'],
+            'archivos_fallidos': fallidos,
+            'extraccion': extraccion
         })
         
     except Exception as e:
@@ -0,0 +1,85 @@
+"""
+Benchmark de la carga masiva en ElasticSearch (ElasticSearch.indexar_bulk).
+
+Indexa documentos sintéticos en un índice temporal con distinto número de
+hilos y tamaños de lote, y reporta documentos/s, MB/s y la latencia por lote
+(p50/p95), para elegir BULK_HILOS y BULK_TAMANO_LOTE según el clúster.
+
+Requiere ELASTIC_CLOUD_URL y ELASTIC_API_KEY (en el entorno o en .env). El
+índice temporal se elimina al terminar.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_bulk --documentos 20000 --hilos 1 2 4 8 --lotes 250 500 1000
+"""
+import os
+import sys
+import random
+import argparse
+from contextlib import nullcontext
+
+from dotenv import load_dotenv
+
+from Helpers.elastic import ElasticSearch
+
+PALABRAS = ("ley decreto resolución artículo norma ministerio educación salud registro oficial "
+            "reglamento disposición transitoria presidente república nacional público").split()
+
+
+def documentos_sinteticos(cantidad: int, palabras_por_documento: int, semilla: int = 42):
+    """Genera documentos parecidos a los de la carga por web scraping"""
+    aleatorio = random.Random(semilla)
+    for i in range(cantidad):
+        yield {
+            'texto': " ".join(aleatorio.choices(PALABRAS, k=palabras_por_documento)),
+            'nombre_archivo': f"documento_{i}.pdf",
+            'ruta': f"almacen/objetos/{i:08x}",
+            'fecha': "2025-01-01T00:00:00"
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga masiva en ElasticSearch')
+    parser.add_argument('--documentos', type=int, default=20000)
+    parser.add_argument('--palabras', type=int, default=300, help='Palabras por documento')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--lotes', type=int, nargs='+', default=[500], help='Documentos por lote')
+    parser.add_argument('--max-mb', type=int, default=10, help='MB máximos por lote')
+    parser.add_argument('--index', default='bench_bulk_tmp')
+    parser.add_argument('--adaptativo', action='store_true',
+                        help='Ajustar el tamaño de lote con AIMD (--lotes es el tamaño inicial)')
+    parser.add_argument('--modo-carga', action='store_true',
+                        help='Desactivar refresco y réplicas durante cada carga (modo_carga_masiva)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv('ELASTIC_CLOUD_URL'):
+        print("Falta ELASTIC_CLOUD_URL")
+        sys.exit(1)
+    elastic = ElasticSearch(os.getenv('ELASTIC_CLOUD_URL'), os.getenv('ELASTIC_API_KEY'),
+                            bulk_hilos=max(args.hilos))
+
+    print(f"{args.documentos} documentos de {args.palabras} palabras\n")
+    print(f"{'hilos':>5} {'lote':>6} {'seg':>8} {'docs/s':>9} {'MB/s':>7} {'p50':>7} {'p95':>7} "
+          f"{'429':>6} {'final':>6} {'fallidos':>9}")
+    try:
+        for tamaño_lote in args.lotes:
+            for hilos in args.hilos:
+                elastic.eliminar_index(args.index)
+                elastic.crear_index(args.index)
+                with elastic.modo_carga_masiva(args.index) if args.modo_carga else nullcontext():
+                    resultado = elastic.indexar_bulk(
+                        args.index, documentos_sinteticos(args.documentos, args.palabras),
+                        tamaño_lote=tamaño_lote, max_bytes_lote=args.max_mb * 1024 * 1024, hilos=hilos,
+                        adaptativo=args.adaptativo
+                    )
+                est = resultado['estadisticas']
+                print(f"{hilos:5} {tamaño_lote:6} {est['segundos']:8.2f} {est['docs_por_segundo']:9.0f} "
+                      f"{est['mb_por_segundo']:7.2f} {est['latencia_p50']:7.3f} {est['latencia_p95']:7.3f} "
+                      f"{est['rechazados']:6} {est['tamaño_lote_final']:6} {resultado['fallidos']:9}")
+    finally:
+        elastic.eliminar_index(args.index)
+        elastic.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmark del crawler contra el servidor local de fixtures (sin red).
+
+Mide extract_links, extraer_todos_los_links (secuencial y concurrente) y
+descargar_pdfs, y reporta páginas/s, MB/s y RSS máximo. Cada etapa corre en un
+proceso nuevo para que el RSS máximo sea el de esa etapa y no el acumulado.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_crawler --paginas 100 --latencia 0.02 --tamano-pdf-kb 512
+    python -m benchmarks.bench_crawler --json resultados.json
+    python -m benchmarks.bench_crawler --comparar resultados.json --tolerancia 0.2
+
+Con --comparar el proceso termina con código 1 si alguna métrica empeora más
+que la tolerancia respecto a la ejecución guardada.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from benchmarks.servidor_fixtures import ServidorFixtures
+
+try:
+    import resource
+except ImportError:
+    # Windows no tiene el módulo resource: el RSS no se reporta
+    resource = None
+
+
+def rss_maximo_mb() -> Optional[float]:
+    """RSS máximo del proceso actual en MB"""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS reporta bytes
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+@contextlib.contextmanager
+def _silenciar(activo: bool):
+    """Oculta los print del crawler durante la medición"""
+    if not activo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _crear_scraper(url_base: str, carpeta_cache: Optional[str], con_planificador: bool):
+    from Helpers.webScraping import WebScraping
+    from Helpers.planificador import PlanificadorCortesia
+
+    planificador = PlanificadorCortesia(tasa_inicial=50.0, tasa_maxima=1000.0, rafaga=16) if con_planificador else None
+    return WebScraping(url_base, carpeta_cache=carpeta_cache, planificador=planificador)
+
+
+# ------------------------------------------------------------------ etapas
+# Cada etapa corre en un proceso hijo y retorna sus métricas
+
+def etapa_extract_links(opciones: Dict) -> Dict:
+    scraper = _crear_scraper(opciones['url_base'], None, opciones['planificador'])
+    urls = opciones['urls_extract']
+    links = 0
+    with _silenciar(not opciones['verbose']):
+        inicio = time.perf_counter()
+        for _ in range(opciones['repeticiones']):
+            for url in urls:
+                links += len(scraper.extract_links(url, ['pdf', 'aspx']))
+        duracion = time.perf_counter() - inicio
+    scraper.close()
+    paginas = opciones['repeticiones'] * len(urls)
+    return {
+        'paginas': paginas,
+        'links': links,
+        'duracion_segundos': round(duracion, 3),
+        'paginas_por_segundo': round(paginas / duracion, 2) if duracion > 0 else 0.0,
+        'rss_max_mb': rss_maximo_mb()
+    }
+
+
+def etapa_rastreo(opciones: Dict) -> Dict:
+    scraper = _crear_scraper(opciones['url_base'], None, opciones['planificador'])
+    json_path = os.path.join(opciones['carpeta'], f"links_{'conc' if opciones['concurrente'] else 'sec'}.json")
+    with _silenciar(not opciones['verbose']):
+        resultado = scraper.extraer_todos_los_links(
+            opciones['url_inicial'], json_path, ['pdf', 'aspx'],
+            max_iteraciones=opciones['paginas'] + 1, concurrente=opciones['concurrente'],
+            max_workers=opciones['workers'], max_por_host=opciones['workers']
+        )
+    scraper.close()
+    return {
+        'paginas': resultado['iteraciones'],
+        'links': resultado['total_links'],
+        'duracion_segundos': resultado['duracion_segundos'],
+        'paginas_por_segundo': resultado['paginas_por_segundo'],
+        'rss_max_mb': rss_maximo_mb()
+    }
+
+
+def etapa_descarga(opciones: Dict) -> Dict:
+    carpeta_cache = os.path.join(opciones['carpeta'], 'cache') if opciones['cache'] else None
+    scraper = _crear_scraper(opciones['url_base'], carpeta_cache, opciones['planificador'])
+    json_path = os.path.join(opciones['carpeta'], 'links_conc.json')
+    destino = os.path.join(opciones['carpeta'], 'descargas')
+    with _silenciar(not opciones['verbose']):
+        resultado = scraper.descargar_pdfs(json_path, destino, max_workers=opciones['workers'])
+    scraper.close()
+    return {
+        'archivos': resultado.get('descargados', 0),
+        'errores': resultado.get('errores', 0),
+        'desde_cache': resultado.get('desde_cache', 0),
+        'duracion_segundos': resultado.get('duracion_segundos', 0.0),
+        'mb_por_segundo': round(resultado.get('bytes_por_segundo', 0.0) / (1024 * 1024), 2),
+        'latencia_p50': resultado.get('latencia_p50'),
+        'latencia_p95': resultado.get('latencia_p95'),
+        'rss_max_mb': rss_maximo_mb()
+    }
+
+
+def ejecutar_en_proceso(funcion, opciones: Dict) -> Dict:
+    """Ejecuta una etapa en un proceso nuevo ('spawn' para partir de un RSS limpio)"""
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+        return pool.submit(funcion, opciones).result()
+
+
+# ------------------------------------------------------------------ reporte
+# Métricas comparadas con --comparar: (etapa, métrica, True si más alto es mejor)
+METRICAS_COMPARADAS = [
+    ('extract_links', 'paginas_por_segundo', True),
+    ('rastreo_secuencial', 'paginas_por_segundo', True),
+    ('rastreo_concurrente', 'paginas_por_segundo', True),
+    ('descarga', 'mb_por_segundo', True),
+    ('extract_links', 'rss_max_mb', False),
+    ('rastreo_concurrente', 'rss_max_mb', False),
+    ('descarga', 'rss_max_mb', False),
+]
+
+
+def imprimir_resultados(resultados: Dict):
+    print(f"\n{'Etapa':22} {'seg':>8} {'pág/s':>9} {'MB/s':>8} {'RSS MB':>8}  detalle")
+    for etapa, datos in resultados['etapas'].items():
+        rss = datos.get('rss_max_mb')
+        detalle = (f"{datos['archivos']} archivos, {datos['errores']} errores, {datos['desde_cache']} desde caché"
+                   if 'archivos' in datos else f"{datos['paginas']} páginas, {datos['links']} links")
+        print(f"{etapa:22} {datos['duracion_segundos']:8.2f} "
+              f"{datos.get('paginas_por_segundo', 0):9.1f} {datos.get('mb_por_segundo', 0):8.2f} "
+              f"{rss if rss is not None else float('nan'):8.1f}  {detalle}")
+    servidor = resultados['servidor']
+    print(f"\nServidor: {servidor['peticiones']} peticiones, {servidor['errores_inyectados']} errores inyectados")
+
+
+def comparar(resultados: Dict, ruta_base: str, tolerancia: float) -> List[str]:
+    """Retorna las regresiones respecto a una ejecución guardada"""
+    with open(ruta_base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    regresiones = []
+    for etapa, metrica, mayor_es_mejor in METRICAS_COMPARADAS:
+        anterior = base.get('etapas', {}).get(etapa, {}).get(metrica)
+        actual = resultados['etapas'].get(etapa, {}).get(metrica)
+        if not anterior or actual is None:
+            continue
+        cambio = (actual - anterior) / anterior
+        if (mayor_es_mejor and cambio < -tolerancia) or (not mayor_es_mejor and cambio > tolerancia):
+            regresiones.append(f"{etapa}.{metrica}: {anterior} -> {actual} ({cambio:+.0%})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del crawler contra fixtures locales')
+    parser.add_argument('--paginas', type=int, default=100, help='Listados ASPX del sitio de fixtures')
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--pdfs-por-pagina', type=int, default=2)
+    parser.add_argument('--tamano-pdf-kb', type=int, default=256)
+    parser.add_argument('--latencia', type=float, default=0.01, help='Latencia por respuesta (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de respuestas 500/503')
+    parser.add_argument('--grabadas', help='Carpeta con páginas HTML grabadas para extract_links')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones de extract_links')
+    parser.add_argument('--planificador', action='store_true', help='Usar PlanificadorCortesia')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida del crawler')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo')
+    parser.add_argument('--comparar', help='Resultados JSON de referencia')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Empeoramiento relativo aceptado')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='bench_crawler_')
+    servidor = ServidorFixtures(
+        num_paginas=args.paginas, fan_out=args.fan_out, pdfs_por_pagina=args.pdfs_por_pagina,
+        tamaño_pdf=args.tamano_pdf_kb * 1024, latencia=args.latencia, jitter=args.jitter,
+        tasa_errores=args.errores, carpeta_grabadas=args.grabadas
+    ).iniciar()
+
+    try:
+        if args.grabadas:
+            urls_extract = [f"{servidor.url_raiz}grabadas/{nombre}"
+                            for nombre in sorted(os.listdir(args.grabadas))
+                            if nombre.lower().endswith(('.html', '.htm', '.aspx'))]
+        else:
+            urls_extract = [f"{servidor.url_base}p{i}.aspx" for i in range(min(args.paginas, 10))]
+
+        opciones = {
+            'url_base': servidor.url_base,
+            'url_inicial': servidor.url_inicial,
+            'urls_extract': urls_extract,
+            'paginas': args.paginas,
+            'workers': args.workers,
+            'repeticiones': args.repeticiones,
+            'planificador': args.planificador,
+            'verbose': args.verbose,
+            'carpeta': carpeta,
+        }
+
+        etapas = {}
+        print("Midiendo extract_links...")
+        etapas['extract_links'] = ejecutar_en_proceso(etapa_extract_links, opciones)
+        print("Midiendo extraer_todos_los_links (secuencial)...")
+        etapas['rastreo_secuencial'] = ejecutar_en_proceso(etapa_rastreo, {**opciones, 'concurrente': False})
+        print("Midiendo extraer_todos_los_links (concurrente)...")
+        etapas['rastreo_concurrente'] = ejecutar_en_proceso(etapa_rastreo, {**opciones, 'concurrente': True})
+        print("Midiendo descargar_pdfs...")
+        etapas['descarga'] = ejecutar_en_proceso(etapa_descarga, {**opciones, 'cache': True})
+        print("Midiendo descargar_pdfs (re-descarga con caché)...")
+        etapas['descarga_cache'] = ejecutar_en_proceso(etapa_descarga, {**opciones, 'cache': True})
+
+        resultados = {
+            'parametros': vars(args),
+            'etapas': etapas,
+            'servidor': {'peticiones': servidor.peticiones, 'errores_inyectados': servidor.errores_inyectados}
+        }
+    finally:
+        servidor.detener()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    imprimir_resultados(resultados)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+    if args.comparar:
+        regresiones = comparar(resultados, args.comparar, args.tolerancia)
+        if regresiones:
+            print("\nRegresiones detectadas:")
+            for regresion in regresiones:
+                print(f"  {regresion}")
+            sys.exit(1)
+        print(f"\nSin regresiones respecto a {args.comparar} (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == '__main__':
+    main()
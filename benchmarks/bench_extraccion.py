@@ -0,0 +1,54 @@
+"""
+Benchmark de la extracción de texto en paralelo (ExtractorParalelo).
+
+Procesa todos los PDF/TXT de una carpeta con distinto número de procesos y
+reporta archivos/s y la aceleración respecto a un proceso.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_extraccion carpeta_pdfs --workers 1 2 4 8
+"""
+import os
+import sys
+import time
+import argparse
+
+from Helpers.extractorParalelo import ExtractorParalelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de texto en paralelo')
+    parser.add_argument('carpeta', help='Carpeta con PDFs (o TXT)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--timeout', type=float, default=300, help='Segundos máximos por archivo')
+    args = parser.parse_args()
+
+    archivos = [
+        {'ruta': os.path.join(args.carpeta, nombre), 'nombre': nombre,
+         'extension': nombre.rsplit('.', 1)[-1].lower()}
+        for nombre in sorted(os.listdir(args.carpeta))
+        if nombre.lower().endswith(('.pdf', '.txt'))
+    ]
+    if not archivos:
+        print(f"No se encontraron PDF/TXT en {args.carpeta}")
+        sys.exit(1)
+
+    print(f"{len(archivos)} archivos, {os.cpu_count()} núcleos\n")
+    print(f"{'procesos':>8} {'seg':>8} {'arch/s':>8} {'x':>6} {'errores':>8} {'ocr':>5}")
+    base = None
+    for workers in sorted(set(args.workers)):
+        extractor = ExtractorParalelo(max_workers=workers, timeout_archivo=args.timeout)
+        try:
+            inicio = time.perf_counter()
+            resultados = list(extractor.extraer(archivos))
+            duracion = time.perf_counter() - inicio
+        finally:
+            # Cada etapa cierra su pool: los procesos no se acumulan en las mediciones siguientes
+            extractor.cerrar()
+        errores = sum(1 for r in resultados if r['error'])
+        ocr = sum(1 for r in resultados if r['metodo'] == 'ocr')
+        base = base or duracion
+        print(f"{workers:8} {duracion:8.2f} {len(archivos) / duracion:8.2f} {base / duracion:6.2f} {errores:8} {ocr:5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark de la extracción de links: lxml + XPath frente a BeautifulSoup.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_extract_links [carpeta_con_html] [--repeticiones N]
+
+Si no se indica carpeta se genera una página sintética con la estructura de
+los listados de minsalud (div.containerblanco con enlaces .pdf y .aspx).
+Para medir con páginas reales, guardarlas antes con:
+    curl -o paginas/normativa.html https://www.minsalud.gov.co/Normativa/...
+"""
+import os
+import sys
+import time
+import argparse
+from typing import List, Tuple
+
+from Helpers.webScraping import WebScraping
+
+EXTENSIONES = ['aspx', 'pdf']
+URL_BASE = 'https://www.minsalud.gov.co/Normativa/Paginas/normativa.aspx'
+
+
+def generar_pagina_sintetica(num_links: int = 400, relleno: int = 2000) -> bytes:
+    """Genera un listado HTML con ruido alrededor del contenedor de enlaces"""
+    ruido = ''.join(f'<div class="menu"><a href="/menu/{i}.aspx">Menú {i}</a><p>Texto {i}</p></div>'
+                    for i in range(relleno))
+    enlaces = []
+    for i in range(num_links):
+        extension = ['pdf', 'aspx', 'docx', 'html'][i % 4]
+        enlaces.append(f'<li><a href="/sites/rid/Lists/Documento {i}.{extension}">Documento {i}</a></li>')
+    return (
+        '<html><head><title>Normativa</title></head><body>'
+        f'{ruido}<div class="containerblanco"><ul>{"".join(enlaces)}</ul></div>{ruido}'
+        '</body></html>'
+    ).encode('utf-8')
+
+
+def cargar_paginas(carpeta: str) -> List[Tuple[str, bytes]]:
+    """Carga los archivos .html de una carpeta"""
+    paginas = []
+    for nombre in sorted(os.listdir(carpeta)):
+        if nombre.lower().endswith(('.html', '.htm', '.aspx')):
+            with open(os.path.join(carpeta, nombre), 'rb') as f:
+                paginas.append((nombre, f.read()))
+    return paginas
+
+
+def medir(funcion, contenido: bytes, repeticiones: int) -> float:
+    """Retorna el tiempo medio por llamada en milisegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(contenido, URL_BASE, EXTENSIONES)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de links')
+    parser.add_argument('carpeta', nargs='?', help='Carpeta con páginas HTML guardadas')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.carpeta:
+        paginas = cargar_paginas(args.carpeta)
+        if not paginas:
+            print(f"No se encontraron páginas HTML en {args.carpeta}")
+            sys.exit(1)
+    else:
+        paginas = [('sintetica.html', generar_pagina_sintetica())]
+
+    print(f"{'Página':40} {'KB':>8} {'bs4 ms':>10} {'lxml ms':>10} {'x':>7}  coinciden")
+    total_bs4 = total_lxml = 0.0
+    for nombre, contenido in paginas:
+        ms_bs4 = medir(WebScraping.parsear_links_bs4, contenido, args.repeticiones)
+        ms_lxml = medir(WebScraping.parsear_links_lxml, contenido, args.repeticiones)
+        coinciden = (WebScraping.parsear_links_bs4(contenido, URL_BASE, EXTENSIONES)
+                     == WebScraping.parsear_links_lxml(contenido, URL_BASE, EXTENSIONES))
+        total_bs4 += ms_bs4
+        total_lxml += ms_lxml
+        print(f"{nombre[:40]:40} {len(contenido) / 1024:8.1f} {ms_bs4:10.2f} {ms_lxml:10.2f} "
+              f"{ms_bs4 / ms_lxml if ms_lxml else 0:7.1f}  {'sí' if coinciden else 'NO'}")
+
+    print(f"\nMedia por página: bs4 {total_bs4 / len(paginas):.2f} ms, "
+          f"lxml {total_lxml / len(paginas):.2f} ms "
+          f"({total_bs4 / total_lxml if total_lxml else 0:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de los perfiles de OCR (rapido, balanceado, preciso).
+
+Aplica OCR a los PDF escaneados de una carpeta con cada perfil y reporta
+caracteres/s y la concordancia del texto con el perfil 'preciso' (proporción
+de palabras coincidentes según difflib), para decidir cuánta calidad se
+cambia por latencia en cada carga.
+
+Requiere tesseract (con el idioma 'spa') y poppler instalados.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ocr carpeta_escaneados [--perfiles rapido balanceado preciso]
+"""
+import os
+import sys
+import time
+import argparse
+from difflib import SequenceMatcher
+
+from Helpers.funciones import Funciones, PERFILES_OCR
+
+REFERENCIA = 'preciso'
+
+
+def concordancia(texto: str, referencia: str) -> float:
+    """Proporción de palabras en común (0 a 1) entre dos textos"""
+    palabras, palabras_ref = texto.lower().split(), referencia.lower().split()
+    if not palabras and not palabras_ref:
+        return 1.0
+    return SequenceMatcher(None, palabras, palabras_ref, autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de perfiles de OCR')
+    parser.add_argument('carpeta', help='Carpeta con PDFs escaneados')
+    parser.add_argument('--perfiles', nargs='+', default=list(PERFILES_OCR), choices=list(PERFILES_OCR))
+    parser.add_argument('--workers', type=int, default=None, help='Páginas con OCR en paralelo')
+    args = parser.parse_args()
+
+    pdfs = [os.path.join(args.carpeta, nombre) for nombre in sorted(os.listdir(args.carpeta))
+            if nombre.lower().endswith('.pdf')]
+    if not pdfs:
+        print(f"No se encontraron PDFs en {args.carpeta}")
+        sys.exit(1)
+
+    # La referencia se calcula siempre, aunque no se pida en --perfiles
+    perfiles = [REFERENCIA] + [p for p in args.perfiles if p != REFERENCIA]
+    textos = {perfil: {} for perfil in perfiles}
+    tiempos = {perfil: 0.0 for perfil in perfiles}
+
+    for perfil in perfiles:
+        print(f"Perfil {perfil}...")
+        Funciones.limitar_hilos_tesseract(perfil)
+        for ruta in pdfs:
+            inicio = time.perf_counter()
+            textos[perfil][ruta] = Funciones.extraer_texto_pdf_ocr(ruta, max_workers=args.workers, perfil=perfil)
+            tiempos[perfil] += time.perf_counter() - inicio
+
+    print(f"\n{len(pdfs)} PDFs\n")
+    print(f"{'perfil':12} {'dpi':>5} {'seg':>8} {'caracteres':>11} {'car/s':>9} {'vs preciso':>11}")
+    for perfil in perfiles:
+        if perfil not in args.perfiles:
+            continue
+        caracteres = sum(len(t) for t in textos[perfil].values())
+        acuerdo = sum(concordancia(textos[perfil][r], textos[REFERENCIA][r]) for r in pdfs) / len(pdfs)
+        segundos = tiempos[perfil]
+        print(f"{perfil:12} {PERFILES_OCR[perfil]['dpi']:5} {segundos:8.2f} {caracteres:11} "
+              f"{caracteres / segundos if segundos > 0 else 0:9.0f} {acuerdo:11.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Servidor HTTP local de fixtures para medir el crawler sin red.
+
+Sirve un árbol de listados con la misma estructura que los de minsalud
+(div.containerblanco con enlaces .aspx y .pdf), PDFs sintéticos del tamaño
+indicado y, opcionalmente, páginas grabadas de una carpeta. Puede inyectar
+latencia y errores 500/503. Los PDFs soportan ETag y Range, de modo que también
+sirven para probar la caché condicional y las descargas reanudables.
+
+Uso directo (deja el servidor escuchando):
+    python -m benchmarks.servidor_fixtures --paginas 50 --latencia 0.05
+"""
+import os
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    # La cola por defecto (5) descarta conexiones cuando hay muchos hilos conectando a la vez
+    request_queue_size = 256
+
+
+class ServidorFixtures:
+    """
+    Servidor de fixtures en un hilo de fondo.
+
+    El listado i (/Normativa/p{i}.aspx) enlaza a los listados hijos
+    (fan-out) y a sus propios PDFs (/Normativa/docs/p{i}_{j}.pdf).
+    """
+
+    def __init__(self, num_paginas: int = 50, fan_out: int = 3, pdfs_por_pagina: int = 3,
+                 tamaño_pdf: int = 256 * 1024, latencia: float = 0.0, jitter: float = 0.0,
+                 tasa_errores: float = 0.0, carpeta_grabadas: Optional[str] = None,
+                 crawl_delay: Optional[float] = None, semilla: int = 42):
+        """
+        Args:
+            num_paginas: Número de listados ASPX
+            fan_out: Listados hijos enlazados desde cada listado
+            pdfs_por_pagina: PDFs enlazados desde cada listado
+            tamaño_pdf: Tamaño en bytes de cada PDF sintético
+            latencia: Latencia fija (segundos) agregada a cada respuesta
+            jitter: Variación aleatoria máxima (segundos) sobre la latencia
+            tasa_errores: Fracción de respuestas que fallan con 500/503
+            carpeta_grabadas: Carpeta con páginas HTML grabadas, servidas en /grabadas/<archivo>
+            crawl_delay: Crawl-delay publicado en robots.txt (None para no publicarlo)
+            semilla: Semilla del generador aleatorio (errores y jitter reproducibles)
+        """
+        self.num_paginas = num_paginas
+        self.fan_out = fan_out
+        self.pdfs_por_pagina = pdfs_por_pagina
+        self.tamaño_pdf = tamaño_pdf
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_errores = tasa_errores
+        self.carpeta_grabadas = carpeta_grabadas
+        self.crawl_delay = crawl_delay
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.errores_inyectados = 0
+        self._servidor = None
+        self._hilo = None
+
+    # ------------------------------------------------------------- contenido
+    @property
+    def url_raiz(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}/"
+
+    @property
+    def url_base(self) -> str:
+        return f"{self.url_raiz}Normativa/"
+
+    @property
+    def url_inicial(self) -> str:
+        return f"{self.url_base}p0.aspx"
+
+    def pagina_listado(self, i: int) -> bytes:
+        """HTML del listado i"""
+        hijos = [self.fan_out * i + k for k in range(1, self.fan_out + 1)]
+        enlaces = [f'<li><a href="/Normativa/p{h}.aspx">Listado {h}</a></li>'
+                   for h in hijos if h < self.num_paginas]
+        enlaces += [f'<li><a href="/Normativa/docs/p{i}_{j}.pdf">Resolución {i}-{j}</a></li>'
+                    for j in range(self.pdfs_por_pagina)]
+        menu = ''.join(f'<li><a href="/menu/{k}.aspx">Menú {k}</a></li>' for k in range(30))
+        return (
+            '<html><head><meta charset="utf-8"><title>Normativa</title></head><body>'
+            f'<nav><ul>{menu}</ul></nav>'
+            f'<div class="containerblanco"><h1>Listado {i}</h1><ul>{"".join(enlaces)}</ul></div>'
+            '<footer>Ministerio de Salud</footer></body></html>'
+        ).encode('utf-8')
+
+    def _bloque_pdf(self, nombre: str) -> bytes:
+        """Bloque base determinista del PDF sintético"""
+        return (f'%PDF-1.4\n% {nombre}\n'.encode('utf-8') + b'0' * 4096)[:4096]
+
+    def _inyectar(self) -> Optional[int]:
+        """Aplica la latencia configurada y decide si la respuesta falla"""
+        with self._lock:
+            self.peticiones += 1
+            espera = self.latencia + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            fallo = self.tasa_errores and self._random.random() < self.tasa_errores
+            estado = self._random.choice([500, 503]) if fallo else None
+            if estado:
+                self.errores_inyectados += 1
+        if espera > 0:
+            time.sleep(espera)
+        return estado
+
+    # ------------------------------------------------------------- servidor
+    def _crear_handler(self):
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeceras y cuerpo salen en escrituras separadas: sin esto Nagle + ACK
+            # retardado agregan ~40 ms a cada respuesta keep-alive
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado: int, cuerpo: bytes = b'', tipo: str = 'text/html; charset=utf-8',
+                           cabeceras: Optional[dict] = None):
+                self.send_response(estado)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                for clave, valor in (cabeceras or {}).items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                if cuerpo and self.command != 'HEAD':
+                    self.wfile.write(cuerpo)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                ruta = self.path.split('?', 1)[0]
+
+                if ruta == '/robots.txt':
+                    texto = 'User-agent: *\nDisallow: /privado/\n'
+                    if fixtures.crawl_delay:
+                        texto += f'Crawl-delay: {fixtures.crawl_delay}\n'
+                    return self._responder(200, texto.encode('utf-8'), 'text/plain')
+
+                estado = fixtures._inyectar()
+                if estado:
+                    return self._responder(estado, b'error inyectado', cabeceras={'Retry-After': '0'})
+
+                if ruta.startswith('/Normativa/p') and ruta.endswith('.aspx'):
+                    try:
+                        i = int(ruta[len('/Normativa/p'):-len('.aspx')])
+                    except ValueError:
+                        return self._responder(404)
+                    if i >= fixtures.num_paginas:
+                        return self._responder(404)
+                    return self._responder(200, fixtures.pagina_listado(i))
+
+                if ruta.startswith('/Normativa/docs/') and ruta.endswith('.pdf'):
+                    return self._servir_pdf(os.path.basename(ruta))
+
+                if ruta.startswith('/grabadas/') and fixtures.carpeta_grabadas:
+                    archivo = os.path.join(fixtures.carpeta_grabadas, os.path.basename(ruta))
+                    if os.path.isfile(archivo):
+                        with open(archivo, 'rb') as f:
+                            return self._responder(200, f.read())
+
+                return self._responder(404)
+
+            def _servir_pdf(self, nombre: str):
+                total = fixtures.tamaño_pdf
+                etag = f'"{nombre}-{total}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._responder(304, cabeceras={'ETag': etag})
+
+                inicio, estado = 0, 200
+                cabeceras = {'ETag': etag, 'Accept-Ranges': 'bytes'}
+                rango = self.headers.get('Range', '')
+                if rango.startswith('bytes=') and self.headers.get('If-Range', etag) == etag:
+                    inicio = int(rango[len('bytes='):].split('-', 1)[0] or 0)
+                    if inicio >= total:
+                        return self._responder(416, cabeceras={'Content-Range': f'bytes */{total}'})
+                    estado = 206
+                    cabeceras['Content-Range'] = f'bytes {inicio}-{total - 1}/{total}'
+
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Length', str(total - inicio))
+                for clave, valor in cabeceras.items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                if self.command == 'HEAD':
+                    return
+
+                # El contenido se genera por bloques para no ocupar memoria con PDFs grandes
+                bloque = fixtures._bloque_pdf(nombre)
+                posicion = inicio
+                while posicion < total:
+                    desde = posicion % len(bloque)
+                    trozo = bloque[desde:desde + min(len(bloque) - desde, total - posicion)]
+                    self.wfile.write(trozo)
+                    posicion += len(trozo)
+
+        return Handler
+
+    def iniciar(self) -> 'ServidorFixtures':
+        """Arranca el servidor en un puerto libre"""
+        self._servidor = _ServidorHTTP(('127.0.0.1', 0), self._crear_handler())
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el servidor"""
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local de fixtures para el crawler')
+    parser.add_argument('--paginas', type=int, default=50)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--pdfs-por-pagina', type=int, default=3)
+    parser.add_argument('--tamano-pdf-kb', type=int, default=256)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de respuestas 500/503')
+    parser.add_argument('--grabadas', help='Carpeta con páginas HTML grabadas')
+    args = parser.parse_args()
+
+    servidor = ServidorFixtures(
+        num_paginas=args.paginas, fan_out=args.fan_out, pdfs_por_pagina=args.pdfs_por_pagina,
+        tamaño_pdf=args.tamano_pdf_kb * 1024, latencia=args.latencia, jitter=args.jitter,
+        tasa_errores=args.errores, carpeta_grabadas=args.grabadas
+    ).iniciar()
+    print(f"Sirviendo fixtures en {servidor.url_inicial} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
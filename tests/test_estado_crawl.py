@@ -0,0 +1,126 @@
+import os
+import json
+import socket
+
+import pytest
+
+from Helpers.estadoCrawl import EstadoCrawl
+from Helpers.webScraping import WebScraping
+from benchmarks.servidor_fixtures import ServidorFixtures
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / 'links.json')
+
+
+@pytest.fixture(scope='module')
+def servidor():
+    with ServidorFixtures(num_paginas=30, fan_out=3, pdfs_por_pagina=1, tamaño_pdf=1024).iniciar() as srv:
+        yield srv
+
+
+def test_bitacora_sin_checkpoint(ruta):
+    estado = EstadoCrawl(ruta, intervalo_checkpoint=100)
+    estado.registrar_link({'url': 'http://x/a.aspx', 'type': 'aspx'})
+    estado.registrar_encolada('http://x/a.aspx')
+    estado.registrar_visitada('http://x/a.aspx')
+    estado.registrar_descarga('http://x/b.pdf', {'bytes': 3})
+    assert not os.path.exists(ruta)
+
+    datos = EstadoCrawl.leer(ruta)
+    assert datos['links'] == [{'url': 'http://x/a.aspx', 'type': 'aspx'}]
+    assert datos['visitadas'] == {'http://x/a.aspx'}
+    assert datos['descargados'] == {'http://x/b.pdf': {'bytes': 3}}
+    assert not datos['completado']
+
+
+def test_linea_truncada_en_la_bitacora(ruta):
+    estado = EstadoCrawl(ruta, intervalo_checkpoint=100)
+    estado.registrar_visitada('http://x/1.aspx')
+    estado._archivo_log.close()
+    with open(f"{ruta}.log", 'a', encoding='utf-8') as f:
+        f.write('{"evento": "visitada", "url": "http://x/2.as')
+
+    # La línea cortada se ignora y el evento siguiente empieza en una línea nueva
+    estado = EstadoCrawl(ruta, intervalo_checkpoint=100)
+    assert estado.datos['visitadas'] == {'http://x/1.aspx'}
+    estado.registrar_visitada('http://x/3.aspx')
+    assert EstadoCrawl.leer(ruta)['visitadas'] == {'http://x/1.aspx', 'http://x/3.aspx'}
+
+
+def test_reanudar_despues_de_compactar(ruta):
+    estado = EstadoCrawl(ruta, intervalo_checkpoint=4)
+    for i in range(4):
+        estado.registrar_encolada(f'http://x/{i}.aspx')
+    estado.registrar_visitada('http://x/0.aspx')
+    estado.registrar_visitada('http://x/1.aspx')
+
+    # Hubo un checkpoint: parte del estado está en el JSON y el resto en la bitácora
+    with open(ruta, encoding='utf-8') as f:
+        assert 'encoladas' in json.load(f)
+    assert os.path.exists(f"{ruta}.log")
+
+    estado = EstadoCrawl(ruta)
+    assert estado.datos['visitadas'] == {'http://x/0.aspx', 'http://x/1.aspx'}
+    estado.cerrar()
+    assert not os.path.exists(f"{ruta}.log")
+    # La cola compactada solo guarda las páginas aún no visitadas
+    with open(ruta, encoding='utf-8') as f:
+        assert json.load(f)['encoladas'] == ['http://x/2.aspx', 'http://x/3.aspx']
+
+
+def test_reiniciar_conserva_descargados(ruta):
+    estado = EstadoCrawl(ruta)
+    estado.registrar_link({'url': 'http://x/b.pdf', 'type': 'pdf'})
+    estado.registrar_descarga('http://x/b.pdf', {'bytes': 3})
+    estado.marcar_completado()
+    estado.reiniciar()
+
+    datos = EstadoCrawl.leer(ruta)
+    assert datos['links'] == [] and not datos['completado']
+    assert datos['descargados'] == {'http://x/b.pdf': {'bytes': 3}}
+
+
+@pytest.mark.parametrize('concurrente', [False, True])
+def test_limite_de_iteraciones_no_termina_el_rastreo(servidor, ruta, concurrente):
+    scraper = WebScraping(servidor.url_base)
+    resultado = scraper.extraer_todos_los_links(servidor.url_inicial, ruta, max_iteraciones=5,
+                                                concurrente=concurrente)
+    assert resultado['iteraciones'] == 5 and not resultado['completado']
+    assert not EstadoCrawl.leer(ruta)['completado']
+
+    # Con un límite mayor se reanuda la misma cola hasta vaciarla
+    resultado = scraper.extraer_todos_los_links(servidor.url_inicial, ruta, max_iteraciones=100,
+                                                concurrente=concurrente)
+    assert resultado['reanudado'] and resultado['completado']
+    assert resultado['iteraciones'] == servidor.num_paginas - 1
+    scraper.close()
+
+
+def test_url_inicial_inaccesible(ruta):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto = s.getsockname()[1]
+    url = f'http://127.0.0.1:{puerto}/Normativa/'
+    scraper = WebScraping(url)
+    resultado = scraper.extraer_todos_los_links(f'{url}p0.aspx', ruta, reintentos=0)
+    assert not resultado['success']
+    assert not EstadoCrawl.leer(ruta)['completado']
+    scraper.close()
+
+
+def test_descarga_cierra_el_estado_si_falla(servidor, ruta, tmp_path):
+    scraper = WebScraping(servidor.url_base)
+    scraper.extraer_todos_los_links(servidor.url_inicial, ruta, max_iteraciones=3)
+
+    # Falla dentro del ciclo de descarga, después de registrar el primer archivo
+    def progreso(*args, **kwargs):
+        raise ValueError('falla en el reporte de progreso')
+
+    resultado = scraper.descargar_pdfs(ruta, str(tmp_path / 'uploads'), max_workers=1, progreso=progreso)
+    assert not resultado['success']
+    # El checkpoint se compactó: la bitácora no quedó abierta ni con eventos sueltos
+    assert not os.path.exists(f"{ruta}.log")
+    assert EstadoCrawl.leer(ruta)['descargados']
+    scraper.close()
@@ -0,0 +1,66 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from Helpers.funciones import Funciones, _LectorJSON
+
+
+def registros(texto, tamaño_bloque=8, **opciones):
+    return list(Funciones.iterar_registros_json(io.StringIO(texto), tamaño_bloque=tamaño_bloque, **opciones))
+
+
+def test_numero_partido_entre_bloques():
+    # Con bloques de 8 caracteres los números y literales quedan cortados
+    texto = '{"id": 1234567890123}\n{"v": -1.5e10, "ok": false}\n{"n": null}\n'
+    assert registros(texto) == [{'id': 1234567890123}, {'v': -1.5e10, 'ok': False}, {'n': None}]
+
+
+def test_arreglo_con_puntero():
+    texto = json.dumps({'meta': {'x': 1}, 'peliculas': [{'t': 'a' * 40}, {'t': 'b'}, 5]})
+    assert registros(texto, puntero='/peliculas') == [{'t': 'a' * 40}, {'t': 'b'}]
+
+
+def test_puntero_inexistente():
+    with pytest.raises(KeyError):
+        registros('{"a": []}', puntero='/b')
+
+
+def test_linea_malformada_se_omite_en_json_lines():
+    texto = '{"id": 1}\n{"id": 2,, "x": 0}\n{"id": 3\n{"id": 4}\n'
+    errores = []
+    assert registros(texto, errores=errores) == [{'id': 1}, {'id': 4}]
+    assert len(errores) == 2
+
+
+def test_registro_malformado_no_lee_el_resto_del_archivo():
+    # Sin lista de errores la falla se reporta sin cargar el resto del archivo en el buffer
+    texto = '{"id": 1,, }\n' + '{"id": 2, "relleno": "xxxxxxxxxxxxxxxx"}\n' * 20000
+    archivo = io.StringIO(texto)
+    lector = _LectorJSON(archivo, tamaño_bloque=4096)
+    with pytest.raises(json.JSONDecodeError):
+        list(lector.documentos_raiz())
+    assert archivo.tell() <= 4096
+
+
+def test_documento_con_error_no_es_json_lines():
+    # En un documento con sangría el error no está en la línea del valor: no se omiten líneas
+    with pytest.raises(json.JSONDecodeError):
+        registros('{\n  "a": 1,\n  "b": 2,,\n  "c": 3\n}\n', errores=[])
+
+
+def test_valor_que_supera_el_tamaño_maximo():
+    lector = _LectorJSON(io.StringIO('{"x": "' + 'a' * 1000 + '"}'), tamaño_bloque=64, tamaño_maximo=256)
+    with pytest.raises(json.JSONDecodeError):
+        list(lector.documentos_raiz())
+
+
+def test_zip_continua_despues_de_linea_malformada():
+    contenido = io.BytesIO()
+    with zipfile.ZipFile(contenido, 'w') as zip_ref:
+        zip_ref.writestr('datos.ndjson', '{"id": 1}\nno es json\n{"id": 2}\n')
+    contenido.seek(0)
+    leidos = list(Funciones.iterar_documentos_zip(contenido))
+    assert [leido['documento'] for leido in leidos if not leido['error']] == [{'id': 1}, {'id': 2}]
+    assert sum(1 for leido in leidos if leido['error']) == 1
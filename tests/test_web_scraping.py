@@ -0,0 +1,37 @@
+import pytest
+
+from Helpers.webScraping import WebScraping
+from benchmarks.bench_extract_links import URL_BASE, generar_pagina_sintetica
+from benchmarks.servidor_fixtures import ServidorFixtures
+
+EXTENSIONES = ['aspx', 'pdf']
+
+PAGINA_BORDES = (
+    '<html><body><div class="menu"><a href="/fuera.pdf">fuera</a></div>'
+    '<div class="otra containerblanco">'
+    '<a href="">vacío</a><a href="   ">blancos</a><a href="#">arriba</a><a href="#seccion">ancla</a>'
+    '<a>sin href</a><a href=" docs/Resolución 1.PDF ">con espacios</a>'
+    '<a href="p2.aspx?x=1">query</a><a href="https://otro.gov.co/a.aspx">otro host</a>'
+    '<a href="archivo.docx">docx</a>'
+    '</div><div class="containerblanco"><a href="segundo.pdf">segundo contenedor</a></div></body></html>'
+).encode('utf-8')
+
+
+def paginas():
+    fixtures = ServidorFixtures(num_paginas=20, fan_out=3, pdfs_por_pagina=4)
+    yield 'listado_0', fixtures.pagina_listado(0)
+    yield 'listado_7', fixtures.pagina_listado(7)
+    yield 'sintetica', generar_pagina_sintetica(num_links=200, relleno=50)
+    yield 'bordes', PAGINA_BORDES
+
+
+@pytest.mark.parametrize('nombre,contenido', list(paginas()))
+def test_lxml_y_bs4_entregan_los_mismos_links(nombre, contenido):
+    assert (WebScraping.parsear_links_lxml(contenido, URL_BASE, EXTENSIONES)
+            == WebScraping.parsear_links_bs4(contenido, URL_BASE, EXTENSIONES))
+
+
+def test_href_vacio_no_genera_auto_enlace():
+    links = WebScraping.parsear_links_lxml(PAGINA_BORDES, URL_BASE, EXTENSIONES)
+    assert URL_BASE not in [link['url'] for link in links]
+    assert [link['type'] for link in links] == ['pdf', 'aspx']